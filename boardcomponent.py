@@ -0,0 +1,41 @@
+"""Bidirectional Streamlit component for the interactive board
+
+The browser receives the rendered position and its legal moves once per
+position, handles piece selection and target highlighting locally, and
+only reports the finished move. A move therefore costs a single rerun
+instead of one per click.
+"""
+import os
+
+import streamlit.components.v1 as components
+
+import render
+
+FRONTEND_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "components", "board")
+
+board_component = components.declare_component("chess_board", path=FRONTEND_PATH)
+
+
+def chess_board(svg, fen, moves, flipped, interactive, key, on_change=None):
+    """Show the board; the value is ``{"move", "fen", "nonce"}`` after each move
+
+    `moves` maps origin square names to ``{destination: uci}`` (see
+    ``MoveIndex.client_moves``) and `fen` identifies the position the move
+    was made in, so callers can ignore moves sent for an older position.
+    """
+    return board_component(
+        svg=svg,
+        fen=fen,
+        moves=moves,
+        flipped=flipped,
+        interactive=interactive,
+        square_size=render.SQUARE_SIZE,
+        margin=render.MARGIN,
+        selected_fill=render.SELECTED_FILL,
+        selected_opacity=render.SELECTED_OPACITY,
+        target_fill=render.TARGET_FILL,
+        target_opacity=render.TARGET_OPACITY,
+        key=key,
+        on_change=on_change,
+        default=None,
+    )
@@ -0,0 +1,11 @@
+#!/usr/bin/env python3
+"""Chess Wizard's built-in engine as a UCI executable, for GUIs and tools"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from engine.uci import main  # noqa: E402
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""Deployment settings, overridable through environment variables"""
+import os
+
+# Size of the per-session transposition table used by the computer player
+TT_SIZE_MB = int(os.environ.get("CHESS_WIZARD_TT_MB", "16"))
+
+# Worker processes that run the computer player's searches
+ENGINE_WORKERS = int(os.environ.get("CHESS_WIZARD_ENGINE_WORKERS", str(os.cpu_count() or 1)))
+
+# Workers that may ponder (search the predicted position during the human's
+# turn) at once; the rest stay free for real moves. 0 disables pondering.
+PONDER_WORKERS = int(os.environ.get("CHESS_WIZARD_PONDER_WORKERS", str(max(ENGINE_WORKERS - 1, 0))))
+
+# Workers that may run game analysis at once (lowest priority after moves
+# and pondering), and the search time spent on each analysed position
+ANALYSIS_WORKERS = int(os.environ.get("CHESS_WIZARD_ANALYSIS_WORKERS", str(max(ENGINE_WORKERS - 1, 1))))
+ANALYSIS_SECONDS = float(os.environ.get("CHESS_WIZARD_ANALYSIS_SECONDS", "0.3"))
+
+# Command line of a UCI engine binary to search with instead of the
+# built-in engine; the opening book and tablebases are still consulted first
+UCI_ENGINE = os.environ.get("CHESS_WIZARD_UCI_ENGINE") or None
+
+# Seconds a move request may wait in the engine queue on top of its search
+# time before its budget is cut to the minimum
+MOVE_DEADLINE_SLACK = float(os.environ.get("CHESS_WIZARD_MOVE_DEADLINE_SLACK", "5.0"))
+
+# Polyglot opening book consulted before searching; unset uses the small
+# book built from data/openings.pgn
+BOOK_PATH = os.environ.get("CHESS_WIZARD_BOOK") or None
+
+# Plies from the start of the game during which the book is used (0 disables it)
+BOOK_PLIES = int(os.environ.get("CHESS_WIZARD_BOOK_PLIES", "20"))
+
+# Directory of Syzygy tablebase files (.rtbw/.rtbz); unset disables probing
+SYZYGY_PATH = os.environ.get("CHESS_WIZARD_SYZYGY") or None
+
+# Tablebase probe results cached per process
+TABLEBASE_CACHE_SIZE = int(os.environ.get("CHESS_WIZARD_TABLEBASE_CACHE", "65536"))
+
+# Rendered board SVGs kept in the process-wide render cache
+RENDER_CACHE_SIZE = int(os.environ.get("CHESS_WIZARD_RENDER_CACHE", "4096"))
+
+# Seconds after which an idle session's live board is evicted; it is
+# rebuilt from the session's compact game record on the next access
+BOARD_IDLE_SECONDS = float(os.environ.get("CHESS_WIZARD_BOARD_IDLE_SECONDS", "600"))
+
+# SQLite database where games are saved so they can be resumed by ID;
+# set to an empty string to disable saving
+GAME_DB = os.environ.get("CHESS_WIZARD_GAME_DB", "chess_wizard.db") or None
+
+# Seconds between batched writes of saved games to the database
+GAME_DB_FLUSH_SECONDS = float(os.environ.get("CHESS_WIZARD_GAME_DB_FLUSH_SECONDS", "2.0"))
+
+# Seconds after which an online game nobody has looked at is dropped from
+# the in-process game hub
+HUB_IDLE_SECONDS = float(os.environ.get("CHESS_WIZARD_HUB_IDLE_SECONDS", "1800"))
+
+# Seconds between checks for the opponent's move in online games
+ONLINE_POLL_SECONDS = float(os.environ.get("CHESS_WIZARD_ONLINE_POLL_SECONDS", "1.0"))
+
+# Timing of hot paths into per-process histograms (0 turns it off at no cost)
+METRICS_ENABLED = os.environ.get("CHESS_WIZARD_METRICS", "1") != "0"
+
+# Fraction of reruns run under cProfile, merged per process for the admin page
+PROFILE_SAMPLE_RATE = float(os.environ.get("CHESS_WIZARD_PROFILE_RATE", "0"))
+
+# File the metrics are written to in the Prometheus text format (e.g. for
+# node_exporter's textfile collector) every METRICS_EXPORT_SECONDS; unset
+# disables the export
+METRICS_FILE = os.environ.get("CHESS_WIZARD_METRICS_FILE") or None
+METRICS_EXPORT_SECONDS = float(os.environ.get("CHESS_WIZARD_METRICS_EXPORT_SECONDS", "15"))
+
+# Value of ?admin= that opens the performance page; unset keeps the page off
+ADMIN_TOKEN = os.environ.get("CHESS_WIZARD_ADMIN_TOKEN") or None
+
+# Puzzle file built by tools/build_puzzles.py from the Lichess puzzle
+# database; unset uses the small set built from data/puzzles.csv
+PUZZLE_DB = os.environ.get("CHESS_WIZARD_PUZZLES") or None
@@ -0,0 +1,19 @@
+"""Chess Wizard's built-in chess engine"""
+from engine.evaluate import evaluate
+from engine.search import (
+    MAX_PLY,
+    Searcher,
+    SearchLimits,
+    SearchResult,
+    nodes_per_second,
+)
+from engine.tt import TranspositionTable
+
+# Search budgets behind the difficulty buttons. The time limit is a hard
+# cap so a Streamlit rerun never blocks longer than it.
+DIFFICULTY_LEVELS = {
+    "🟢 Easy": SearchLimits(time=0.3, nodes=3000, depth=2),
+    "🟡 Medium": SearchLimits(time=1.0, nodes=40000, depth=4),
+    "🔴 Hard": SearchLimits(time=3.0, nodes=None, depth=MAX_PLY),
+}
+DEFAULT_DIFFICULTY = "🟡 Medium"
@@ -0,0 +1,133 @@
+"""Polyglot opening book lookup over a memory-mapped, binary-searched file
+
+Polyglot books are arrays of 16-byte big-endian entries (key, move,
+weight, learn) sorted by the position's Zobrist key. The reader works on
+any buffer, so the same code serves an mmap of a ``.bin`` file and the
+small book built in memory from the bundled PGN.
+"""
+import mmap
+import os
+import random
+
+import chess
+import chess.pgn
+import chess.polyglot
+
+ENTRY_STRUCT = chess.polyglot.ENTRY_STRUCT
+ENTRY_SIZE = ENTRY_STRUCT.size
+
+BUNDLED_PGN = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "openings.pgn")
+
+# Polyglot writes castling as the king capturing its own rook
+_CASTLING_MOVES = {
+    (chess.E1, chess.H1): chess.G1,
+    (chess.E1, chess.A1): chess.C1,
+    (chess.E8, chess.H8): chess.G8,
+    (chess.E8, chess.A8): chess.C8,
+}
+_CASTLING_ENCODING = {(king, target): rook for (king, rook), target in _CASTLING_MOVES.items()}
+
+
+def decode_move(board, raw_move):
+    """Turn a polyglot move field into a chess.Move for `board`"""
+    to_square = raw_move & 0x3F
+    from_square = raw_move >> 6 & 0x3F
+    promotion = raw_move >> 12 & 0x7
+    if board.king(board.turn) == from_square and (from_square, to_square) in _CASTLING_MOVES:
+        to_square = _CASTLING_MOVES[from_square, to_square]
+    return chess.Move(from_square, to_square, promotion + 1 if promotion else None)
+
+
+def encode_move(board, move):
+    """Inverse of decode_move"""
+    to_square = move.to_square
+    if board.is_castling(move):
+        to_square = _CASTLING_ENCODING[move.from_square, move.to_square]
+    promotion = move.promotion - 1 if move.promotion else 0
+    return to_square | move.from_square << 6 | promotion << 12
+
+
+class OpeningBook:
+    """Binary-searched view over polyglot entries held in a buffer"""
+
+    def __init__(self, buffer, name="book"):
+        if len(buffer) % ENTRY_SIZE:
+            raise ValueError(f"{name}: size is not a multiple of {ENTRY_SIZE} bytes")
+        self.buffer = buffer
+        self.name = name
+        self.size = len(buffer) // ENTRY_SIZE
+
+    def key_at(self, index):
+        return ENTRY_STRUCT.unpack_from(self.buffer, index * ENTRY_SIZE)[0]
+
+    def first_index(self, key):
+        """Index of the first entry for `key` (or where it would be)"""
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            if self.key_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def entries(self, board):
+        """Yield (move, weight) for every legal book move in `board`"""
+        key = chess.polyglot.zobrist_hash(board)
+        index = self.first_index(key)
+        while index < self.size:
+            entry_key, raw_move, weight, _ = ENTRY_STRUCT.unpack_from(self.buffer, index * ENTRY_SIZE)
+            if entry_key != key:
+                break
+            move = decode_move(board, raw_move)
+            if weight and board.is_legal(move):
+                yield move, weight
+            index += 1
+
+    def choose(self, board, rng=random):
+        """Pick a book move with probability proportional to its weight"""
+        entries = list(self.entries(board))
+        if not entries:
+            return None
+        moves, weights = zip(*entries)
+        return rng.choices(moves, weights=weights)[0]
+
+
+def open_book(path):
+    """Memory-map a polyglot ``.bin`` file"""
+    with open(path, "rb") as book_file:
+        buffer = mmap.mmap(book_file.fileno(), 0, access=mmap.ACCESS_READ)
+    return OpeningBook(buffer, name=os.path.basename(path))
+
+
+def build_book(pgn_path, max_plies=20):
+    """Build polyglot entries from the games of a PGN file; weights count games"""
+    weights = {}
+    with open(pgn_path, encoding="utf-8") as pgn:
+        while True:
+            game = chess.pgn.read_game(pgn)
+            if game is None:
+                break
+            board = game.board()
+            for ply, move in enumerate(game.mainline_moves()):
+                if ply >= max_plies:
+                    break
+                entry = (chess.polyglot.zobrist_hash(board), encode_move(board, move))
+                weights[entry] = weights.get(entry, 0) + 1
+                board.push(move)
+    data = bytearray()
+    for (key, raw_move), weight in sorted(weights.items()):
+        data += ENTRY_STRUCT.pack(key, raw_move, min(weight, 0xFFFF), 0)
+    return bytes(data)
+
+
+def load_book(path=None):
+    """Open the configured book file, or build the bundled one when there is none"""
+    if path:
+        return open_book(path)
+    return OpeningBook(build_book(BUNDLED_PGN), name="built-in")
+
+
+def book_ply(board):
+    """Plies played since the start of the game, taken from the move counters"""
+    return 2 * (board.fullmove_number - 1) + (board.turn == chess.BLACK)
@@ -0,0 +1,123 @@
+"""Static evaluation: material plus piece-square tables, tapered by game phase"""
+import chess
+
+# Centipawn values indexed by piece type (index 0 unused)
+PIECE_VALUES = [0, 100, 320, 330, 500, 900, 0]
+
+# Game phase weight of each piece type; a full set of pieces adds up to 24
+PHASE_WEIGHTS = [0, 0, 1, 1, 2, 4, 0]
+MAX_PHASE = 24
+
+# Piece-square tables written from White's point of view with rank 8 on
+# top, so a white piece on square `sq` reads `table[sq ^ 56]` and a black
+# piece reads `table[sq]`.
+PAWN_TABLE = [
+     0,   0,   0,   0,   0,   0,   0,   0,
+    50,  50,  50,  50,  50,  50,  50,  50,
+    10,  10,  20,  30,  30,  20,  10,  10,
+     5,   5,  10,  25,  25,  10,   5,   5,
+     0,   0,   0,  20,  20,   0,   0,   0,
+     5,  -5, -10,   0,   0, -10,  -5,   5,
+     5,  10,  10, -20, -20,  10,  10,   5,
+     0,   0,   0,   0,   0,   0,   0,   0,
+]
+
+KNIGHT_TABLE = [
+   -50, -40, -30, -30, -30, -30, -40, -50,
+   -40, -20,   0,   0,   0,   0, -20, -40,
+   -30,   0,  10,  15,  15,  10,   0, -30,
+   -30,   5,  15,  20,  20,  15,   5, -30,
+   -30,   0,  15,  20,  20,  15,   0, -30,
+   -30,   5,  10,  15,  15,  10,   5, -30,
+   -40, -20,   0,   5,   5,   0, -20, -40,
+   -50, -40, -30, -30, -30, -30, -40, -50,
+]
+
+BISHOP_TABLE = [
+   -20, -10, -10, -10, -10, -10, -10, -20,
+   -10,   0,   0,   0,   0,   0,   0, -10,
+   -10,   0,   5,  10,  10,   5,   0, -10,
+   -10,   5,   5,  10,  10,   5,   5, -10,
+   -10,   0,  10,  10,  10,  10,   0, -10,
+   -10,  10,  10,  10,  10,  10,  10, -10,
+   -10,   5,   0,   0,   0,   0,   5, -10,
+   -20, -10, -10, -10, -10, -10, -10, -20,
+]
+
+ROOK_TABLE = [
+     0,   0,   0,   0,   0,   0,   0,   0,
+     5,  10,  10,  10,  10,  10,  10,   5,
+    -5,   0,   0,   0,   0,   0,   0,  -5,
+    -5,   0,   0,   0,   0,   0,   0,  -5,
+    -5,   0,   0,   0,   0,   0,   0,  -5,
+    -5,   0,   0,   0,   0,   0,   0,  -5,
+    -5,   0,   0,   0,   0,   0,   0,  -5,
+     0,   0,   0,   5,   5,   0,   0,   0,
+]
+
+QUEEN_TABLE = [
+   -20, -10, -10,  -5,  -5, -10, -10, -20,
+   -10,   0,   0,   0,   0,   0,   0, -10,
+   -10,   0,   5,   5,   5,   5,   0, -10,
+    -5,   0,   5,   5,   5,   5,   0,  -5,
+     0,   0,   5,   5,   5,   5,   0,  -5,
+   -10,   5,   5,   5,   5,   5,   0, -10,
+   -10,   0,   5,   0,   0,   0,   0, -10,
+   -20, -10, -10,  -5,  -5, -10, -10, -20,
+]
+
+KING_MIDDLEGAME_TABLE = [
+   -30, -40, -40, -50, -50, -40, -40, -30,
+   -30, -40, -40, -50, -50, -40, -40, -30,
+   -30, -40, -40, -50, -50, -40, -40, -30,
+   -30, -40, -40, -50, -50, -40, -40, -30,
+   -20, -30, -30, -40, -40, -30, -30, -20,
+   -10, -20, -20, -20, -20, -20, -20, -10,
+    20,  20,   0,   0,   0,   0,  20,  20,
+    20,  30,  10,   0,   0,  10,  30,  20,
+]
+
+KING_ENDGAME_TABLE = [
+   -50, -40, -30, -20, -20, -30, -40, -50,
+   -30, -20, -10,   0,   0, -10, -20, -30,
+   -30, -10,  20,  30,  30,  20, -10, -30,
+   -30, -10,  30,  40,  40,  30, -10, -30,
+   -30, -10,  30,  40,  40,  30, -10, -30,
+   -30, -10,  20,  30,  30,  20, -10, -30,
+   -30, -30,   0,   0,   0,   0, -30, -30,
+   -50, -30, -30, -30, -30, -30, -30, -50,
+]
+
+MIDDLEGAME_TABLES = [None, PAWN_TABLE, KNIGHT_TABLE, BISHOP_TABLE,
+                     ROOK_TABLE, QUEEN_TABLE, KING_MIDDLEGAME_TABLE]
+ENDGAME_TABLES = [None, PAWN_TABLE, KNIGHT_TABLE, BISHOP_TABLE,
+                  ROOK_TABLE, QUEEN_TABLE, KING_ENDGAME_TABLE]
+
+
+def piece_square_values(piece_type, color, square):
+    """Return the (middlegame, endgame) value of a piece on a square for White"""
+    index = square ^ 56 if color == chess.WHITE else square
+    value = PIECE_VALUES[piece_type]
+    mg = value + MIDDLEGAME_TABLES[piece_type][index]
+    eg = value + ENDGAME_TABLES[piece_type][index]
+    if color == chess.WHITE:
+        return mg, eg
+    return -mg, -eg
+
+
+def taper(mg, eg, phase):
+    """Blend middlegame and endgame scores according to the game phase"""
+    phase = min(phase, MAX_PHASE)
+    return (mg * phase + eg * (MAX_PHASE - phase)) // MAX_PHASE
+
+
+def evaluate(board):
+    """Score the position in centipawns from the side to move's point of view"""
+    mg = eg = phase = 0
+    for square, piece in board.piece_map().items():
+        piece_mg, piece_eg = piece_square_values(piece.piece_type, piece.color, square)
+        mg += piece_mg
+        eg += piece_eg
+        phase += PHASE_WEIGHTS[piece.piece_type]
+    score = taper(mg, eg, phase)
+    return score if board.turn == chess.WHITE else -score
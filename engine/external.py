@@ -0,0 +1,104 @@
+"""Search adapter that drives an external UCI engine through chess.engine
+
+`ExternalEngine` has the same ``search(board, limits)`` interface as the
+built-in Searcher, so the engine workers can use either. Each worker
+process keeps one engine process alive for every move and session it
+serves, restarting it if it dies.
+"""
+import shlex
+import time
+
+import chess
+import chess.engine
+
+from engine.search import MATE_SCORE, SearchResult
+
+
+class ExternalEngine:
+    """A long-lived UCI engine process behind the Searcher interface"""
+
+    def __init__(self, command, options=None):
+        self.command = shlex.split(command) if isinstance(command, str) else list(command)
+        self.options = options or {}
+        self.engine = None
+
+    @property
+    def name(self):
+        return self.open().id.get("name", self.command[0])
+
+    def open(self):
+        """Start the engine process unless it is already running"""
+        if self.engine is None:
+            self.engine = chess.engine.SimpleEngine.popen_uci(self.command)
+            # Only pass options the engine actually offers
+            supported = {name: value for name, value in self.options.items() if name in self.engine.options}
+            if supported:
+                self.engine.configure(supported)
+        return self.engine
+
+    def close(self):
+        if self.engine is not None:
+            try:
+                self.engine.quit()
+            except (chess.engine.EngineError, chess.engine.EngineTerminatedError):
+                pass
+            self.engine = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def run(self, command, *args, **kwargs):
+        """Call an engine method, restarting a dead engine process once"""
+        try:
+            return getattr(self.open(), command)(*args, **kwargs)
+        except chess.engine.EngineTerminatedError:
+            # The process died (or was killed); start a fresh one and retry once
+            self.engine = None
+            return getattr(self.open(), command)(*args, **kwargs)
+
+    def search(self, board, limits, history=None):
+        """Search a chess.Board within `limits` and return a SearchResult of chess.Moves
+
+        `history` is accepted for the built-in Searcher's signature; the
+        engine sees the board's own move stack, and keys cannot be sent over UCI.
+        """
+        limit = chess.engine.Limit(time=limits.time, nodes=limits.nodes, depth=limits.depth)
+        start = time.perf_counter()
+        result = self.run("play", board, limit, info=chess.engine.INFO_ALL)
+        elapsed = time.perf_counter() - start
+
+        info = result.info
+        score = info.get("score")
+        return SearchResult(
+            result.move,
+            score.pov(board.turn).score(mate_score=MATE_SCORE) if score is not None else 0,
+            info.get("depth", 0),
+            info.get("nodes", 0),
+            elapsed,
+            info.get("pv") or ([result.move] if result.move else []),
+        )
+
+    def search_lines(self, board, limits, count):
+        """The best `count` root moves of a chess.Board (multi-PV), best first"""
+        limit = chess.engine.Limit(time=limits.time, nodes=limits.nodes, depth=limits.depth)
+        start = time.perf_counter()
+        infos = self.run("analyse", board, limit, multipv=count)
+        elapsed = time.perf_counter() - start
+        lines = []
+        for info in infos:
+            pv = info.get("pv")
+            if not pv:
+                continue
+            score = info.get("score")
+            lines.append(SearchResult(
+                pv[0],
+                score.pov(board.turn).score(mate_score=MATE_SCORE) if score is not None else 0,
+                info.get("depth", 0),
+                info.get("nodes", 0),
+                elapsed,
+                pv,
+            ))
+        return lines
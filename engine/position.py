@@ -0,0 +1,574 @@
+"""Compact 0x88 position with incremental Zobrist key and evaluation
+
+The engine searches on this representation instead of ``chess.Board``.
+Squares are 0x88 indices (``rank * 16 + file``), pieces are small ints
+(piece type, plus 8 for Black) and moves are packed ints, so make/unmake
+only writes into preallocated lists. Conversion to and from python-chess
+happens at the UI boundary only.
+"""
+import chess
+import chess.polyglot
+
+from engine.evaluate import ENDGAME_TABLES, MIDDLEGAME_TABLES, PHASE_WEIGHTS, PIECE_VALUES, taper
+
+WHITE = 0
+BLACK = 1
+
+EMPTY = 0
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = 1, 2, 3, 4, 5, 6
+BLACK_BIT = 8
+
+NO_SQUARE = -1
+
+# Castling rights bits
+WHITE_KINGSIDE = 1
+WHITE_QUEENSIDE = 2
+BLACK_KINGSIDE = 4
+BLACK_QUEENSIDE = 8
+
+# Move layout: from (7 bits) | to (7 bits) | promotion type (3 bits) | flags
+FLAG_CAPTURE = 1 << 17
+FLAG_DOUBLE_PUSH = 1 << 18
+FLAG_EN_PASSANT = 1 << 19
+FLAG_CASTLE = 1 << 20
+
+# Deepest stack of moves a position can hold: a full game plus a search
+STACK_SIZE = 2048
+
+KNIGHT_OFFSETS = (-33, -31, -18, -14, 14, 18, 31, 33)
+KING_OFFSETS = (-17, -16, -15, -1, 1, 15, 16, 17)
+DIAGONAL_OFFSETS = (-17, -15, 15, 17)
+ORTHOGONAL_OFFSETS = (-16, -1, 1, 16)
+PROMOTION_TYPES = (QUEEN, ROOK, BISHOP, KNIGHT)
+
+
+def square_to_0x88(square):
+    """Convert a python-chess square (0-63) to a 0x88 index"""
+    return square + (square & ~7)
+
+
+def square_from_0x88(square):
+    """Convert a 0x88 index to a python-chess square"""
+    return (square + (square & 7)) >> 1
+
+
+SQUARES = tuple(square for square in range(128) if not square & 0x88)
+
+
+def move_from(move):
+    return move & 0x7F
+
+
+def move_to(move):
+    return move >> 7 & 0x7F
+
+
+def move_promotion(move):
+    return move >> 14 & 0x7
+
+
+def encode_move(from_square, to_square, promotion=0, flags=0):
+    """Pack a move into an int"""
+    return from_square | to_square << 7 | promotion << 14 | flags
+
+
+def _castle_rights_masks():
+    masks = [0xF] * 128
+    masks[0x00] &= ~WHITE_QUEENSIDE
+    masks[0x07] &= ~WHITE_KINGSIDE
+    masks[0x04] &= ~(WHITE_KINGSIDE | WHITE_QUEENSIDE)
+    masks[0x70] &= ~BLACK_QUEENSIDE
+    masks[0x77] &= ~BLACK_KINGSIDE
+    masks[0x74] &= ~(BLACK_KINGSIDE | BLACK_QUEENSIDE)
+    return masks
+
+
+def _piece_square_tables():
+    mg = [0] * (16 * 128)
+    eg = [0] * (16 * 128)
+    for color in (WHITE, BLACK):
+        for piece_type in range(PAWN, KING + 1):
+            piece = piece_type | (BLACK_BIT if color == BLACK else 0)
+            for square in range(64):
+                index = square ^ 56 if color == WHITE else square
+                sign = 1 if color == WHITE else -1
+                value = PIECE_VALUES[piece_type]
+                mg[piece << 7 | square_to_0x88(square)] = sign * (value + MIDDLEGAME_TABLES[piece_type][index])
+                eg[piece << 7 | square_to_0x88(square)] = sign * (value + ENDGAME_TABLES[piece_type][index])
+    return mg, eg
+
+
+def _zobrist_tables():
+    keys = chess.polyglot.POLYGLOT_RANDOM_ARRAY
+    pieces = [0] * (16 * 128)
+    for color in (WHITE, BLACK):
+        for piece_type in range(PAWN, KING + 1):
+            piece = piece_type | (BLACK_BIT if color == BLACK else 0)
+            kind = (piece_type - 1) * 2 + (1 if color == WHITE else 0)
+            for square in range(64):
+                pieces[piece << 7 | square_to_0x88(square)] = keys[64 * kind + square]
+    castling = [0] * 16
+    for rights in range(16):
+        for bit in range(4):
+            if rights & (1 << bit):
+                castling[rights] ^= keys[768 + bit]
+    en_passant = [keys[772 + file] for file in range(8)]
+    return pieces, castling, en_passant, keys[780]
+
+
+CASTLE_RIGHTS_MASKS = _castle_rights_masks()
+MG_TABLE, EG_TABLE = _piece_square_tables()
+ZOBRIST_PIECES, ZOBRIST_CASTLING, ZOBRIST_EN_PASSANT, ZOBRIST_WHITE_TO_MOVE = _zobrist_tables()
+
+
+class Position:
+    """Mutable chess position with make/unmake of packed int moves"""
+
+    __slots__ = (
+        "board", "side", "castling", "ep", "ep_key", "halfmove", "fullmove",
+        "key", "mg", "eg", "phase", "pieces", "kings", "ply",
+        "stack_move", "stack_captured", "stack_castling", "stack_ep", "stack_ep_key",
+        "stack_halfmove", "stack_key", "stack_mg", "stack_eg", "stack_phase",
+    )
+
+    def __init__(self, fen=chess.STARTING_FEN):
+        self.board = [EMPTY] * 128
+        self.kings = [NO_SQUARE, NO_SQUARE]
+        self.ply = 0
+        self.stack_move = [0] * STACK_SIZE
+        self.stack_captured = [EMPTY] * STACK_SIZE
+        self.stack_castling = [0] * STACK_SIZE
+        self.stack_ep = [NO_SQUARE] * STACK_SIZE
+        self.stack_ep_key = [0] * STACK_SIZE
+        self.stack_halfmove = [0] * STACK_SIZE
+        self.stack_key = [0] * STACK_SIZE
+        self.stack_mg = [0] * STACK_SIZE
+        self.stack_eg = [0] * STACK_SIZE
+        self.stack_phase = [0] * STACK_SIZE
+        self.set_fen(fen)
+
+    @classmethod
+    def from_board(cls, board):
+        """Build a position from a python-chess board"""
+        return cls(board.fen())
+
+    def set_fen(self, fen):
+        """Load a position from FEN, resetting the move stack"""
+        parts = fen.split()
+        turn, castling, ep = parts[1:4]
+        board = chess.Board(fen)
+        self.board = [EMPTY] * 128
+        for square, piece in board.piece_map().items():
+            code = piece.piece_type | (0 if piece.color == chess.WHITE else BLACK_BIT)
+            self.board[square_to_0x88(square)] = code
+            if piece.piece_type == chess.KING:
+                self.kings[WHITE if piece.color == chess.WHITE else BLACK] = square_to_0x88(square)
+        self.side = WHITE if turn == "w" else BLACK
+        self.castling = 0
+        for letter, bit in (("K", WHITE_KINGSIDE), ("Q", WHITE_QUEENSIDE),
+                            ("k", BLACK_KINGSIDE), ("q", BLACK_QUEENSIDE)):
+            if letter in castling:
+                self.castling |= bit
+        self.ep = NO_SQUARE if ep == "-" else square_to_0x88(chess.parse_square(ep))
+        self.halfmove = board.halfmove_clock
+        self.fullmove = board.fullmove_number
+        self.ply = 0
+        self.refresh()
+
+    def refresh(self):
+        """Recompute the Zobrist key and evaluation terms from scratch"""
+        key = mg = eg = phase = pieces = 0
+        for square in range(128):
+            piece = self.board[square]
+            if piece:
+                pieces += 1
+                key ^= ZOBRIST_PIECES[piece << 7 | square]
+                mg += MG_TABLE[piece << 7 | square]
+                eg += EG_TABLE[piece << 7 | square]
+                phase += PHASE_WEIGHTS[piece & 7]
+        key ^= ZOBRIST_CASTLING[self.castling]
+        self.ep_key = self.en_passant_key(self.ep)
+        key ^= self.ep_key
+        if self.side == WHITE:
+            key ^= ZOBRIST_WHITE_TO_MOVE
+        self.key, self.mg, self.eg, self.phase = key, mg, eg, phase
+        self.pieces = pieces
+
+    def en_passant_key(self, ep):
+        """Polyglot only hashes the en passant file if a pawn can capture there"""
+        if ep == NO_SQUARE:
+            return 0
+        board = self.board
+        if self.side == WHITE:
+            pawn, pushed = PAWN, ep - 16
+        else:
+            pawn, pushed = PAWN | BLACK_BIT, ep + 16
+        for neighbour in (pushed - 1, pushed + 1):
+            if not neighbour & 0x88 and board[neighbour] == pawn:
+                return ZOBRIST_EN_PASSANT[ep & 7]
+        return 0
+
+    def fen(self):
+        """Return the FEN of the current position"""
+        return self.to_board().fen()
+
+    def to_board(self):
+        """Build an equivalent python-chess board (without move history)"""
+        board = chess.Board(None)
+        for square in range(64):
+            piece = self.board[square_to_0x88(square)]
+            if piece:
+                board.set_piece_at(square, chess.Piece(piece & 7, not piece & BLACK_BIT))
+        board.turn = chess.WHITE if self.side == WHITE else chess.BLACK
+        fen_castling = ""
+        for letter, bit in (("K", WHITE_KINGSIDE), ("Q", WHITE_QUEENSIDE),
+                            ("k", BLACK_KINGSIDE), ("q", BLACK_QUEENSIDE)):
+            if self.castling & bit:
+                fen_castling += letter
+        board.set_castling_fen(fen_castling or "-")
+        board.ep_square = None if self.ep == NO_SQUARE else square_from_0x88(self.ep)
+        board.halfmove_clock = self.halfmove
+        board.fullmove_number = self.fullmove
+        return board
+
+    def to_chess_move(self, move):
+        """Convert a packed move to a chess.Move"""
+        return chess.Move(
+            square_from_0x88(move_from(move)),
+            square_from_0x88(move_to(move)),
+            move_promotion(move) or None,
+        )
+
+    def from_chess_move(self, chess_move):
+        """Find the packed legal move matching a chess.Move, or None"""
+        from_square = square_to_0x88(chess_move.from_square)
+        to_square = square_to_0x88(chess_move.to_square)
+        promotion = chess_move.promotion or 0
+        for move in self.legal_moves():
+            if (move_from(move) == from_square and move_to(move) == to_square
+                    and move_promotion(move) == promotion):
+                return move
+        return None
+
+    def evaluate(self):
+        """Incrementally maintained evaluation from the side to move's view"""
+        score = taper(self.mg, self.eg, self.phase)
+        return score if self.side == WHITE else -score
+
+    def is_attacked(self, square, by_color):
+        """Whether `square` is attacked by any piece of `by_color`"""
+        board = self.board
+        color_bit = BLACK_BIT if by_color == BLACK else 0
+        if by_color == WHITE:
+            for origin in (square - 15, square - 17):
+                if not origin & 0x88 and board[origin] == PAWN:
+                    return True
+        else:
+            for origin in (square + 15, square + 17):
+                if not origin & 0x88 and board[origin] == PAWN | BLACK_BIT:
+                    return True
+        knight = KNIGHT | color_bit
+        for offset in KNIGHT_OFFSETS:
+            origin = square + offset
+            if not origin & 0x88 and board[origin] == knight:
+                return True
+        king = KING | color_bit
+        for offset in KING_OFFSETS:
+            origin = square + offset
+            if not origin & 0x88 and board[origin] == king:
+                return True
+        bishop, rook, queen = BISHOP | color_bit, ROOK | color_bit, QUEEN | color_bit
+        for offset in DIAGONAL_OFFSETS:
+            origin = square + offset
+            while not origin & 0x88:
+                piece = board[origin]
+                if piece:
+                    if piece == bishop or piece == queen:
+                        return True
+                    break
+                origin += offset
+        for offset in ORTHOGONAL_OFFSETS:
+            origin = square + offset
+            while not origin & 0x88:
+                piece = board[origin]
+                if piece:
+                    if piece == rook or piece == queen:
+                        return True
+                    break
+                origin += offset
+        return False
+
+    def in_check(self):
+        return self.is_attacked(self.kings[self.side], self.side ^ 1)
+
+    def generate_moves(self, captures_only=False):
+        """Generate pseudo-legal moves; captures_only also keeps promotions"""
+        board = self.board
+        side = self.side
+        own_bit = BLACK_BIT if side == BLACK else 0
+        moves = []
+        append = moves.append
+        if side == WHITE:
+            forward, start_rank, last_rank = 16, 1, 7
+        else:
+            forward, start_rank, last_rank = -16, 6, 0
+        ep = self.ep
+
+        for square in SQUARES:
+            piece = board[square]
+            if not piece or (piece & BLACK_BIT) != own_bit:
+                continue
+            piece_type = piece & 7
+
+            if piece_type == PAWN:
+                target = square + forward
+                if not board[target]:
+                    if target >> 4 == last_rank:
+                        for promotion in PROMOTION_TYPES:
+                            append(square | target << 7 | promotion << 14)
+                    elif not captures_only:
+                        append(square | target << 7)
+                        if square >> 4 == start_rank and not board[target + forward]:
+                            append(square | (target + forward) << 7 | FLAG_DOUBLE_PUSH)
+                for target in (square + forward - 1, square + forward + 1):
+                    if target & 0x88:
+                        continue
+                    victim = board[target]
+                    if victim and (victim & BLACK_BIT) != own_bit:
+                        if target >> 4 == last_rank:
+                            for promotion in PROMOTION_TYPES:
+                                append(square | target << 7 | promotion << 14 | FLAG_CAPTURE)
+                        else:
+                            append(square | target << 7 | FLAG_CAPTURE)
+                    elif target == ep:
+                        append(square | target << 7 | FLAG_CAPTURE | FLAG_EN_PASSANT)
+
+            elif piece_type == KNIGHT or piece_type == KING:
+                for offset in (KNIGHT_OFFSETS if piece_type == KNIGHT else KING_OFFSETS):
+                    target = square + offset
+                    if target & 0x88:
+                        continue
+                    victim = board[target]
+                    if not victim:
+                        if not captures_only:
+                            append(square | target << 7)
+                    elif (victim & BLACK_BIT) != own_bit:
+                        append(square | target << 7 | FLAG_CAPTURE)
+
+            else:
+                if piece_type == BISHOP:
+                    offsets = DIAGONAL_OFFSETS
+                elif piece_type == ROOK:
+                    offsets = ORTHOGONAL_OFFSETS
+                else:
+                    offsets = KING_OFFSETS
+                for offset in offsets:
+                    target = square + offset
+                    while not target & 0x88:
+                        victim = board[target]
+                        if not victim:
+                            if not captures_only:
+                                append(square | target << 7)
+                        else:
+                            if (victim & BLACK_BIT) != own_bit:
+                                append(square | target << 7 | FLAG_CAPTURE)
+                            break
+                        target += offset
+
+        if not captures_only and self.castling:
+            self.generate_castling(append)
+        return moves
+
+    def generate_castling(self, append):
+        board = self.board
+        castling = self.castling
+        if self.side == WHITE:
+            kingside, queenside, home, enemy = WHITE_KINGSIDE, WHITE_QUEENSIDE, 0x04, BLACK
+        else:
+            kingside, queenside, home, enemy = BLACK_KINGSIDE, BLACK_QUEENSIDE, 0x74, WHITE
+        if not castling & (kingside | queenside) or self.is_attacked(home, enemy):
+            return
+        if (castling & kingside and not board[home + 1] and not board[home + 2]
+                and not self.is_attacked(home + 1, enemy) and not self.is_attacked(home + 2, enemy)):
+            append(home | (home + 2) << 7 | FLAG_CASTLE)
+        if (castling & queenside and not board[home - 1] and not board[home - 2] and not board[home - 3]
+                and not self.is_attacked(home - 1, enemy) and not self.is_attacked(home - 2, enemy)):
+            append(home | (home - 2) << 7 | FLAG_CASTLE)
+
+    def legal_moves(self):
+        """Generate fully legal moves"""
+        legal = []
+        for move in self.generate_moves():
+            if self.make(move):
+                legal.append(move)
+            self.unmake(move)
+        return legal
+
+    def make(self, move):
+        """Play a move; returns False if it leaves the mover's king in check
+
+        The move is played either way, so every make must be paired with an
+        unmake.
+        """
+        board = self.board
+        ply = self.ply
+        from_square = move & 0x7F
+        to_square = move >> 7 & 0x7F
+        piece = board[from_square]
+        side = self.side
+
+        self.stack_move[ply] = move
+        self.stack_castling[ply] = self.castling
+        self.stack_ep[ply] = self.ep
+        self.stack_ep_key[ply] = self.ep_key
+        self.stack_halfmove[ply] = self.halfmove
+        self.stack_key[ply] = self.key
+        self.stack_mg[ply] = self.mg
+        self.stack_eg[ply] = self.eg
+        self.stack_phase[ply] = self.phase
+
+        key = self.key ^ self.ep_key ^ ZOBRIST_CASTLING[self.castling] ^ ZOBRIST_WHITE_TO_MOVE
+        mg, eg = self.mg, self.eg
+
+        captured = EMPTY
+        if move & FLAG_CAPTURE:
+            if move & FLAG_EN_PASSANT:
+                captured_square = to_square - 16 if side == WHITE else to_square + 16
+            else:
+                captured_square = to_square
+            captured = board[captured_square]
+            board[captured_square] = EMPTY
+            index = captured << 7 | captured_square
+            key ^= ZOBRIST_PIECES[index]
+            mg -= MG_TABLE[index]
+            eg -= EG_TABLE[index]
+            self.phase -= PHASE_WEIGHTS[captured & 7]
+            self.pieces -= 1
+        self.stack_captured[ply] = captured
+
+        index = piece << 7 | from_square
+        key ^= ZOBRIST_PIECES[index]
+        mg -= MG_TABLE[index]
+        eg -= EG_TABLE[index]
+        board[from_square] = EMPTY
+
+        promotion = move >> 14 & 0x7
+        if promotion:
+            placed = promotion | (piece & BLACK_BIT)
+            self.phase += PHASE_WEIGHTS[promotion]
+        else:
+            placed = piece
+        board[to_square] = placed
+        index = placed << 7 | to_square
+        key ^= ZOBRIST_PIECES[index]
+        mg += MG_TABLE[index]
+        eg += EG_TABLE[index]
+
+        if piece & 7 == KING:
+            self.kings[side] = to_square
+            if move & FLAG_CASTLE:
+                if to_square > from_square:
+                    rook_from, rook_to = from_square + 3, from_square + 1
+                else:
+                    rook_from, rook_to = from_square - 4, from_square - 1
+                rook = board[rook_from]
+                board[rook_from] = EMPTY
+                board[rook_to] = rook
+                key ^= ZOBRIST_PIECES[rook << 7 | rook_from] ^ ZOBRIST_PIECES[rook << 7 | rook_to]
+                mg += MG_TABLE[rook << 7 | rook_to] - MG_TABLE[rook << 7 | rook_from]
+                eg += EG_TABLE[rook << 7 | rook_to] - EG_TABLE[rook << 7 | rook_from]
+
+        self.castling &= CASTLE_RIGHTS_MASKS[from_square] & CASTLE_RIGHTS_MASKS[to_square]
+        key ^= ZOBRIST_CASTLING[self.castling]
+
+        if piece & 7 == PAWN or captured:
+            self.halfmove = 0
+        else:
+            self.halfmove += 1
+        if side == BLACK:
+            self.fullmove += 1
+
+        self.side = side ^ 1
+        if move & FLAG_DOUBLE_PUSH:
+            self.ep = (from_square + to_square) >> 1
+            self.ep_key = self.en_passant_key(self.ep)
+            key ^= self.ep_key
+        else:
+            self.ep = NO_SQUARE
+            self.ep_key = 0
+
+        self.key, self.mg, self.eg = key, mg, eg
+        self.ply = ply + 1
+        return not self.is_attacked(self.kings[side], side ^ 1)
+
+    def unmake(self, move):
+        """Take back the last move played with make"""
+        board = self.board
+        ply = self.ply - 1
+        self.ply = ply
+        side = self.side ^ 1
+        self.side = side
+        from_square = move & 0x7F
+        to_square = move >> 7 & 0x7F
+
+        piece = board[to_square]
+        if move >> 14 & 0x7:
+            piece = PAWN | (piece & BLACK_BIT)
+        board[from_square] = piece
+        board[to_square] = EMPTY
+
+        captured = self.stack_captured[ply]
+        if captured:
+            self.pieces += 1
+            if move & FLAG_EN_PASSANT:
+                board[to_square - 16 if side == WHITE else to_square + 16] = captured
+            else:
+                board[to_square] = captured
+
+        if piece & 7 == KING:
+            self.kings[side] = from_square
+            if move & FLAG_CASTLE:
+                if to_square > from_square:
+                    rook_from, rook_to = from_square + 3, from_square + 1
+                else:
+                    rook_from, rook_to = from_square - 4, from_square - 1
+                board[rook_from] = board[rook_to]
+                board[rook_to] = EMPTY
+
+        if side == BLACK:
+            self.fullmove -= 1
+        self.castling = self.stack_castling[ply]
+        self.ep = self.stack_ep[ply]
+        self.ep_key = self.stack_ep_key[ply]
+        self.halfmove = self.stack_halfmove[ply]
+        self.key = self.stack_key[ply]
+        self.mg = self.stack_mg[ply]
+        self.eg = self.stack_eg[ply]
+        self.phase = self.stack_phase[ply]
+
+    def undo_to(self, ply):
+        """Unmake moves until the stack is back at `ply`"""
+        while self.ply > ply:
+            self.unmake(self.stack_move[self.ply - 1])
+
+    def is_repetition(self):
+        """Whether the current position already occurred since the last irreversible move"""
+        key = self.key
+        stack_key = self.stack_key
+        oldest = max(0, self.ply - self.halfmove)
+        for ply in range(self.ply - 2, oldest - 1, -2):
+            if stack_key[ply] == key:
+                return True
+        return False
+
+
+def perft(position, depth):
+    """Count leaf nodes of the legal move tree to `depth`"""
+    if depth == 0:
+        return 1
+    nodes = 0
+    for move in position.generate_moves():
+        if position.make(move):
+            nodes += 1 if depth == 1 else perft(position, depth - 1)
+        position.unmake(move)
+    return nodes
@@ -0,0 +1,391 @@
+"""Iterative-deepening alpha-beta search with a hard time and node budget"""
+import time
+from collections import namedtuple
+
+import chess.polyglot
+
+from engine.evaluate import PIECE_VALUES
+from engine.position import FLAG_CAPTURE, Position
+from engine.tt import EXACT, LOWER_BOUND, NO_MOVE, UPPER_BOUND, TranspositionTable
+
+MATE_SCORE = 100000
+MATE_BOUND = MATE_SCORE - 1000
+# Tablebase wins rank below any mate the search finds itself
+TABLEBASE_WIN = MATE_BOUND - 1000
+INFINITY = MATE_SCORE + 1
+MAX_PLY = 64
+
+# How often (in nodes) the clock is consulted
+CHECK_EVERY = 1024
+
+HASH_MOVE_KEY = 1 << 30
+CAPTURE_KEY = 1 << 20
+KILLER_KEY = 1 << 19
+
+SearchLimits = namedtuple("SearchLimits", ["time", "nodes", "depth"])
+SearchLimits.__new__.__defaults__ = (None, None, MAX_PLY)
+
+SearchResult = namedtuple(
+    "SearchResult", ["move", "score", "depth", "nodes", "time", "pv"]
+)
+
+
+def nodes_per_second(result):
+    """Search throughput of a finished search"""
+    return int(result.nodes / result.time) if result.time > 0 else 0
+
+
+def score_to_tt(score, ply):
+    """Make mate scores relative to the stored node rather than the root"""
+    if score >= MATE_BOUND:
+        return score + ply
+    if score <= -MATE_BOUND:
+        return score - ply
+    return score
+
+
+def score_from_tt(score, ply):
+    """Inverse of score_to_tt"""
+    if score >= MATE_BOUND:
+        return score - ply
+    if score <= -MATE_BOUND:
+        return score + ply
+    return score
+
+
+def game_history(board):
+    """Zobrist keys of the positions before `board`'s since the last capture or pawn move
+
+    Taken from the board's move stack, oldest first; a board set up from a
+    FEN has none.
+    """
+    board = board.copy()
+    keys = []
+    for _ in range(min(board.halfmove_clock, len(board.move_stack))):
+        board.pop()
+        keys.append(chess.polyglot.zobrist_hash(board))
+    keys.reverse()
+    return tuple(keys)
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search once the budget is exhausted"""
+
+
+class Searcher:
+    """Negamax alpha-beta searcher with quiescence and move ordering heuristics"""
+
+    def __init__(self, tt=None, tablebase=None):
+        self.tt = tt if tt is not None else TranspositionTable()
+        self.tablebase = tablebase
+        self.nodes = 0
+        self.killers = [[NO_MOVE, NO_MOVE] for _ in range(MAX_PLY + 1)]
+        self.history = {}
+        self.deadline = None
+        self.node_limit = None
+        self.iteration_best = None
+        # Set from another thread to end the current search early; the
+        # caller clears it before starting the next one
+        self.stopped = False
+        # Optional callable(position, depth, score, pv) run after each iteration
+        self.on_iteration = None
+        # Root moves left out of the search, for multi-PV
+        self.excluded = ()
+        # Keys of game positions before the root that may still repeat
+        self.game_keys = frozenset()
+
+    def reset_heuristics(self):
+        """Clear killer moves and age the history table between searches"""
+        self.killers = [[NO_MOVE, NO_MOVE] for _ in range(MAX_PLY + 1)]
+        self.history = {key: value // 8 for key, value in self.history.items() if value >= 8}
+
+    def stop(self):
+        """Ask a running search to return its best move so far"""
+        self.stopped = True
+
+    def search(self, board, limits, history=None):
+        """Search a chess.Board within `limits` and return a SearchResult of chess.Moves
+
+        `history` holds the keys of the game's positions before this one
+        since the last capture or pawn move (see game_history(), the
+        default); returning to any of them scores as a draw, as does a
+        repetition inside the tree.
+        """
+        position = Position.from_board(board)
+        self.game_keys = frozenset(game_history(board) if history is None else history)
+        try:
+            move, score, depth, pv = self.search_position(position, limits)
+        finally:
+            self.game_keys = frozenset()
+        elapsed = time.perf_counter() - self.start
+        return SearchResult(
+            position.to_chess_move(move) if move != NO_MOVE else None,
+            score,
+            depth,
+            self.nodes,
+            elapsed,
+            [position.to_chess_move(pv_move) for pv_move in pv],
+        )
+
+    def search_lines(self, board, limits, count):
+        """The best `count` root moves of a chess.Board (multi-PV), best first
+
+        Each line is a full search with the moves of the earlier lines left
+        out at the root; `limits` is the budget of all lines together. The
+        later searches start from a warm transposition table and stop at
+        the depth the first one reached.
+        """
+        position = Position.from_board(board)
+        split = SearchLimits(
+            limits.time / count if limits.time else None,
+            max(1, limits.nodes // count) if limits.nodes else None,
+            limits.depth,
+        )
+        lines = []
+        excluded = []
+        try:
+            for _ in range(count):
+                self.excluded = excluded
+                move, score, depth, pv = self.search_position(position, split)
+                if move == NO_MOVE:
+                    break
+                lines.append(SearchResult(
+                    position.to_chess_move(move), score, depth, self.nodes,
+                    time.perf_counter() - self.start,
+                    [position.to_chess_move(pv_move) for pv_move in pv],
+                ))
+                excluded.append(move)
+                # Later lines go no deeper than the first, so scores compare
+                split = split._replace(depth=max(depth, 1))
+        finally:
+            self.excluded = ()
+        return lines
+
+    def search_position(self, position, limits):
+        """Iterative deepening on an engine Position; returns (move, score, depth, pv)"""
+        self.nodes = 0
+        self.reset_heuristics()
+        self.tt.new_search()
+        self.start = time.perf_counter()
+        self.deadline = self.start + limits.time if limits.time else None
+        self.node_limit = limits.nodes
+
+        legal_moves = position.legal_moves()
+        if self.excluded:
+            legal_moves = [move for move in legal_moves if move not in self.excluded]
+        if not legal_moves:
+            return NO_MOVE, 0, 0, []
+
+        best_move = legal_moves[0]
+        entry = self.tt.probe(position.key)
+        if entry is not None and entry[0] in legal_moves:
+            best_move = entry[0]
+        best_score = 0
+        completed_depth = 0
+        pv = [best_move]
+        max_depth = min(limits.depth or MAX_PLY, MAX_PLY)
+        root_ply = position.ply
+
+        for depth in range(1, max_depth + 1):
+            self.iteration_best = None
+            try:
+                score, move = self.search_root(position, legal_moves, depth, best_move)
+            except SearchTimeout:
+                position.undo_to(root_ply)
+                # The previous best move is searched first, so any move that
+                # beat it in the unfinished iteration is a genuine improvement
+                if self.iteration_best is not None and self.iteration_best[1] != best_move:
+                    best_score, best_move = self.iteration_best
+                    pv = [best_move]
+                break
+            best_move, best_score, completed_depth = move, score, depth
+            pv = self.principal_variation(position, best_move, depth)
+            if self.on_iteration is not None:
+                self.on_iteration(position, depth, score, pv)
+            # A forced mate cannot be improved upon by searching deeper
+            if abs(score) >= MATE_BOUND or len(legal_moves) == 1:
+                break
+
+        return best_move, best_score, completed_depth, pv
+
+    def search_root(self, position, legal_moves, depth, previous_best):
+        """Search every root move to `depth`, trying the previous best move first"""
+        legal_moves.sort(key=lambda move: self.order_key(position, move, 0, previous_best), reverse=True)
+        alpha, beta = -INFINITY, INFINITY
+        best_move = legal_moves[0]
+        for move in legal_moves:
+            position.make(move)
+            score = -self.negamax(position, depth - 1, -beta, -alpha, 1)
+            position.unmake(move)
+            if score > alpha:
+                alpha = score
+                best_move = move
+                self.iteration_best = (score, move)
+        # With root moves excluded the score is not the position's true value
+        if not self.excluded:
+            self.tt.store(position.key, best_move, depth, EXACT, alpha)
+        return alpha, best_move
+
+    def negamax(self, position, depth, alpha, beta, ply):
+        """Principal alpha-beta search returning a score for the side to move"""
+        self.count_node()
+
+        if position.halfmove >= 100 or position.is_repetition() or position.key in self.game_keys:
+            return 0
+
+        # Probe right after captures and pawn moves, like most engines: the
+        # result is exact and the probes stay few
+        tablebase = self.tablebase
+        if (tablebase is not None and position.halfmove == 0
+                and position.pieces <= tablebase.max_pieces and not position.castling):
+            wdl = tablebase.probe_position(position)
+            if wdl is not None:
+                if wdl == 2:
+                    return TABLEBASE_WIN - ply
+                if wdl == -2:
+                    return -TABLEBASE_WIN + ply
+                return wdl
+
+        in_check = position.in_check()
+        if in_check:
+            depth += 1
+        if depth <= 0 or ply >= MAX_PLY:
+            return self.quiescence(position, alpha, beta, ply)
+
+        key = position.key
+        hash_move = NO_MOVE
+        entry = self.tt.probe(key)
+        if entry is not None:
+            hash_move, entry_depth, bound, entry_score = entry
+            if entry_depth >= depth:
+                score = score_from_tt(entry_score, ply)
+                if (bound == EXACT
+                        or (bound == LOWER_BOUND and score >= beta)
+                        or (bound == UPPER_BOUND and score <= alpha)):
+                    return score
+
+        moves = position.generate_moves()
+        moves.sort(key=lambda move: self.order_key(position, move, ply, hash_move), reverse=True)
+
+        original_alpha = alpha
+        best_score = -INFINITY
+        best_move = NO_MOVE
+        legal = 0
+        for move in moves:
+            if not position.make(move):
+                position.unmake(move)
+                continue
+            legal += 1
+            score = -self.negamax(position, depth - 1, -beta, -alpha, ply + 1)
+            position.unmake(move)
+            if score > best_score:
+                best_score = score
+                best_move = move
+            if score >= beta:
+                if not move & FLAG_CAPTURE:
+                    self.store_killer(move, ply)
+                    history_key = (position.side, move & 0x3FFF)
+                    self.history[history_key] = self.history.get(history_key, 0) + depth * depth
+                self.tt.store(key, move, depth, LOWER_BOUND, score_to_tt(score, ply))
+                return score
+            if score > alpha:
+                alpha = score
+
+        if not legal:
+            return -MATE_SCORE + ply if in_check else 0
+
+        bound = EXACT if alpha > original_alpha else UPPER_BOUND
+        stored_move = best_move if bound == EXACT else NO_MOVE
+        self.tt.store(key, stored_move, depth, bound, score_to_tt(best_score, ply))
+        return best_score
+
+    def quiescence(self, position, alpha, beta, ply):
+        """Resolve captures and promotions until the position is quiet"""
+        self.count_node()
+
+        stand_pat = position.evaluate()
+        if stand_pat >= beta:
+            return beta
+        if stand_pat > alpha:
+            alpha = stand_pat
+        if ply >= MAX_PLY:
+            return alpha
+
+        moves = position.generate_moves(captures_only=True)
+        moves.sort(key=lambda move: self.capture_key(position, move), reverse=True)
+        for move in moves:
+            if not position.make(move):
+                position.unmake(move)
+                continue
+            score = -self.quiescence(position, -beta, -alpha, ply + 1)
+            position.unmake(move)
+            if score >= beta:
+                return beta
+            if score > alpha:
+                alpha = score
+        return alpha
+
+    def count_node(self):
+        """Count a node and abort the search once the budget runs out"""
+        self.nodes += 1
+        if self.nodes % CHECK_EVERY == 0:
+            if self.stopped:
+                raise SearchTimeout()
+            if self.node_limit is not None and self.nodes >= self.node_limit:
+                raise SearchTimeout()
+            if self.deadline is not None and time.perf_counter() >= self.deadline:
+                raise SearchTimeout()
+
+    def capture_key(self, position, move):
+        """Most valuable victim, least valuable attacker, plus promotion value"""
+        board = position.board
+        key = 0
+        if move & FLAG_CAPTURE:
+            victim = board[move >> 7 & 0x7F] & 7 or 1  # en passant captures a pawn
+            attacker = board[move & 0x7F] & 7
+            key = PIECE_VALUES[victim] * 10 - PIECE_VALUES[attacker] // 10
+        promotion = move >> 14 & 0x7
+        if promotion:
+            key += PIECE_VALUES[promotion]
+        return key
+
+    def order_key(self, position, move, ply, hash_move):
+        """Ordering key: hash move, captures by MVV-LVA, killers, then history"""
+        if move == hash_move:
+            return HASH_MOVE_KEY
+        if move & FLAG_CAPTURE or move >> 14 & 0x7:
+            return CAPTURE_KEY + self.capture_key(position, move)
+        killers = self.killers[ply]
+        if move == killers[0]:
+            return KILLER_KEY + 1
+        if move == killers[1]:
+            return KILLER_KEY
+        history = self.history.get((position.side, move & 0x3FFF), 0)
+        return min(history, KILLER_KEY - 1)
+
+    def store_killer(self, move, ply):
+        """Remember a quiet move that caused a beta cutoff at this ply"""
+        killers = self.killers[ply]
+        if move != killers[0]:
+            killers[1] = killers[0]
+            killers[0] = move
+
+    def principal_variation(self, position, best_move, depth):
+        """Follow best moves through the transposition table"""
+        pv = [best_move]
+        played = [best_move]
+        position.make(best_move)
+        seen = {position.key}
+        while len(pv) < depth:
+            entry = self.tt.probe(position.key)
+            if entry is None or entry[0] not in position.legal_moves():
+                break
+            position.make(entry[0])
+            played.append(entry[0])
+            pv.append(entry[0])
+            if position.key in seen:
+                break
+            seen.add(position.key)
+        for move in reversed(played):
+            position.unmake(move)
+        return pv
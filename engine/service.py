@@ -0,0 +1,403 @@
+"""Server-wide engine service shared by every Streamlit session
+
+Move requests are queued per session and handed to a fixed pool of worker
+processes in round-robin order across sessions, so one busy session cannot
+starve the others. When the queue grows longer than the pool, searches are
+given a smaller budget instead of letting everyone's latency explode.
+
+While a human is thinking, the service can ponder: search the position
+after the reply the engine expects, with the budget the real move will
+get. Ponder searches only run on idle workers, never on more than
+`ponder_workers` of them, and their result answers the session's next
+move request instantly if the prediction was right.
+
+Game analysis (evaluating every position of a game) is the lowest
+priority: it runs on at most `analysis_workers` idle workers, and its
+results are cached by position so re-analysing a game after a take-back
+or a new move only searches the positions not seen before.
+"""
+import math
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import chess
+import chess.polyglot
+
+from engine.search import SearchLimits
+from engine.worker import analyse, think
+
+# Searches never get less than this, even past their deadline
+MIN_SEARCH_TIME = 0.05
+
+# Number of recent queue waits kept for the wait-time statistics
+WAIT_SAMPLES = 512
+
+# Sessions whose ponder result is kept; sessions that never move again
+# (closed tabs) fall off the end
+PONDER_SESSIONS = 256
+
+# Seconds a ponder may wait for an idle worker; an older one most likely
+# belongs to a closed tab and is dropped instead of taking the next worker
+PONDER_MAX_AGE = 60.0
+
+
+class MoveRequest:
+    """A queued search of one position on behalf of one session
+
+    Ponder and analysis searches have no deadline; analysis requests have
+    the number of lines to find in `multipv` and their cache key in `key`.
+    `history` holds the keys of earlier game positions that may repeat.
+    """
+
+    __slots__ = ("session_id", "fen", "limits", "deadline", "submitted", "future", "multipv", "key", "history")
+
+    def __init__(self, session_id, fen, limits, deadline, multipv=None, key=None, history=()):
+        self.session_id = session_id
+        self.fen = fen
+        self.limits = limits
+        self.deadline = deadline
+        self.submitted = time.monotonic()
+        self.future = Future()
+        self.multipv = multipv
+        self.key = key
+        self.history = history
+
+
+def degrade_limits(limits, load, remaining):
+    """Shrink a search budget according to queue load and time left before the deadline"""
+    scale = 1.0 if load <= 1 else 1.0 / load
+    depth_cut = 0 if load <= 1 else math.ceil(math.log2(load))
+    search_time = limits.time * scale if limits.time else remaining
+    search_time = max(MIN_SEARCH_TIME, min(search_time, remaining))
+    nodes = max(1, int(limits.nodes * scale)) if limits.nodes else None
+    depth = max(1, (limits.depth or 1) - depth_cut)
+    return SearchLimits(time=search_time, nodes=nodes, depth=depth)
+
+
+class EngineService:
+    """Fair, deadline-aware scheduler in front of a fixed worker process pool"""
+
+    def __init__(self, workers, options, deadline_slack=5.0, ponder_workers=0,
+                 analysis_workers=None, analysis_cache_size=20000):
+        self.workers = workers
+        self.options = options
+        self.deadline_slack = deadline_slack
+        self.ponder_workers = min(ponder_workers, workers)
+        self.analysis_workers = workers if analysis_workers is None else min(analysis_workers, workers)
+        self.analysis_cache_size = analysis_cache_size
+        # Spawned workers avoid forking the web server's threads
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        self.queues = OrderedDict()
+        self.queued = 0
+        self.free_slots = workers
+        self.condition = threading.Condition()
+        self.started = time.monotonic()
+        self.waits = deque(maxlen=WAIT_SAMPLES)
+        self.busy_seconds = {}
+        self.completed = 0
+        self.degraded = 0
+        # Ponder requests: one per session, queued until a worker is idle
+        self.ponders = OrderedDict()
+        self.ponder_queue = OrderedDict()
+        self.pondering = 0
+        self.ponder_hits = 0
+        self.ponder_misses = 0
+        # Analysis requests, round-robin across sessions like moves, and
+        # their futures by (position hash, limits, lines), least recent first
+        self.analysis_queues = OrderedDict()
+        self.analysis_queued = 0
+        self.analysing = 0
+        self.analysis_cache = OrderedDict()
+        self.analysis_hits = 0
+        self.dispatcher = threading.Thread(target=self.dispatch_loop, name="engine-dispatcher", daemon=True)
+        self.dispatcher.start()
+
+    def submit(self, session_id, board, limits, history=()):
+        """Queue a search of `board`; returns a Future for the worker's result
+
+        `history` is the Zobrist keys of the game's positions before `board`
+        since the last capture or pawn move, which the search scores as draws.
+        """
+        deadline = time.monotonic() + (limits.time or 0) + self.deadline_slack
+        request = MoveRequest(session_id, board.fen(), limits, deadline, history=tuple(history))
+        with self.condition:
+            ponder = self.take_ponder(session_id)
+            if ponder is not None:
+                if ponder.fen == request.fen and ponder.limits == limits and ponder.history == request.history:
+                    self.ponder_hits += 1
+                    ponder.future.add_done_callback(
+                        lambda done, request=request: self.answer_from_ponder(request, done)
+                    )
+                    return request.future
+                self.ponder_misses += 1
+            self.queues.setdefault(session_id, deque()).append(request)
+            self.queued += 1
+            self.condition.notify()
+        return request.future
+
+    def ponder(self, session_id, board, predicted_move, limits, history=()):
+        """Search the position after `predicted_move` in the background
+
+        The result is kept for the session's next `submit`, replacing any
+        earlier ponder of the session. Does nothing when pondering is off.
+        `history` is as for `submit`, for `board`.
+        """
+        if not self.ponder_workers:
+            return
+        predicted = board.copy(stack=False)
+        predicted.push(predicted_move)
+        if predicted.is_game_over():
+            return
+        # The history the next submit will send: `board` joins it unless the move was irreversible
+        history = () if predicted.halfmove_clock == 0 else tuple(history) + (chess.polyglot.zobrist_hash(board),)
+        request = MoveRequest(session_id, predicted.fen(), limits, None, history=history)
+        with self.condition:
+            self.take_ponder(session_id)
+            self.ponders[session_id] = request
+            self.ponder_queue[session_id] = request
+            while len(self.ponders) > PONDER_SESSIONS:
+                _, stale = self.ponders.popitem(last=False)
+                self.withdraw_ponder(stale)
+            self.condition.notify()
+
+    def take_ponder(self, session_id):
+        """Remove a session's ponder and return it if its search has started
+
+        The caller holds the lock. A ponder still waiting for an idle worker
+        is withdrawn; one that is running finishes in its worker, as
+        cancelled searches do, and its result is dropped unless claimed.
+        """
+        request = self.ponders.pop(session_id, None)
+        if request is None or self.withdraw_ponder(request):
+            return None
+        return request
+
+    def withdraw_ponder(self, request):
+        """Take a ponder off the queue if it has not started; True if it was queued"""
+        if self.ponder_queue.get(request.session_id) is not request:
+            return False
+        del self.ponder_queue[request.session_id]
+        request.future.cancel()
+        return True
+
+    def answer_from_ponder(self, request, ponder_future):
+        """Resolve a move request with the result of the matching ponder search"""
+        if not request.future.set_running_or_notify_cancel():
+            return
+        error = ponder_future.exception()
+        if error is not None:
+            request.future.set_exception(error)
+            return
+        result = dict(ponder_future.result())
+        result["queue_wait"] = time.monotonic() - request.submitted
+        result["ponder_hit"] = True
+        request.future.set_result(result)
+
+    def analyse(self, session_id, board, limits, multipv=1):
+        """Queue an evaluation of `board` with its best `multipv` lines; returns a Future
+
+        A position analysed before with the same budget, by any session,
+        returns the cached (or still pending) future instead of searching
+        again. The result's scores are from the side to move's point of view.
+        """
+        key = (chess.polyglot.zobrist_hash(board), limits, multipv)
+        with self.condition:
+            future = self.analysis_cache.get(key)
+            if future is not None and not future.cancelled():
+                self.analysis_cache.move_to_end(key)
+                self.analysis_hits += 1
+                return future
+            request = MoveRequest(session_id, board.fen(), limits, None, multipv, key)
+            self.analysis_cache[key] = request.future
+            while len(self.analysis_cache) > self.analysis_cache_size:
+                self.analysis_cache.popitem(last=False)
+            self.analysis_queues.setdefault(session_id, deque()).append(request)
+            self.analysis_queued += 1
+            self.condition.notify()
+        return request.future
+
+    def cancel_analysis(self, session_id):
+        """Drop a session's queued analysis requests; running ones finish and stay cached"""
+        with self.condition:
+            queue = self.analysis_queues.pop(session_id, None)
+            if queue:
+                self.analysis_queued -= len(queue)
+                for request in queue:
+                    request.future.cancel()
+                    if self.analysis_cache.get(request.key) is request.future:
+                        del self.analysis_cache[request.key]
+
+    def cancel(self, session_id):
+        """Drop every queued request of a session, and its ponder search"""
+        with self.condition:
+            self.take_ponder(session_id)
+            queue = self.queues.pop(session_id, None)
+            if queue:
+                self.queued -= len(queue)
+                for request in queue:
+                    request.future.cancel()
+
+    def next_request(self, queues):
+        """Pop the next request from per-session `queues`, taking sessions in round-robin order"""
+        session_id, queue = queues.popitem(last=False)
+        request = queue.popleft()
+        if queue:
+            # The session goes to the back of the line for its next request
+            queues[session_id] = queue
+        return request
+
+    def ponder_ready(self):
+        """Whether a ponder may start: no move is waiting and the ponder cap allows it"""
+        self.expire_ponders(time.monotonic())
+        return (self.ponder_queue and self.free_slots and not self.queued
+                and self.pondering < self.ponder_workers)
+
+    def expire_ponders(self, now):
+        """Drop ponders that waited longer than PONDER_MAX_AGE (lock must be held)
+
+        The queue is in submission order: a session's new ponder replaces
+        its old one at the end, so the oldest are always at the front.
+        """
+        while self.ponder_queue:
+            session_id, request = next(iter(self.ponder_queue.items()))
+            if now - request.submitted <= PONDER_MAX_AGE:
+                return
+            self.withdraw_ponder(request)
+            if self.ponders.get(session_id) is request:
+                del self.ponders[session_id]
+
+    def analysis_ready(self):
+        """Whether an analysis search may start: no move is waiting and the analysis cap allows it"""
+        return (self.analysis_queued and self.free_slots and not self.queued
+                and self.analysing < self.analysis_workers)
+
+    def dispatch_loop(self):
+        while True:
+            with self.condition:
+                while (not (self.queued and self.free_slots) and not self.ponder_ready()
+                       and not self.analysis_ready()):
+                    self.condition.wait()
+                if self.queued:
+                    request = self.next_request(self.queues)
+                    self.queued -= 1
+                elif self.ponder_ready():
+                    _, request = self.ponder_queue.popitem(last=False)
+                else:
+                    request = self.next_request(self.analysis_queues)
+                    self.analysis_queued -= 1
+                if not request.future.set_running_or_notify_cancel():
+                    continue
+                self.free_slots -= 1
+                if request.multipv is not None:
+                    self.analysing += 1
+                elif request.deadline is None:
+                    self.pondering += 1
+                load = (self.queued + self.workers - self.free_slots) / self.workers
+
+            if request.multipv is not None:
+                worker_future = self.executor.submit(
+                    analyse, request.fen, request.limits, request.multipv, self.options
+                )
+                worker_future.add_done_callback(
+                    lambda done, request=request: self.finish_analysis(request, done)
+                )
+                continue
+
+            if request.deadline is None:
+                # Ponders keep the real move's budget so their result can stand in for it
+                worker_future = self.executor.submit(
+                    think, request.fen, request.limits, self.options, request.history
+                )
+                worker_future.add_done_callback(
+                    lambda done, request=request: self.finish_ponder(request, done)
+                )
+                continue
+
+            now = time.monotonic()
+            wait = now - request.submitted
+            limits = degrade_limits(request.limits, load, request.deadline - now)
+            if limits != request.limits:
+                self.degraded += 1
+            self.waits.append(wait)
+            worker_future = self.executor.submit(think, request.fen, limits, self.options, request.history)
+            worker_future.add_done_callback(
+                lambda done, request=request, wait=wait: self.finish(request, done, wait)
+            )
+
+    def finish(self, request, worker_future, wait):
+        """Hand a worker's result back to the requester and free its slot"""
+        with self.condition:
+            self.free_slots += 1
+            self.completed += 1
+            self.condition.notify()
+        error = worker_future.exception()
+        if error is not None:
+            request.future.set_exception(error)
+            return
+        result = worker_future.result()
+        result["queue_wait"] = wait
+        with self.condition:
+            self.busy_seconds[result["pid"]] = self.busy_seconds.get(result["pid"], 0.0) + result["time"]
+        request.future.set_result(result)
+
+    def finish_ponder(self, request, worker_future):
+        """Keep a ponder's result for the session's next move and free its slot"""
+        error = worker_future.exception()
+        with self.condition:
+            self.free_slots += 1
+            self.pondering -= 1
+            if error is None:
+                result = worker_future.result()
+                self.busy_seconds[result["pid"]] = self.busy_seconds.get(result["pid"], 0.0) + result["time"]
+            self.condition.notify()
+        if error is not None:
+            request.future.set_exception(error)
+        else:
+            request.future.set_result(result)
+
+    def finish_analysis(self, request, worker_future):
+        """Resolve an analysis request and free its slot; failures are dropped from the cache"""
+        error = worker_future.exception()
+        with self.condition:
+            self.free_slots += 1
+            self.analysing -= 1
+            if error is None:
+                result = worker_future.result()
+                self.busy_seconds[result["pid"]] = self.busy_seconds.get(result["pid"], 0.0) + result["time"]
+            elif self.analysis_cache.get(request.key) is request.future:
+                del self.analysis_cache[request.key]
+            self.condition.notify()
+        if error is not None:
+            request.future.set_exception(error)
+        else:
+            request.future.set_result(result)
+
+    def stats(self):
+        """Queue depth, wait times and per-worker utilization"""
+        with self.condition:
+            waits = sorted(self.waits)
+            uptime = max(time.monotonic() - self.started, 1e-9)
+            return {
+                "workers": self.workers,
+                "busy_workers": self.workers - self.free_slots,
+                "queue_depth": self.queued,
+                "sessions_waiting": len(self.queues),
+                "completed": self.completed,
+                "degraded": self.degraded,
+                "pondering": self.pondering,
+                "ponder_hits": self.ponder_hits,
+                "ponder_misses": self.ponder_misses,
+                "analysing": self.analysing,
+                "analysis_queue": self.analysis_queued,
+                "analysis_cached": len(self.analysis_cache),
+                "analysis_hits": self.analysis_hits,
+                "mean_wait": sum(waits) / len(waits) if waits else 0.0,
+                "p95_wait": waits[int(0.95 * (len(waits) - 1))] if waits else 0.0,
+                "utilization": {pid: busy / uptime for pid, busy in sorted(self.busy_seconds.items())},
+            }
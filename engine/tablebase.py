@@ -0,0 +1,117 @@
+"""Syzygy endgame tablebase probing with an LRU cache of results"""
+import os
+import threading
+from collections import OrderedDict
+
+import chess
+import chess.polyglot
+import chess.syzygy
+
+_UNKNOWN = object()
+
+
+class TablebaseProber:
+    """Wraps an open chess.syzygy.Tablebase; results are cached by Zobrist key
+
+    The app shares one prober between its session threads, so the cache
+    bookkeeping is locked; the probes themselves run outside the lock.
+    """
+
+    def __init__(self, tablebase, cache_size=65536):
+        self.tablebase = tablebase
+        # Table names look like "KRvK": every letter but the "v" is a piece
+        self.max_pieces = max((len(name) - 1 for name in tablebase.wdl), default=0)
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.lock = threading.Lock()
+        self.probes = 0
+        self.hits = 0
+
+    def covers(self, board):
+        return chess.popcount(board.occupied) <= self.max_pieces and not board.castling_rights
+
+    def cached(self, key, index, probe, board):
+        """Return the cached WDL (index 0) or DTZ (index 1) for `key`, probing on a miss"""
+        with self.lock:
+            self.probes += 1
+            entry = self.cache.get(key)
+            if entry is None:
+                entry = self.cache[key] = [_UNKNOWN, _UNKNOWN]
+                if len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+            else:
+                self.cache.move_to_end(key)
+            value = entry[index]
+            if value is not _UNKNOWN:
+                self.hits += 1
+                return value
+        # Two threads missing on the same key both probe and store the same result
+        value = entry[index] = probe(board)
+        return value
+
+    def probe_wdl(self, board, key):
+        """Win/draw/loss (2, 1, 0, -1, -2) for the side to move, or None"""
+        return self.cached(key, 0, self.tablebase.get_wdl, board)
+
+    def probe_dtz(self, board, key):
+        """Distance to zeroing move for the side to move, or None"""
+        return self.cached(key, 1, self.tablebase.get_dtz, board)
+
+    def probe_position(self, position):
+        """WDL for an engine Position, converting it to a board only on a cache miss"""
+        return self.cached(position.key, 0, lambda _: self.tablebase.get_wdl(position.to_board()), None)
+
+    def best_move(self, board):
+        """Pick a root move that preserves the tablebase result, or None if not covered"""
+        if not self.covers(board):
+            return None, None
+        ranked = []
+        for move in board.legal_moves:
+            board.push(move)
+            mates = board.is_checkmate()
+            key = chess.polyglot.zobrist_hash(board)
+            wdl = self.probe_wdl(board, key)
+            dtz = self.probe_dtz(board, key)
+            board.pop()
+            if wdl is None or dtz is None:
+                return None, None
+            # The opponent's loss is our win; among wins head for the
+            # quickest zeroing move, among losses drag it out
+            our_wdl = -wdl
+            if our_wdl > 0:
+                ranked.append((our_wdl, mates, -abs(dtz), move))
+            else:
+                ranked.append((our_wdl, mates, abs(dtz), move))
+        if not ranked:
+            return None, None
+        best = max(ranked, key=lambda entry: entry[:3])
+        return best[3], best[0]
+
+    def verdict(self, board):
+        """Human-readable tablebase result for the side to move, or None"""
+        if not self.covers(board):
+            return None
+        wdl = self.probe_wdl(board, chess.polyglot.zobrist_hash(board))
+        if wdl is None:
+            return None
+        side = "White" if board.turn == chess.WHITE else "Black"
+        other = "Black" if board.turn == chess.WHITE else "White"
+        if wdl == 2:
+            return f"{side} is winning"
+        if wdl == -2:
+            return f"{other} is winning"
+        if wdl == 0:
+            return "Drawn with best play"
+        # Cursed wins and blessed losses are draws under the 50-move rule
+        return "Drawn by the 50-move rule"
+
+
+def open_tablebase(path, cache_size=65536):
+    """Open the Syzygy tables in `path`; returns None when there is nothing to load"""
+    if not path or not os.path.isdir(path):
+        return None
+    tablebase = chess.syzygy.open_tablebase(path)
+    if not tablebase.wdl:
+        tablebase.close()
+        return None
+    return TablebaseProber(tablebase, cache_size)
@@ -0,0 +1,94 @@
+"""Fixed-size transposition table keyed on Zobrist hashes"""
+from array import array
+
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+# Each slot is a 64-bit key plus one 64-bit packed word:
+#   bits  0-20  move, as packed by engine.position
+#   bits 21-28  depth
+#   bits 29-30  bound type
+#   bits 31-54  score, offset to make it non-negative
+#   bits 55-62  search generation
+SLOT_BYTES = 16
+SLOTS_PER_BUCKET = 2
+SCORE_OFFSET = 1 << 23
+NO_MOVE = 0
+MOVE_MASK = (1 << 21) - 1
+
+
+class TranspositionTable:
+    """Two-slot buckets: a depth-preferred slot and an always-replace slot"""
+
+    def __init__(self, size_mb=16):
+        self.buckets = max(1, size_mb * 1024 * 1024 // (SLOT_BYTES * SLOTS_PER_BUCKET))
+        self.keys = array("Q", bytes(8 * self.buckets * SLOTS_PER_BUCKET))
+        self.data = array("Q", bytes(8 * self.buckets * SLOTS_PER_BUCKET))
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    @property
+    def size_mb(self):
+        return self.buckets * SLOTS_PER_BUCKET * SLOT_BYTES / (1024 * 1024)
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.probes if self.probes else 0.0
+
+    def new_search(self):
+        """Advance the generation so entries from older searches get replaced first"""
+        self.generation = (self.generation + 1) & 0xFF
+
+    def clear(self):
+        """Drop every entry and reset the counters"""
+        self.keys = array("Q", bytes(8 * len(self.keys)))
+        self.data = array("Q", bytes(8 * len(self.data)))
+        self.generation = 0
+        self.probes = self.hits = self.stores = 0
+
+    def probe(self, key):
+        """Return (move, depth, bound, score) for `key`, or None on a miss"""
+        self.probes += 1
+        slot = (key % self.buckets) * SLOTS_PER_BUCKET
+        keys = self.keys
+        if keys[slot] != key:
+            slot += 1
+            if keys[slot] != key:
+                return None
+        word = self.data[slot]
+        if word == 0:
+            return None
+        self.hits += 1
+        return (
+            word & MOVE_MASK,
+            word >> 21 & 0xFF,
+            word >> 29 & 0x3,
+            (word >> 31 & 0xFFFFFF) - SCORE_OFFSET,
+        )
+
+    def store(self, key, move, depth, bound, score):
+        """Record a search result, keeping the deeper or fresher entry in slot 0"""
+        self.stores += 1
+        slot = (key % self.buckets) * SLOTS_PER_BUCKET
+        keys, data = self.keys, self.data
+        existing = data[slot]
+        existing_depth = existing >> 21 & 0xFF
+        existing_generation = existing >> 55 & 0xFF
+        if (keys[slot] == key or existing == 0 or depth >= existing_depth
+                or existing_generation != self.generation):
+            if keys[slot] == key and move == NO_MOVE:
+                # Keep the best move found by an earlier search of this position
+                move = existing & MOVE_MASK
+        else:
+            slot += 1
+        keys[slot] = key
+        data[slot] = (
+            move
+            | min(depth, 0xFF) << 21
+            | bound << 29
+            | (score + SCORE_OFFSET) << 31
+            | self.generation << 55
+        )
@@ -0,0 +1,209 @@
+"""The built-in engine as a UCI executable
+
+Run ``python -m engine.uci`` (or the ``chess_wizard_uci.py`` script at the
+top of the repository) and point any UCI GUI or tool at it. Supported
+commands: uci, isready, ucinewgame, setoption (Hash), position, go
+(wtime, btime, winc, binc, movestogo, movetime, depth, nodes, infinite),
+stop and quit.
+"""
+import sys
+import threading
+import time
+
+import chess
+
+from engine.search import MATE_BOUND, MATE_SCORE, MAX_PLY, Searcher, SearchLimits
+from engine.tt import TranspositionTable
+
+ENGINE_NAME = "Chess Wizard"
+ENGINE_AUTHOR = "Chess Wizard contributors"
+
+DEFAULT_HASH_MB = 16
+MAX_HASH_MB = 1024
+
+# Moves assumed to be left in the game when the GUI does not say
+MOVES_TO_GO = 30
+# Seconds kept back per move for communication with the GUI
+MOVE_OVERHEAD = 0.05
+
+
+def time_for_move(remaining, increment=0.0, moves_to_go=None):
+    """Seconds to spend on the next move, given our clock in seconds"""
+    budget = remaining / (moves_to_go or MOVES_TO_GO) + 0.75 * increment
+    return max(0.01, min(budget, remaining - MOVE_OVERHEAD))
+
+
+def uci_score(score):
+    """A centipawn search score in UCI ``score`` notation"""
+    if abs(score) >= MATE_BOUND:
+        moves = (MATE_SCORE - abs(score) + 1) // 2
+        return f"mate {moves if score > 0 else -moves}"
+    return f"cp {score}"
+
+
+def parse_go(tokens, turn):
+    """SearchLimits and the infinite flag for the arguments of a ``go`` command"""
+    values = {}
+    infinite = False
+    index = 0
+    while index < len(tokens):
+        token = tokens[index]
+        if token == "infinite":
+            infinite = True
+        elif token in ("wtime", "btime", "winc", "binc", "movestogo", "movetime", "depth", "nodes"):
+            values[token] = int(tokens[index + 1])
+            index += 1
+        index += 1
+
+    if infinite:
+        return SearchLimits(time=None, nodes=None, depth=MAX_PLY), True
+    search_time = None
+    if "movetime" in values:
+        search_time = max(values["movetime"] / 1000 - MOVE_OVERHEAD, 0.01)
+    else:
+        clock, increment = ("wtime", "winc") if turn == chess.WHITE else ("btime", "binc")
+        if clock in values:
+            search_time = time_for_move(values[clock] / 1000, values.get(increment, 0) / 1000,
+                                        values.get("movestogo"))
+    return SearchLimits(
+        time=search_time,
+        nodes=values.get("nodes"),
+        depth=min(values.get("depth", MAX_PLY), MAX_PLY),
+    ), False
+
+
+class UciEngine:
+    """UCI command loop around a Searcher; searches run on a background thread"""
+
+    def __init__(self, output=sys.stdout):
+        self.output = output
+        self.output_lock = threading.Lock()
+        self.board = chess.Board()
+        self.hash_mb = DEFAULT_HASH_MB
+        self.searcher = None
+        self.thread = None
+        # Set by stop/quit; an infinite search holds its bestmove until then
+        self.stop_requested = threading.Event()
+
+    def send(self, line):
+        with self.output_lock:
+            self.output.write(line + "\n")
+            self.output.flush()
+
+    def get_searcher(self):
+        if self.searcher is None:
+            self.searcher = Searcher(TranspositionTable(self.hash_mb))
+            self.searcher.on_iteration = self.report_iteration
+        return self.searcher
+
+    def handle(self, line):
+        """Execute one command line; returns False once the engine should exit"""
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, arguments = tokens[0], tokens[1:]
+        if command == "uci":
+            self.send(f"id name {ENGINE_NAME}")
+            self.send(f"id author {ENGINE_AUTHOR}")
+            self.send(f"option name Hash type spin default {DEFAULT_HASH_MB} min 1 max {MAX_HASH_MB}")
+            self.send("uciok")
+        elif command == "isready":
+            self.send("readyok")
+        elif command == "ucinewgame":
+            self.wait_for_search()
+            if self.searcher is not None:
+                self.searcher.tt.clear()
+            self.board = chess.Board()
+        elif command == "setoption":
+            self.set_option(arguments)
+        elif command == "position":
+            self.wait_for_search()
+            self.set_position(arguments)
+        elif command == "go":
+            self.wait_for_search()
+            self.go(arguments)
+        elif command == "stop":
+            self.stop()
+        elif command == "quit":
+            self.stop()
+            return False
+        return True
+
+    def set_option(self, arguments):
+        # setoption name <name> value <value>
+        text = " ".join(arguments)
+        name, _, value = text.partition(" value ")
+        if name.removeprefix("name ").strip().lower() == "hash":
+            self.wait_for_search()
+            self.hash_mb = max(1, min(int(value), MAX_HASH_MB))
+            self.searcher = None
+
+    def set_position(self, arguments):
+        if not arguments:
+            return
+        if arguments[0] == "startpos":
+            board = chess.Board()
+            rest = arguments[1:]
+        elif arguments[0] == "fen":
+            fen_end = arguments.index("moves") if "moves" in arguments else len(arguments)
+            board = chess.Board(" ".join(arguments[1:fen_end]))
+            rest = arguments[fen_end:]
+        else:
+            return
+        if rest and rest[0] == "moves":
+            for uci in rest[1:]:
+                board.push_uci(uci)
+        self.board = board
+
+    def go(self, arguments):
+        limits, infinite = parse_go(arguments, self.board.turn)
+        searcher = self.get_searcher()
+        searcher.stopped = False
+        self.stop_requested.clear()
+        self.thread = threading.Thread(
+            target=self.think, args=(self.board.copy(), limits, infinite), daemon=True
+        )
+        self.thread.start()
+
+    def think(self, board, limits, infinite):
+        result = self.searcher.search(board, limits)
+        if infinite:
+            self.stop_requested.wait()
+        if result.move is None:
+            self.send("bestmove 0000")
+        elif len(result.pv) > 1:
+            self.send(f"bestmove {result.move.uci()} ponder {result.pv[1].uci()}")
+        else:
+            self.send(f"bestmove {result.move.uci()}")
+
+    def report_iteration(self, position, depth, score, pv):
+        searcher = self.searcher
+        elapsed = max(time.perf_counter() - searcher.start, 1e-6)
+        moves = " ".join(position.to_chess_move(move).uci() for move in pv)
+        self.send(f"info depth {depth} score {uci_score(score)} nodes {searcher.nodes} "
+                  f"nps {int(searcher.nodes / elapsed)} time {int(elapsed * 1000)} pv {moves}")
+
+    def stop(self):
+        self.stop_requested.set()
+        if self.searcher is not None:
+            self.searcher.stop()
+        self.wait_for_search()
+
+    def wait_for_search(self):
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+
+def main():
+    engine = UciEngine()
+    for line in sys.stdin:
+        if not engine.handle(line.strip()):
+            break
+    else:
+        engine.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""Search entry point executed inside the engine's worker processes"""
+import os
+import time
+from collections import namedtuple
+from multiprocessing import util
+
+import chess
+
+from engine.book import book_ply, load_book
+from engine.external import ExternalEngine
+from engine.search import MATE_SCORE, Searcher, nodes_per_second
+from engine.tablebase import open_tablebase
+from engine.tt import TranspositionTable
+
+# Settings a worker needs besides the position and search budget.
+# book_path None means the built-in book; book_plies 0 disables the book;
+# syzygy_path None disables tablebase probing; uci_command, if set, is a
+# UCI engine binary that searches instead of the built-in engine.
+EngineOptions = namedtuple(
+    "EngineOptions",
+    ["tt_size_mb", "book_path", "book_plies", "syzygy_path", "tablebase_cache_size", "uci_command"],
+)
+EngineOptions.__new__.__defaults__ = (16, None, 20, None, 65536, None)
+
+# Per-process state, loaded once and kept warm across moves
+_searcher = None
+_book = None
+_tablebase = _NOT_LOADED = object()
+
+
+def get_book(options):
+    global _book
+    if _book is None:
+        _book = load_book(options.book_path)
+    return _book
+
+
+def get_tablebase(options):
+    global _tablebase
+    if _tablebase is _NOT_LOADED:
+        _tablebase = open_tablebase(options.syzygy_path, options.tablebase_cache_size)
+    return _tablebase
+
+
+def get_searcher(options, tablebase):
+    """The worker's searcher: the built-in engine or a long-lived external one"""
+    global _searcher
+    if _searcher is None:
+        if options.uci_command:
+            _searcher = ExternalEngine(options.uci_command, {"Hash": options.tt_size_mb})
+            # Quit the engine before the worker waits for its threads to exit;
+            # chess.engine's I/O thread would otherwise keep the worker alive
+            util.Finalize(None, _searcher.close, exitpriority=10)
+        else:
+            _searcher = Searcher(TranspositionTable(options.tt_size_mb), tablebase)
+    return _searcher
+
+
+def tt_hit_rate():
+    """Transposition table hit rate of the built-in searcher (0 for external engines)"""
+    tt = getattr(_searcher, "tt", None)
+    return tt.hit_rate if tt is not None else 0.0
+
+
+def book_move(board, options):
+    """Look the position up in the opening book, within the configured depth"""
+    if book_ply(board) >= options.book_plies:
+        return None
+    return get_book(options).choose(board)
+
+
+def shortcut_result(move, source, start):
+    """Stats for a move that was looked up rather than searched"""
+    return {
+        "move": move.uci(),
+        "score": 0,
+        "depth": 0,
+        "nodes": 0,
+        "time": time.perf_counter() - start,
+        "nps": 0,
+        "pv": [move.uci()],
+        "source": source,
+        "tt_hit_rate": tt_hit_rate(),
+        "pid": os.getpid(),
+    }
+
+
+def think(fen, limits, options, history=()):
+    """Search `fen` in a worker process and return the move with its stats
+
+    `history` is the Zobrist keys of the game's earlier positions that may
+    still repeat, since the FEN alone does not carry them.
+    """
+    board = chess.Board(fen)
+    start = time.perf_counter()
+    move = book_move(board, options)
+    if move is not None:
+        return shortcut_result(move, "book", start)
+
+    tablebase = get_tablebase(options)
+    if tablebase is not None:
+        move, _ = tablebase.best_move(board)
+        if move is not None:
+            return shortcut_result(move, "tablebase", start)
+
+    result = get_searcher(options, tablebase).search(board, limits, history)
+    return {
+        "move": result.move.uci() if result.move else None,
+        "score": result.score,
+        "depth": result.depth,
+        "nodes": result.nodes,
+        "time": result.time,
+        "nps": nodes_per_second(result),
+        "pv": [move.uci() for move in result.pv],
+        "source": "search",
+        "tt_hit_rate": tt_hit_rate(),
+        "pid": os.getpid(),
+    }
+
+
+def analyse(fen, limits, multipv, options):
+    """Evaluate `fen` in a worker process: its score and best `multipv` lines
+
+    Scores are in centipawns from the side to move's point of view. The
+    opening book is skipped since analysis wants an evaluation, not a move.
+    """
+    board = chess.Board(fen)
+    start = time.perf_counter()
+    if board.is_checkmate():
+        lines = []
+        score = -MATE_SCORE
+    elif board.is_game_over():
+        lines = []
+        score = 0
+    else:
+        lines = get_searcher(options, get_tablebase(options)).search_lines(board, limits, multipv)
+        score = lines[0].score if lines else 0
+    return {
+        "score": score,
+        "depth": lines[0].depth if lines else 0,
+        "nodes": sum(line.nodes for line in lines),
+        "lines": [{"score": line.score, "pv": [move.uci() for move in line.pv]} for line in lines],
+        "time": time.perf_counter() - start,
+        "pid": os.getpid(),
+    }
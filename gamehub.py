@@ -0,0 +1,180 @@
+"""In-process hub of two-player games shared between browser sessions
+
+A game is created by one session and joined by another with its short
+code. Every change bumps the game's version counter; sessions poll that
+counter, a dictionary lookup and an attribute read, and fetch only the
+moves they have not seen yet once it moves. Each game has its own lock,
+so sessions of different games never wait for each other, and games
+nobody has looked at for `idle_seconds` are evicted.
+"""
+import secrets
+import threading
+import time
+
+import chess
+
+from gamerecord import GameRecord
+
+# Game codes avoid letters and digits that are easily confused (0/O, 1/I)
+CODE_ALPHABET = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"
+CODE_LENGTH = 6
+
+
+class HubGame:
+    """One shared game: its moves, version, seats and result"""
+
+    __slots__ = ("code", "record", "version", "seats", "result", "lock", "last_access")
+
+    def __init__(self, code, start_fen):
+        self.code = code
+        self.record = GameRecord(start_fen)
+        self.version = 0
+        # Seat tokens by colour; a session proves its seat with the token
+        self.seats = {chess.WHITE: None, chess.BLACK: None}
+        # (result, message) once the game has ended by a claim
+        self.result = None
+        self.lock = threading.Lock()
+        self.last_access = time.monotonic()
+
+    def turn(self):
+        """The colour to move"""
+        white_first = self.record.start_fen.split(" ", 2)[1] == "w"
+        return white_first == (len(self.record) % 2 == 0)
+
+    def seat_of(self, token):
+        for color, seat in self.seats.items():
+            if token is not None and seat == token:
+                return color
+        return None
+
+
+class GameHub:
+    """Shared games of the server process, by code, evicted after `idle_seconds` without access"""
+
+    def __init__(self, idle_seconds=1800.0, sweep_every=60.0):
+        self.idle_seconds = idle_seconds
+        self.sweep_every = sweep_every
+        self.games = {}
+        self.lock = threading.Lock()
+        self.last_sweep = time.monotonic()
+        self.created = 0
+        self.evictions = 0
+        self.conflicts = 0
+
+    def create(self, color, start_fen=chess.STARTING_FEN):
+        """Open a game and take the `color` seat; returns (code, seat token)"""
+        token = secrets.token_urlsafe(12)
+        with self.lock:
+            self.maybe_sweep(time.monotonic())
+            code = self.new_code()
+            game = self.games[code] = HubGame(code, start_fen)
+            game.seats[color] = token
+            self.created += 1
+        return code, token
+
+    def new_code(self):
+        """A code no open game uses (lock must be held)"""
+        while True:
+            code = "".join(secrets.choice(CODE_ALPHABET) for _ in range(CODE_LENGTH))
+            if code not in self.games:
+                return code
+
+    def join(self, code, token=None):
+        """Take a seat in game `code`; returns (colour, token), or None if there is no free seat
+
+        A token of one of the game's seats rejoins that seat, e.g. after a
+        page refresh; otherwise the free seat is taken with a new token.
+        """
+        game = self.get(code)
+        if game is None:
+            return None
+        with game.lock:
+            color = game.seat_of(token)
+            if color is not None:
+                return color, token
+            for color, seat in game.seats.items():
+                if seat is None:
+                    token = secrets.token_urlsafe(12)
+                    game.seats[color] = token
+                    game.version += 1
+                    return color, token
+        return None
+
+    def get(self, code):
+        """The game with `code`, marked as accessed, or None if there is none (or it was evicted)"""
+        now = time.monotonic()
+        if now - self.last_sweep > self.sweep_every:
+            with self.lock:
+                self.maybe_sweep(now)
+        game = self.games.get(code)
+        if game is not None:
+            game.last_access = now
+        return game
+
+    def version(self, code):
+        """The game's version counter, or None if there is no such game; takes no lock"""
+        game = self.get(code)
+        return None if game is None else game.version
+
+    def moves_since(self, code, ply):
+        """(version, move codes from `ply` on, result, seats taken) of game `code`, or None"""
+        game = self.get(code)
+        if game is None:
+            return None
+        with game.lock:
+            seated = sum(seat is not None for seat in game.seats.values())
+            return game.version, game.record.moves[ply:], game.result, seated
+
+    def push(self, code, token, move, version):
+        """Play `move` for the seat of `token`; returns the new version, or None if refused
+
+        The move is refused if the game changed since `version`, the game
+        is over, or it is not the seat's turn. Legality is the caller's
+        check, made on its board of the game at `version`.
+        """
+        game = self.get(code)
+        if game is None:
+            return None
+        with game.lock:
+            if (game.version != version or game.result is not None
+                    or game.seat_of(token) != game.turn()):
+                self.conflicts += 1
+                return None
+            game.record.push(move)
+            game.version += 1
+            return game.version
+
+    def finish(self, code, token, result):
+        """End the game with a (result, message) pair on behalf of a seat; returns the new version"""
+        game = self.get(code)
+        if game is None:
+            return None
+        with game.lock:
+            if game.seat_of(token) is None or game.result is not None:
+                return None
+            game.result = result
+            game.version += 1
+            return game.version
+
+    def maybe_sweep(self, now):
+        """Drop games idle past the threshold (lock must be held)"""
+        if now - self.last_sweep <= self.sweep_every:
+            return
+        self.last_sweep = now
+        idle = [code for code, game in self.games.items() if now - game.last_access > self.idle_seconds]
+        for code in idle:
+            del self.games[code]
+        self.evictions += len(idle)
+
+    def stats(self):
+        games = list(self.games.values())
+        return {
+            "games": len(games),
+            "players": sum(seat is not None for game in games for seat in game.seats.values()),
+            "created": self.created,
+            "evictions": self.evictions,
+            "conflicts": self.conflicts,
+        }
+
+    def __len__(self):
+        return len(self.games)
@@ -0,0 +1,158 @@
+"""Compact game records, with boards rebuilt lazily for active sessions only
+
+A session's canonical game state is a GameRecord: the starting FEN plus
+one 16-bit word per move. Live ``chess.Board`` objects (and their legal
+move index) are kept in a process-wide BoardCache while the session is
+active and evicted once it has been idle for a while; the next access
+rebuilds them from the record.
+"""
+import threading
+import time
+from array import array
+
+import chess
+
+from moveindex import get_index
+
+
+def encode_move(move):
+    """Pack a move into 15 bits: from, to and promotion piece type"""
+    return move.from_square | move.to_square << 6 | (move.promotion or 0) << 12
+
+
+def decode_move(code):
+    return chess.Move(code & 63, code >> 6 & 63, code >> 12 or None)
+
+
+class GameRecord:
+    """Starting position plus the moves played, as an array of 16-bit codes"""
+
+    __slots__ = ("start_fen", "moves")
+
+    def __init__(self, start_fen=chess.STARTING_FEN, moves=()):
+        self.start_fen = start_fen
+        self.moves = array("H", moves)
+
+    def __len__(self):
+        return len(self.moves)
+
+    def push(self, move):
+        self.moves.append(encode_move(move))
+
+    def pop(self):
+        return decode_move(self.moves.pop())
+
+    def last_move(self):
+        return decode_move(self.moves[-1]) if self.moves else None
+
+    def uci_moves(self):
+        return [decode_move(code).uci() for code in self.moves]
+
+    def board(self):
+        """Replay the record into a fresh chess.Board"""
+        board = chess.Board(self.start_fen)
+        for code in self.moves:
+            board.push(decode_move(code))
+        return board
+
+    def matches(self, board):
+        """Whether `board` is this record's position (cheap check on the move stack)"""
+        if len(board.move_stack) != len(self.moves):
+            return False
+        return not self.moves or encode_move(board.move_stack[-1]) == self.moves[-1]
+
+
+class SanHistory:
+    """Move history text in SAN, one line per move pair, extended one move at a time
+
+    The text is built as moves are played rather than re-joined on every
+    rerun; `offsets` remembers where each move's text starts so a take-back
+    just truncates it.
+    """
+
+    __slots__ = ("text", "offsets")
+
+    def __init__(self):
+        self.text = ""
+        self.offsets = array("I")
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def push(self, board, move):
+        """Append `move`, about to be played on `board`"""
+        san = board.san(move)
+        if board.turn == chess.WHITE:
+            piece = f"{board.fullmove_number}. {san}"
+            if self.text:
+                piece = "\n" + piece
+        elif self.text:
+            piece = f" {san}"
+        else:
+            piece = f"{board.fullmove_number}... {san}"
+        self.offsets.append(len(self.text))
+        self.text += piece
+
+    def pop(self):
+        self.text = self.text[:self.offsets.pop()]
+
+    @classmethod
+    def from_record(cls, record):
+        history = cls()
+        board = chess.Board(record.start_fen)
+        for code in record.moves:
+            move = decode_move(code)
+            history.push(board, move)
+            board.push(move)
+        return history
+
+
+class BoardCache:
+    """Live boards of active sessions, evicted after `idle_seconds` without access"""
+
+    def __init__(self, idle_seconds=600.0, sweep_every=60.0):
+        self.idle_seconds = idle_seconds
+        self.sweep_every = sweep_every
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.last_sweep = time.monotonic()
+        self.rebuilds = 0
+        self.evictions = 0
+
+    def entry(self, session_id, record):
+        """Return the [board, move_index, last_access, start_fen] entry for a session"""
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(session_id)
+            if entry is None or entry[3] != record.start_fen or not record.matches(entry[0]):
+                entry = self.entries[session_id] = [record.board(), None, now, record.start_fen]
+                self.rebuilds += 1
+            entry[2] = now
+            if now - self.last_sweep > self.sweep_every:
+                self.evict_idle(now)
+        return entry
+
+    def board(self, session_id, record):
+        return self.entry(session_id, record)[0]
+
+    def move_index(self, session_id, record):
+        """Legal move index of the session's current position"""
+        entry = self.entry(session_id, record)
+        entry[1] = get_index(entry[1], entry[0])
+        return entry[1]
+
+    def discard(self, session_id):
+        with self.lock:
+            self.entries.pop(session_id, None)
+
+    def evict_idle(self, now):
+        """Drop boards of sessions idle past the threshold (lock must be held)"""
+        self.last_sweep = now
+        idle = [session_id for session_id, entry in self.entries.items()
+                if now - entry[2] > self.idle_seconds]
+        for session_id in idle:
+            del self.entries[session_id]
+        self.evictions += len(idle)
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,138 @@
+"""Game-over adjudication shared by the app and the headless tools"""
+from array import array
+
+import chess
+import chess.polyglot
+
+from gamerecord import decode_move
+
+# Draws the side to move may claim, and the rule that allows it
+CLAIM_REASONS = {
+    chess.Termination.THREEFOLD_REPETITION: "threefold repetition",
+    chess.Termination.FIFTY_MOVES: "the 50-move rule",
+}
+
+DRAW_MESSAGES = {
+    chess.Termination.STALEMATE: "Draw by stalemate!",
+    chess.Termination.INSUFFICIENT_MATERIAL: "Draw by insufficient material!",
+    chess.Termination.FIVEFOLD_REPETITION: "Draw by fivefold repetition!",
+    chess.Termination.SEVENTYFIVE_MOVES: "Draw by the 75-move rule!",
+    **{termination: f"Draw by {reason} (claimed)!" for termination, reason in CLAIM_REASONS.items()},
+}
+
+
+class GameStatus:
+    """Repetition counts and halfmove clocks of a game, kept up to date move by move
+
+    python-chess finds repetitions by replaying the move stack, so asking
+    whether a game is over gets slower as the game grows. This keeps the
+    Polyglot key of every position (the engine's Position.key, so the
+    search can use them too), how often each key occurred and the halfmove
+    clocks, and updates them on every push and pop.
+    """
+
+    __slots__ = ("keys", "clocks", "counts")
+
+    def __init__(self, board=None):
+        board = chess.Board() if board is None else board
+        key = chess.polyglot.zobrist_hash(board)
+        self.keys = array("Q", [key])
+        self.clocks = array("H", [board.halfmove_clock])
+        self.counts = {key: 1}
+
+    @classmethod
+    def from_record(cls, record):
+        board = chess.Board(record.start_fen)
+        status = cls(board)
+        for code in record.moves:
+            board.push(decode_move(code))
+            status.push(board)
+        return status
+
+    def __len__(self):
+        return len(self.keys) - 1
+
+    def push(self, board):
+        """Record the position a move has just led to on `board`"""
+        key = chess.polyglot.zobrist_hash(board)
+        self.keys.append(key)
+        self.clocks.append(board.halfmove_clock)
+        self.counts[key] = self.counts.get(key, 0) + 1
+
+    def pop(self):
+        key = self.keys.pop()
+        self.clocks.pop()
+        if self.counts[key] == 1:
+            del self.counts[key]
+        else:
+            self.counts[key] -= 1
+
+    @property
+    def repetitions(self):
+        """How often the current position has occurred, itself included"""
+        return self.counts[self.keys[-1]]
+
+    @property
+    def halfmove_clock(self):
+        return self.clocks[-1]
+
+    def repetition_keys(self):
+        """Keys of the earlier positions since the last capture or pawn move
+
+        Only these can repeat; the search scores a return to any of them
+        as a draw.
+        """
+        start = max(0, len(self.keys) - 1 - self.clocks[-1])
+        return tuple(self.keys[start:-1])
+
+    def outcome(self, board):
+        """The chess.Outcome of `board` in one pass, or None while the game goes on
+
+        Moves are generated once; the repetition and move-count rules are
+        lookups. Draws that must be claimed do not end the game.
+        """
+        has_moves = any(board.generate_legal_moves())
+        if not has_moves and board.is_check():
+            return chess.Outcome(chess.Termination.CHECKMATE, not board.turn)
+        if board.is_insufficient_material():
+            return chess.Outcome(chess.Termination.INSUFFICIENT_MATERIAL, None)
+        if not has_moves:
+            return chess.Outcome(chess.Termination.STALEMATE, None)
+        if self.clocks[-1] >= 150:
+            return chess.Outcome(chess.Termination.SEVENTYFIVE_MOVES, None)
+        if self.repetitions >= 5:
+            return chess.Outcome(chess.Termination.FIVEFOLD_REPETITION, None)
+        return None
+
+    def claimable(self):
+        """The draw the side to move may claim in the current position, or None"""
+        if self.repetitions >= 3:
+            return chess.Outcome(chess.Termination.THREEFOLD_REPETITION, None)
+        if self.clocks[-1] >= 100:
+            return chess.Outcome(chess.Termination.FIFTY_MOVES, None)
+        return None
+
+
+def describe(outcome):
+    """``(result, message)`` for a chess.Outcome, or None"""
+    if outcome is None:
+        return None
+    if outcome.winner is not None:
+        winner = "White" if outcome.winner == chess.WHITE else "Black"
+        return outcome.result(), f"{winner} wins by checkmate!"
+    return outcome.result(), DRAW_MESSAGES.get(outcome.termination, "Draw!")
+
+
+def game_result(board, status=None):
+    """``(result, message)`` once the game on `board` is over, otherwise None
+
+    `result` is the PGN result string and `message` the text shown in the
+    app. Draws that must be claimed do not end the game. With the game's
+    GameStatus the check skips python-chess's replay of the move stack.
+    """
+    return describe(board.outcome() if status is None else status.outcome(board))
+
+
+def claimable_draw(status):
+    """``(result, message)`` of a draw the side to move may claim, or None"""
+    return describe(status.claimable())
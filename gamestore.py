@@ -0,0 +1,163 @@
+"""Local SQLite store for games, so a game can be resumed by its ID
+
+One GameStore (and one connection) is shared by the whole process. The
+database runs in WAL mode so readers never wait for the writer, and saves
+are batched: `save()` only records the latest state of a game in memory,
+and a background thread writes pending games in one transaction every
+`flush_seconds`, or sooner once `batch_size` games are waiting. A crash can therefore lose
+at most the last `flush_seconds` of moves.
+"""
+import atexit
+import json
+import sqlite3
+import threading
+import time
+from array import array
+
+from gamerecord import GameRecord
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id TEXT PRIMARY KEY,
+    start_fen TEXT NOT NULL,
+    moves BLOB NOT NULL,
+    mode TEXT,
+    player_color INTEGER,
+    difficulty TEXT,
+    result TEXT,
+    headers TEXT,
+    updated REAL NOT NULL
+)
+"""
+
+COLUMNS = ("id", "start_fen", "moves", "mode", "player_color", "difficulty", "result", "headers", "updated")
+
+UPSERT = (
+    f"INSERT OR REPLACE INTO games ({', '.join(COLUMNS)}) "
+    f"VALUES ({', '.join('?' * len(COLUMNS))})"
+)
+
+
+def moves_blob(record):
+    return record.moves.tobytes()
+
+
+def headers_text(headers):
+    return json.dumps(headers) if headers else None
+
+
+def record_from_row(start_fen, blob):
+    moves = array("H")
+    moves.frombytes(blob)
+    return GameRecord(start_fen, moves)
+
+
+class GameStore:
+    """Games keyed by ID, with batched writes over one shared connection"""
+
+    def __init__(self, path, flush_seconds=2.0, batch_size=64):
+        self.path = path
+        self.flush_seconds = flush_seconds
+        self.batch_size = batch_size
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(SCHEMA)
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.writes = 0
+        self.flushes = 0
+        self.stopped = threading.Event()
+        threading.Thread(target=self.flush_periodically, name="game-store-flush", daemon=True).start()
+        atexit.register(self.close)
+
+    def save(self, game_id, record, mode=None, player_color=None, difficulty=None, result=None, headers=None):
+        """Queue the game's current state; it is written on the next flush"""
+        row = (game_id, record.start_fen, moves_blob(record), mode,
+               None if player_color is None else int(player_color),
+               difficulty, result, headers_text(headers), time.time())
+        with self.lock:
+            self.pending[game_id] = row
+            if len(self.pending) >= self.batch_size:
+                self.flush_locked()
+
+    def flush_periodically(self):
+        while not self.stopped.wait(self.flush_seconds):
+            self.flush()
+
+    def save_many(self, rows):
+        """Write (game_id, record, headers, result) tuples in one transaction, bypassing the queue"""
+        now = time.time()
+        with self.lock:
+            self.write_locked(
+                (game_id, record.start_fen, moves_blob(record), None, None, None, result, headers_text(headers), now)
+                for game_id, record, headers, result in rows
+            )
+
+    def flush(self):
+        with self.lock:
+            self.flush_locked()
+
+    def flush_locked(self):
+        """Write all pending games (lock must be held)"""
+        if not self.pending or self.connection is None:
+            return
+        rows = list(self.pending.values())
+        self.pending.clear()
+        self.write_locked(rows)
+
+    def write_locked(self, rows):
+        """Upsert rows in a single transaction (lock must be held)"""
+        cursor = self.connection.cursor()
+        cursor.execute("BEGIN")
+        try:
+            cursor.executemany(UPSERT, rows)
+        except BaseException:
+            cursor.execute("ROLLBACK")
+            raise
+        cursor.execute("COMMIT")
+        self.writes += max(cursor.rowcount, 0)
+        self.flushes += 1
+
+    def load(self, game_id):
+        """The stored game as a dict with a GameRecord under "record", or None"""
+        with self.lock:
+            row = self.pending.get(game_id)
+            if row is None:
+                row = self.connection.execute(
+                    f"SELECT {', '.join(COLUMNS)} FROM games WHERE id = ?", (game_id,)
+                ).fetchone()
+        if row is None:
+            return None
+        game = dict(zip(COLUMNS, row))
+        game["record"] = record_from_row(game.pop("start_fen"), game.pop("moves"))
+        game["headers"] = json.loads(game["headers"]) if game["headers"] else {}
+        return game
+
+    def iter_games(self, chunk_size=256):
+        """Yield (game_id, record, headers, result) for every stored game, oldest first"""
+        self.flush()
+        cursor = self.connection.execute(
+            "SELECT id, start_fen, moves, headers, result FROM games ORDER BY updated"
+        )
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            for game_id, start_fen, blob, headers, result in rows:
+                yield (game_id, record_from_row(start_fen, blob),
+                       json.loads(headers) if headers else {}, result)
+
+    def __len__(self):
+        self.flush()
+        return self.connection.execute("SELECT COUNT(*) FROM games").fetchone()[0]
+
+    def close(self):
+        """Write anything pending and close the connection"""
+        self.stopped.set()
+        with self.lock:
+            if self.connection is None:
+                return
+            self.flush_locked()
+            self.connection.close()
+            self.connection = None
@@ -0,0 +1,276 @@
+"""Per-process timing histograms, sampled profiling and a Prometheus text export
+
+Hot paths are wrapped with `timed` (a decorator) or `timer` (a context
+manager). With CHESS_WIZARD_METRICS=0 both cost nothing: `timed` returns
+the function undecorated and `timer` a shared no-op context manager.
+
+Each histogram keeps cumulative counts in fixed buckets, as Prometheus
+expects, plus the most recent samples for exact p50/p95/p99. A fraction
+of reruns can also run under cProfile, merged into one set of stats per
+process.
+"""
+import cProfile
+import functools
+import io
+import os
+import pstats
+import random
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import nullcontext
+
+import config
+
+ENABLED = config.METRICS_ENABLED
+
+# Upper bounds of the histogram buckets, in seconds
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+           0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Samples kept per histogram for the percentiles
+RECENT_SAMPLES = 2048
+
+PREFIX = "chess_wizard_"
+
+NO_TIMER = nullcontext()
+
+
+class Histogram:
+    """Durations of one operation: bucket counts, sum, maximum and recent samples"""
+
+    __slots__ = ("name", "help", "counts", "count", "total", "max", "recent", "lock")
+
+    def __init__(self, name, help=""):
+        self.name = name
+        self.help = help
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+    def observe(self, seconds):
+        index = bisect_left(BUCKETS, seconds)
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+            self.recent.append(seconds)
+
+    def summary(self):
+        """Count, mean, p50/p95/p99 of the recent samples and maximum, in seconds"""
+        with self.lock:
+            samples = sorted(self.recent)
+            count, total, largest = self.count, self.total, self.max
+        if not samples:
+            return {"count": 0, "mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+
+        def percentile(fraction):
+            return samples[int(fraction * (len(samples) - 1))]
+
+        return {"count": count, "mean": total / count, "p50": percentile(0.5),
+                "p95": percentile(0.95), "p99": percentile(0.99), "max": largest}
+
+
+class Timer:
+    """Context manager adding the time spent in its block to a histogram"""
+
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        # Also counts blocks left by st.rerun() and other exceptions
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class Registry:
+    """The process's histograms, gauges and merged profile"""
+
+    def __init__(self):
+        self.histograms = {}
+        self.gauges = {}
+        self.lock = threading.Lock()
+        self.profile = None
+        self.profiled = 0
+        self.profile_lock = threading.Lock()
+        self.started = time.time()
+
+    def histogram(self, name, help=""):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(name, Histogram(name, help))
+        return histogram
+
+    def gauge(self, name, help, read):
+        """Report `read()` as a gauge at export time; a later call replaces an earlier one"""
+        self.gauges[name] = (help, read)
+
+    def add_profile(self, profiler):
+        with self.lock:
+            if self.profile is None:
+                self.profile = pstats.Stats(profiler)
+            else:
+                self.profile.add(profiler)
+            self.profiled += 1
+
+    def top_functions(self, limit=30, sort="cumulative"):
+        """The merged profile's hottest functions as text, or None before any sample"""
+        with self.lock:
+            if self.profile is None:
+                return None
+            stream = io.StringIO()
+            self.profile.stream = stream
+            self.profile.sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+    def reset(self):
+        for histogram in list(self.histograms.values()):
+            with histogram.lock:
+                histogram.reset()
+        with self.lock:
+            self.profile = None
+            self.profiled = 0
+        self.started = time.time()
+
+    def gauge_values(self):
+        """{name: (help, value)} of the gauges that could be read"""
+        values = {}
+        for name, (help, read) in list(self.gauges.items()):
+            try:
+                values[name] = (help, read())
+            except Exception:
+                # A gauge of something torn down (e.g. a cleared cache) is skipped
+                continue
+        return values
+
+    def prometheus_text(self):
+        """Every histogram and gauge in the Prometheus text exposition format"""
+        lines = []
+        for name, histogram in sorted(self.histograms.items()):
+            metric = f"{PREFIX}{name}_seconds"
+            with histogram.lock:
+                counts, count, total = list(histogram.counts), histogram.count, histogram.total
+            lines.append(f"# HELP {metric} {histogram.help or f'Seconds spent in {name}'}")
+            lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS, counts):
+                cumulative += bucket_count
+                lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{le="+Inf"}} {count}')
+            lines.append(f"{metric}_sum {total}")
+            lines.append(f"{metric}_count {count}")
+        for name, (help, value) in sorted(self.gauge_values().items()):
+            lines.append(f"# HELP {PREFIX}{name} {help}")
+            lines.append(f"# TYPE {PREFIX}{name} gauge")
+            lines.append(f"{PREFIX}{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Write the export to `path` atomically, as textfile collectors require"""
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            file.write(self.prometheus_text())
+        os.replace(temporary, path)
+
+
+REGISTRY = Registry()
+
+
+def timer(name):
+    """Context manager timing its block into histogram `name`"""
+    if not ENABLED:
+        return NO_TIMER
+    return Timer(REGISTRY.histogram(name))
+
+
+def timed(name):
+    """Decorator timing every call into histogram `name`; a no-op when metrics are off"""
+    def decorate(function):
+        if not ENABLED:
+            return function
+        histogram = REGISTRY.histogram(name)
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+def observe(name, seconds):
+    """Add a duration measured elsewhere (e.g. in an engine worker) to histogram `name`"""
+    if ENABLED:
+        REGISTRY.histogram(name).observe(seconds)
+
+
+def gauge(name, help, read):
+    if ENABLED:
+        REGISTRY.gauge(name, help, read)
+
+
+class SampledProfile:
+    """Runs its block under cProfile for a `rate` fraction of uses, merging the result"""
+
+    __slots__ = ("profiler",)
+
+    def __enter__(self):
+        self.profiler = None
+        # One profiled rerun at a time; the others run normally
+        if random.random() < config.PROFILE_SAMPLE_RATE and REGISTRY.profile_lock.acquire(blocking=False):
+            self.profiler = cProfile.Profile()
+            try:
+                self.profiler.enable()
+            except ValueError:
+                # Another profiler is active (e.g. python -m cProfile)
+                self.profiler = None
+                REGISTRY.profile_lock.release()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.profiler is not None:
+            self.profiler.disable()
+            REGISTRY.profile_lock.release()
+            REGISTRY.add_profile(self.profiler)
+        return False
+
+
+def sampled_profile():
+    """Context manager profiling a sample of the blocks it wraps (CHESS_WIZARD_PROFILE_RATE)"""
+    if not ENABLED or config.PROFILE_SAMPLE_RATE <= 0:
+        return NO_TIMER
+    return SampledProfile()
+
+
+def start_exporter(path, every):
+    """Rewrite the Prometheus file at `path` every `every` seconds from a daemon thread"""
+    def export_loop():
+        while True:
+            time.sleep(every)
+            try:
+                REGISTRY.write_prometheus(path)
+            except OSError:
+                continue
+
+    thread = threading.Thread(target=export_loop, name="metrics-exporter", daemon=True)
+    thread.start()
+    return thread
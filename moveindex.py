@@ -0,0 +1,60 @@
+"""Per-position index of legal moves for O(1) selection and validation"""
+import chess
+
+
+class MoveIndex:
+    """Legal moves of one position, grouped by origin and destination square
+
+    ``by_from[from_square][to_square]`` maps each promotion piece type (None
+    for ordinary moves) to its move, so clicks, text input, highlighting and
+    the legal-move listing never regenerate moves.
+    """
+
+    __slots__ = ("fen", "by_from", "moves", "client")
+
+    def __init__(self, board):
+        self.fen = board.fen()
+        self.moves = list(board.legal_moves)
+        self.by_from = {}
+        self.client = None
+        for move in self.moves:
+            self.by_from.setdefault(move.from_square, {}).setdefault(move.to_square, {})[move.promotion] = move
+
+    def is_current(self, board):
+        return self.fen == board.fen()
+
+    def has_moves_from(self, square):
+        return square in self.by_from
+
+    def targets(self, square):
+        """Destination squares of the piece on `square`"""
+        return tuple(sorted(self.by_from.get(square, ())))
+
+    def client_moves(self):
+        """``{from_name: {to_name: uci}}`` for the board component, built once per position
+
+        Promotions are offered as queen promotions, matching `lookup`.
+        """
+        if self.client is None:
+            self.client = {
+                chess.square_name(from_square): {
+                    chess.square_name(to_square): self.lookup(from_square, to_square).uci()
+                    for to_square in destinations
+                }
+                for from_square, destinations in self.by_from.items()
+            }
+        return self.client
+
+    def lookup(self, from_square, to_square, promotion=chess.QUEEN):
+        """The legal move between two squares, promoting to `promotion` if needed"""
+        variants = self.by_from.get(from_square, {}).get(to_square)
+        if not variants:
+            return None
+        return variants.get(None) or variants.get(promotion)
+
+
+def get_index(cached, board):
+    """Reuse `cached` while it still describes `board`, otherwise rebuild it"""
+    if cached is not None and cached.is_current(board):
+        return cached
+    return MoveIndex(board)
@@ -0,0 +1,109 @@
+"""Streaming PGN import and export
+
+`read_games()` parses one game at a time straight into a compact
+GameRecord, without building python-chess's game tree or reading the
+whole file, so multi-gigabyte PGN collections import in constant memory.
+Variations and comments are skipped; only the main line is kept.
+`game_pgn()` and `write_game()` go the other way, one game at a time.
+"""
+import chess
+import chess.pgn
+
+from gamerecord import GameRecord, decode_move
+
+SEVEN_TAG_ROSTER = (
+    ("Event", "?"), ("Site", "?"), ("Date", "????.??.??"), ("Round", "?"),
+    ("White", "?"), ("Black", "?"), ("Result", "*"),
+)
+
+
+class RecordVisitor(chess.pgn.BaseVisitor):
+    """Collects a game's headers and main line into (headers, record, result)"""
+
+    def begin_game(self):
+        self.headers = {}
+        self.record = None
+        self.result_text = "*"
+        self.error = None
+
+    def visit_header(self, tagname, tagvalue):
+        self.headers[tagname] = tagvalue
+
+    def end_headers(self):
+        self.record = GameRecord(self.headers.get("FEN", chess.STARTING_FEN))
+        return chess.pgn.SKIP if "Variant" in self.headers else None
+
+    def visit_move(self, board, move):
+        self.record.push(move)
+
+    def begin_variation(self):
+        return chess.pgn.SKIP
+
+    def visit_result(self, result):
+        self.result_text = result
+
+    def handle_error(self, error):
+        # Keep reading the file; the caller skips games that failed to parse
+        self.error = error
+
+    def result(self):
+        return self.headers, self.record, self.headers.get("Result", self.result_text), self.error
+
+
+def read_games(handle):
+    """Yield (headers, record, result) for each parseable game in an open PGN file"""
+    while True:
+        game = chess.pgn.read_game(handle, Visitor=RecordVisitor)
+        if game is None:
+            return
+        headers, record, result, error = game
+        if error is None and record is not None and "Variant" not in headers:
+            yield headers, record, result
+
+
+def header_line(name, value):
+    return f'[{name} "{value}"]'
+
+
+def game_pgn(record, headers=None, result=None):
+    """One game as PGN text
+
+    Writes SAN directly while replaying the moves once, which is about
+    three times faster than building and exporting a chess.pgn.Game.
+    """
+    headers = dict(headers or {})
+    if result:
+        headers["Result"] = result
+    if record.start_fen != chess.STARTING_FEN:
+        headers["FEN"] = record.start_fen
+        headers["SetUp"] = "1"
+    termination = headers.get("Result", "*")
+    lines = [header_line(name, headers.pop(name, default)) for name, default in SEVEN_TAG_ROSTER]
+    lines.extend(header_line(name, value) for name, value in headers.items())
+    lines.append("")
+
+    board = chess.Board(record.start_fen)
+    tokens = []
+    for code in record.moves:
+        if board.turn == chess.WHITE:
+            tokens.append(f"{board.fullmove_number}.")
+        elif not tokens:
+            tokens.append(f"{board.fullmove_number}...")
+        tokens.append(board.san_and_push(decode_move(code)))
+    tokens.append(termination)
+
+    # Wrap the movetext exactly like python-chess's 80-column exporters
+    line = ""
+    for token in tokens:
+        if line and len(line) + len(token) + 2 > 80:
+            lines.append(line)
+            line = token
+        else:
+            line = f"{line} {token}" if line else token
+    lines.append(line)
+    return "\n".join(lines) + "\n\n"
+
+
+def write_game(handle, record, headers=None, result=None):
+    """Write one game as PGN to an open text file"""
+    handle.write(game_pgn(record, headers, result))
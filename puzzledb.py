@@ -0,0 +1,309 @@
+"""Tactics puzzles in a compact memory-mapped file, indexed by rating and theme
+
+Puzzles come from a Lichess-format CSV (PuzzleId, FEN, Moves, Rating,
+RatingDeviation, Popularity, NbPlays, Themes, GameUrl, OpeningTags) and
+are converted once by tools/build_puzzles.py. As in the Lichess export,
+the FEN is the position before the opponent's last move: the first move
+of the line sets the puzzle up and the player finds the moves after it
+at odd positions.
+
+The file holds, all little-endian:
+
+    header    magic, version, theme and puzzle counts, section offsets
+    themes    theme names, THEME_NAME_SIZE bytes each
+    index     per theme (0 for any theme), RATING_BUCKETS + 1 positions
+              where each rating bucket starts in the theme's list
+    records   one fixed-size record per puzzle, sorted by rating
+    postings  per theme, the record numbers with that theme, ascending
+    ids       record numbers sorted by puzzle ID
+    data      each puzzle's FEN, move codes and theme numbers
+
+The list for "any theme" is the records themselves. Picking a random
+puzzle in a rating range and theme reads two index entries, one posting
+and one record, however large the set; finding one by ID is a binary
+search. The reader works on any buffer, so the same code serves an mmap
+of a built file and the small set built in memory from the bundled CSV.
+"""
+import csv
+import gzip
+import io
+import mmap
+import os
+import random
+import shutil
+import struct
+import sys
+import tempfile
+from array import array
+
+import chess
+
+from gamerecord import decode_move, encode_move
+
+MAGIC = b"CWPZ"
+VERSION = 1
+
+# magic, version, theme count, puzzle count and the offsets of the index,
+# records, postings, ids and data sections
+HEADER = struct.Struct("<4sHHIQQQQQ")
+
+# puzzle ID, rating, data offset, FEN length, move count, theme count
+RECORD = struct.Struct("<8sHIBBBx")
+
+UINT32 = struct.Struct("<I")
+
+THEME_NAME_SIZE = 32
+MAX_THEMES = 255
+
+# Ratings are indexed in buckets of RATING_STEP points; higher ones share the last bucket
+RATING_STEP = 50
+RATING_BUCKETS = 80
+
+BUNDLED_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "puzzles.csv")
+
+
+def rating_bucket(rating):
+    return min(max(rating, 0) // RATING_STEP, RATING_BUCKETS - 1)
+
+
+class Puzzle:
+    """One puzzle: starting FEN, the whole line as chess.Moves, rating and themes"""
+
+    __slots__ = ("id", "fen", "moves", "rating", "themes")
+
+    def __init__(self, puzzle_id, fen, moves, rating, themes):
+        self.id = puzzle_id
+        self.fen = fen
+        self.moves = moves
+        self.rating = rating
+        self.themes = themes
+
+    @property
+    def color(self):
+        """The player's side: the one not making the setup move"""
+        return self.fen.split()[1] == "b"
+
+
+class PuzzleSet:
+    """Rating- and theme-indexed view over a puzzle file held in a buffer"""
+
+    def __init__(self, buffer, name="puzzles"):
+        if len(buffer) < HEADER.size:
+            raise ValueError(f"{name}: too short for a puzzle file")
+        magic, version, theme_count, size, *offsets = HEADER.unpack_from(buffer)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{name}: not a version {VERSION} puzzle file")
+        self.buffer = buffer
+        self.name = name
+        self.size = size
+        self.index_offset, self.records_offset, self.postings_offset, self.ids_offset, self.data_offset = offsets
+        self.themes = []
+        for number in range(theme_count):
+            start = HEADER.size + number * THEME_NAME_SIZE
+            self.themes.append(bytes(buffer[start:start + THEME_NAME_SIZE]).rstrip(b"\0").decode("ascii"))
+        # Theme numbers start at 1; 0 is the list of all puzzles
+        self.theme_numbers = {theme: number for number, theme in enumerate(self.themes, 1)}
+
+    def __len__(self):
+        return self.size
+
+    def uint32(self, offset):
+        return UINT32.unpack_from(self.buffer, offset)[0]
+
+    def span(self, low, high, theme=None):
+        """(theme number, first, end) positions of the puzzles rated `low` to `high`, or None"""
+        number = 0 if theme is None else self.theme_numbers.get(theme)
+        if number is None:
+            return None
+        row = self.index_offset + number * (RATING_BUCKETS + 1) * UINT32.size
+        first = self.uint32(row + rating_bucket(low) * UINT32.size)
+        end = self.uint32(row + (rating_bucket(high) + 1) * UINT32.size)
+        return number, first, end
+
+    def count(self, low, high, theme=None):
+        """Puzzles rated `low` to `high` (to RATING_STEP points) with `theme`"""
+        span = self.span(low, high, theme)
+        return span[2] - span[1] if span else 0
+
+    def theme_counts(self):
+        """{theme: puzzles with it}"""
+        return {theme: self.count(0, RATING_STEP * RATING_BUCKETS, theme) for theme in self.themes}
+
+    def choose(self, low, high, theme=None, rng=random):
+        """A random puzzle rated `low` to `high` with `theme`, or None if there is none"""
+        span = self.span(low, high, theme)
+        if span is None or span[1] >= span[2]:
+            return None
+        number, first, end = span
+        position = rng.randrange(first, end)
+        if number:
+            position = self.uint32(self.postings_offset + position * UINT32.size)
+        return self.record(position)
+
+    def record_id(self, number):
+        start = self.records_offset + number * RECORD.size
+        return bytes(self.buffer[start:start + 8]).rstrip(b"\0").decode("ascii")
+
+    def record(self, number):
+        """The puzzle in record `number`"""
+        raw_id, rating, offset, fen_length, move_count, theme_count = RECORD.unpack_from(
+            self.buffer, self.records_offset + number * RECORD.size
+        )
+        start = self.data_offset + offset
+        fen = bytes(self.buffer[start:start + fen_length]).decode("ascii")
+        start += fen_length
+        moves = [decode_move(code) for code in struct.unpack_from(f"<{move_count}H", self.buffer, start)]
+        start += 2 * move_count
+        themes = [self.themes[theme - 1] for theme in self.buffer[start:start + theme_count]]
+        return Puzzle(raw_id.rstrip(b"\0").decode("ascii"), fen, moves, rating, themes)
+
+    def find(self, puzzle_id):
+        """The puzzle with ID `puzzle_id`, or None"""
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            number = self.uint32(self.ids_offset + middle * UINT32.size)
+            found = self.record_id(number)
+            if found == puzzle_id:
+                return self.record(number)
+            if found < puzzle_id:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+
+def read_csv(path):
+    """Yield the rows of a Lichess puzzle CSV: plain, .gz, or .zst with the zstandard package"""
+    if path.endswith(".zst"):
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError(f"{path}: install zstandard or decompress it first (zstd -d)") from None
+        with open(path, "rb") as raw:
+            yield from csv.reader(io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(raw), encoding="utf-8"))
+        return
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8", newline="") as file:
+        yield from csv.reader(file)
+
+
+def little_endian(values):
+    """The bytes of an array("I") in the file's byte order"""
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tobytes()
+
+
+def build_puzzles(rows, output, min_popularity=None):
+    """Write the puzzle file for CSV `rows` to the binary file `output`; returns the puzzle count
+
+    Reads the rows once, spooling each puzzle's data to a temporary file
+    and keeping only a few fixed-size columns in memory (2 million rows
+    convert in about 500 MB).
+    """
+    ids = bytearray()
+    ratings = array("H")
+    offsets = array("I")
+    lengths = bytearray()
+    postings = {}
+    theme_numbers = {}
+    with tempfile.TemporaryFile() as data:
+        for row in rows:
+            if len(row) < 8 or row[0] == "PuzzleId":
+                continue
+            if min_popularity is not None and int(row[5]) < min_popularity:
+                continue
+            puzzle_id = row[0].encode("ascii")
+            fen = row[1].encode("ascii")
+            moves = [chess.Move.from_uci(uci) for uci in row[2].split()]
+            if len(puzzle_id) > 8 or len(fen) > 255 or not 2 <= len(moves) <= 255:
+                continue
+            # The board and text input only promote to a queen, so a line
+            # needing an underpromotion from the player could not be solved
+            if any(move.promotion not in (None, chess.QUEEN) for move in moves[1::2]):
+                continue
+            moves = [encode_move(move) for move in moves]
+            themes = []
+            for theme in row[7].split():
+                if theme not in theme_numbers:
+                    if len(theme_numbers) == MAX_THEMES:
+                        raise ValueError(f"more than {MAX_THEMES} themes")
+                    theme_numbers[theme] = len(theme_numbers) + 1
+                themes.append(theme_numbers[theme])
+            index = len(ratings)
+            for theme in themes:
+                postings.setdefault(theme, array("I")).append(index)
+            ids += puzzle_id.ljust(8, b"\0")
+            ratings.append(min(int(row[3]), 0xFFFF))
+            offsets.append(data.tell())
+            lengths += bytes((len(fen), len(moves), len(themes)))
+            data.write(fen)
+            data.write(struct.pack(f"<{len(moves)}H", *moves))
+            data.write(bytes(themes))
+
+        # Records go in rating order; rank maps an input row to its record
+        size = len(ratings)
+        order = sorted(range(size), key=ratings.__getitem__)
+        rank = array("I", bytes(4 * size))
+        for position, index in enumerate(order):
+            rank[index] = position
+
+        index_rows = [bucket_starts([ratings[index] for index in order], 0)]
+        theme_postings = []
+        total = 0
+        for number in range(1, len(theme_numbers) + 1):
+            positions = array("I", sorted(rank[index] for index in postings[number]))
+            index_rows.append(bucket_starts([ratings[order[position]] for position in positions], total))
+            theme_postings.append(positions)
+            total += len(positions)
+        by_id = array("I", sorted(range(size), key=lambda position: ids[8 * order[position]:8 * order[position] + 8]))
+
+        index_offset = HEADER.size + len(theme_numbers) * THEME_NAME_SIZE
+        records_offset = index_offset + len(index_rows) * (RATING_BUCKETS + 1) * UINT32.size
+        postings_offset = records_offset + size * RECORD.size
+        ids_offset = postings_offset + total * UINT32.size
+        data_offset = ids_offset + size * UINT32.size
+        output.write(HEADER.pack(MAGIC, VERSION, len(theme_numbers), size,
+                                 index_offset, records_offset, postings_offset, ids_offset, data_offset))
+        for theme in theme_numbers:
+            output.write(theme.encode("ascii")[:THEME_NAME_SIZE].ljust(THEME_NAME_SIZE, b"\0"))
+        for starts in index_rows:
+            output.write(little_endian(starts))
+        for index in order:
+            output.write(RECORD.pack(ids[8 * index:8 * index + 8], ratings[index], offsets[index],
+                                     *lengths[3 * index:3 * index + 3]))
+        for positions in theme_postings:
+            output.write(little_endian(positions))
+        output.write(little_endian(by_id))
+        data.seek(0)
+        shutil.copyfileobj(data, output)
+    return size
+
+
+def bucket_starts(sorted_ratings, base):
+    """Where each rating bucket starts in a rating-sorted list placed at `base`, plus its end"""
+    starts = array("I", [base] * (RATING_BUCKETS + 1))
+    position = 0
+    for bucket in range(RATING_BUCKETS):
+        starts[bucket] = base + position
+        while position < len(sorted_ratings) and rating_bucket(sorted_ratings[position]) == bucket:
+            position += 1
+    starts[RATING_BUCKETS] = base + len(sorted_ratings)
+    return starts
+
+
+def open_puzzles(path):
+    """Memory-map a puzzle file built by tools/build_puzzles.py"""
+    with open(path, "rb") as puzzle_file:
+        buffer = mmap.mmap(puzzle_file.fileno(), 0, access=mmap.ACCESS_READ)
+    return PuzzleSet(buffer, name=os.path.basename(path))
+
+
+def load_puzzles(path=None):
+    """Open the configured puzzle file, or build the bundled set in memory when there is none"""
+    if path:
+        return open_puzzles(path)
+    output = io.BytesIO()
+    build_puzzles(read_csv(BUNDLED_CSV), output)
+    return PuzzleSet(output.getvalue(), name="built-in")
@@ -0,0 +1,95 @@
+"""Board SVG rendering with a process-wide cache shared by all sessions
+
+A full ``chess.svg.board()`` render costs a few milliseconds and used to
+run on every rerun. Here the empty board (squares, coordinates and piece
+definitions) is rendered once per orientation and size, and each position
+only emits a thin layer of highlight rects and ``<use>`` references to the
+piece definitions. Finished SVGs are kept in a bounded LRU cache keyed on
+everything that affects the picture.
+"""
+import functools
+
+import chess
+import chess.svg
+
+import config
+import metrics
+
+SQUARE_SIZE = chess.svg.SQUARE_SIZE
+MARGIN = 15
+
+SELECTED_FILL = "#ffff00"
+SELECTED_OPACITY = 0x70 / 0xff
+TARGET_FILL = "#90EE90"
+TARGET_OPACITY = 0x70 / 0xff
+LASTMOVE_LIGHT = chess.svg.DEFAULT_COLORS["square light lastmove"]
+LASTMOVE_DARK = chess.svg.DEFAULT_COLORS["square dark lastmove"]
+
+PIECE_IDS = {symbol: chess.Piece.from_symbol(symbol) for symbol in chess.svg.PIECES}
+PIECE_IDS = {
+    symbol: f"{chess.COLOR_NAMES[piece.color]}-{chess.PIECE_NAMES[piece.piece_type]}"
+    for symbol, piece in PIECE_IDS.items()
+}
+
+
+def square_origin(square, flipped):
+    """Top-left corner of a square in SVG user units"""
+    file_index = chess.square_file(square)
+    rank_index = chess.square_rank(square)
+    x = (7 - file_index if flipped else file_index) * SQUARE_SIZE + MARGIN
+    y = (rank_index if flipped else 7 - rank_index) * SQUARE_SIZE + MARGIN
+    return x, y
+
+
+@functools.lru_cache(maxsize=8)
+def board_background(flipped, size):
+    """Empty board with every piece defined in <defs>, minus the closing tag"""
+    svg = chess.svg.board(chess.Board(None), flipped=flipped, size=size)
+    defs = "<defs>" + "".join(chess.svg.PIECES.values()) + "</defs>"
+    svg = svg.replace("<defs />", defs, 1)
+    return svg[:-len("</svg>")]
+
+
+def square_rect(square, flipped, fill, opacity=None):
+    x, y = square_origin(square, flipped)
+    opacity_attr = f' opacity="{opacity:.3f}"' if opacity is not None else ""
+    return (f'<rect x="{x}" y="{y}" width="{SQUARE_SIZE}" height="{SQUARE_SIZE}" '
+            f'stroke="none" fill="{fill}"{opacity_attr} />')
+
+
+def piece_layer(board_fen, flipped, selected, targets, last_move):
+    """Highlight rects and piece references for one position"""
+    parts = []
+    if last_move:
+        move = chess.Move.from_uci(last_move)
+        for square in (move.from_square, move.to_square):
+            light = bool(chess.BB_LIGHT_SQUARES & chess.BB_SQUARES[square])
+            parts.append(square_rect(square, flipped, LASTMOVE_LIGHT if light else LASTMOVE_DARK))
+    if selected is not None:
+        parts.append(square_rect(selected, flipped, SELECTED_FILL, SELECTED_OPACITY))
+    for square in targets:
+        parts.append(square_rect(square, flipped, TARGET_FILL, TARGET_OPACITY))
+
+    board = chess.BaseBoard(board_fen)
+    for square, piece in board.piece_map().items():
+        x, y = square_origin(square, flipped)
+        piece_id = PIECE_IDS[piece.symbol()]
+        parts.append(f'<use href="#{piece_id}" xlink:href="#{piece_id}" transform="translate({x}, {y})" />')
+    return "".join(parts)
+
+
+@functools.lru_cache(maxsize=config.RENDER_CACHE_SIZE)
+def render_board(board_fen, flipped, selected, targets, last_move, size):
+    """SVG for a position and highlight state; every argument must be hashable
+
+    `board_fen` is the piece-placement part of the FEN, `targets` a sorted
+    tuple of squares and `last_move` a UCI string or None.
+    """
+    return (board_background(flipped, size)
+            + piece_layer(board_fen, flipped, selected, targets, last_move)
+            + "</svg>")
+
+
+metrics.gauge("render_cache_size", "Board SVGs in the render cache", lambda: render_board.cache_info().currsize)
+metrics.gauge("render_cache_hits", "Render cache hits", lambda: render_board.cache_info().hits)
+metrics.gauge("render_cache_misses", "Render cache misses", lambda: render_board.cache_info().misses)
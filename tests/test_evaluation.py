@@ -0,0 +1,60 @@
+"""The scalar, incremental and NumPy batch evaluations must agree exactly"""
+import chess
+import pytest
+
+from engine.batcheval import evaluate_boards, evaluate_positions
+from engine.evaluate import evaluate
+from engine.position import Position
+from tools import eval_check
+
+# (FEN, moves) lines through the moves that change more than one square;
+# random games seldom castle or capture en passant
+SPECIAL_LINES = {
+    "castling": ("r3k2r/pppq1ppp/2npbn2/2b1p3/2B1P3/2NPBN2/PPPQ1PPP/R3K2R w KQkq - 0 1",
+                 ["e1g1", "e8c8", "a1e1", "h8g8"]),
+    "queenside castling": ("r3k2r/pppq1ppp/2npbn2/2b1p3/2B1P3/2NPBN2/PPPQ1PPP/R3K2R w KQkq - 0 1",
+                           ["e1c1", "e8g8"]),
+    "en passant": ("rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w KQkq f6 0 3",
+                   ["e5f6", "d5d4", "c2c4", "d4c3"]),
+    "promotion": ("1r5k/P1P5/8/8/8/8/1p3p2/R6K w - - 0 1",
+                  ["a7b8q", "h8g7", "c7c8n", "f2f1q", "h1h2", "b2a1r"]),
+}
+
+
+def check_line(fen, ucis):
+    """Play `ucis` from `fen`, comparing every path after each make and unmake"""
+    board = chess.Board(fen)
+    position = Position(fen)
+    boards = [board.copy(stack=False)]
+    positions = [Position(fen)]
+    scores = [evaluate(board)]
+    assert position.evaluate() == scores[0]
+    moves = []
+    for uci in ucis:
+        chess_move = chess.Move.from_uci(uci)
+        assert chess_move in board.legal_moves
+        moves.append(position.from_chess_move(chess_move))
+        board.push(chess_move)
+        position.make(moves[-1])
+        scores.append(evaluate(board))
+        assert position.evaluate() == scores[-1], f"incremental after {uci}"
+        boards.append(board.copy(stack=False))
+        positions.append(Position.from_board(board))
+    assert evaluate_boards(boards).tolist() == scores
+    assert evaluate_positions(positions).tolist() == scores
+    for index in range(len(moves) - 1, -1, -1):
+        position.unmake(moves[index])
+        assert position.evaluate() == scores[index], f"after unmaking {ucis[index]}"
+
+
+@pytest.mark.parametrize("name", SPECIAL_LINES)
+def test_special_moves(name):
+    check_line(*SPECIAL_LINES[name])
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_random_games(seed):
+    result = eval_check.run(8, seed)
+    assert result["positions"] > 0
+    assert result["mismatches"] == {"incremental": 0, "unmake": 0, "batch": 0, "positions": 0}
+
@@ -0,0 +1,150 @@
+"""TablebaseProber: coverage limits, cached WDL/DTZ probing and move choice, on a stub tablebase"""
+import threading
+
+import chess
+import chess.polyglot
+
+from engine.tablebase import TablebaseProber
+
+KQK = "4k3/8/8/8/8/8/8/4K2Q w - - 0 1"
+
+
+class StubTablebase:
+    """Stands in for chess.syzygy.Tablebase: answers with `wdl_of` / `dtz_of` and counts the probes"""
+
+    def __init__(self, names=("KQvK", "KRvKP"), wdl_of=lambda board: 2, dtz_of=lambda board: 1):
+        # The prober only reads the table names
+        self.wdl = dict.fromkeys(names)
+        self.wdl_of = wdl_of
+        self.dtz_of = dtz_of
+        self.calls = 0
+
+    def get_wdl(self, board):
+        self.calls += 1
+        return self.wdl_of(board)
+
+    def get_dtz(self, board):
+        self.calls += 1
+        return self.dtz_of(board)
+
+
+def probe(prober, board, kind="wdl"):
+    key = chess.polyglot.zobrist_hash(board)
+    return prober.probe_wdl(board, key) if kind == "wdl" else prober.probe_dtz(board, key)
+
+
+def test_max_pieces_from_table_names():
+    assert TablebaseProber(StubTablebase()).max_pieces == 4
+    assert TablebaseProber(StubTablebase(names=())).max_pieces == 0
+
+
+def test_covers_piece_count_and_castling():
+    prober = TablebaseProber(StubTablebase())
+    assert prober.covers(chess.Board(KQK))
+    assert prober.covers(chess.Board("4k3/8/8/8/8/8/3p4/R3K3 w - - 0 1"))
+    assert not prober.covers(chess.Board("4k3/8/8/8/8/8/2pp4/R3K3 w - - 0 1"))
+    # Tablebases have no castling rights, however few the pieces
+    assert not prober.covers(chess.Board("4k3/8/8/8/8/8/8/R3K3 w Q - 0 1"))
+    assert not prober.covers(chess.Board())
+
+
+def test_wdl_and_dtz_cached_separately():
+    tablebase = StubTablebase(wdl_of=lambda board: -2, dtz_of=lambda board: -7)
+    prober = TablebaseProber(tablebase)
+    board = chess.Board(KQK)
+    assert probe(prober, board) == -2
+    assert probe(prober, board) == -2
+    assert probe(prober, board, "dtz") == -7
+    assert probe(prober, board, "dtz") == -7
+    assert tablebase.calls == 2
+    assert (prober.probes, prober.hits) == (4, 2)
+
+
+def test_missing_table_result_is_cached():
+    tablebase = StubTablebase(wdl_of=lambda board: None)
+    prober = TablebaseProber(tablebase)
+    board = chess.Board(KQK)
+    assert probe(prober, board) is None
+    assert probe(prober, board) is None
+    assert tablebase.calls == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    tablebase = StubTablebase()
+    prober = TablebaseProber(tablebase, cache_size=2)
+    boards = [chess.Board(KQK), chess.Board("4k3/8/8/8/8/8/8/3K3Q w - - 0 1"),
+              chess.Board("4k3/8/8/8/8/8/8/2K4Q w - - 0 1")]
+    probe(prober, boards[0])
+    probe(prober, boards[1])
+    probe(prober, boards[0])
+    probe(prober, boards[2])
+    assert len(prober.cache) == 2
+    calls = tablebase.calls
+    probe(prober, boards[0])
+    assert tablebase.calls == calls
+    probe(prober, boards[1])
+    assert tablebase.calls == calls + 1
+
+
+def test_probe_position_uses_the_engine_key():
+    from engine.position import Position
+    tablebase = StubTablebase()
+    prober = TablebaseProber(tablebase)
+    position = Position(KQK)
+    assert prober.probe_position(position) == 2
+    assert prober.probe_position(position) == 2
+    assert tablebase.calls == 1
+
+
+def test_best_move_keeps_the_win_by_the_shortest_dtz():
+    # Black loses after every queen move, with the fewest plies to zeroing after Qh7
+    tablebase = StubTablebase(
+        wdl_of=lambda board: 0 if board.peek().from_square == chess.E1 else -2,
+        dtz_of=lambda board: -1 if board.peek() == chess.Move.from_uci("h1h7") else -5,
+    )
+    move, wdl = TablebaseProber(tablebase).best_move(chess.Board(KQK))
+    assert (move, wdl) == (chess.Move.from_uci("h1h7"), 2)
+
+
+def test_best_move_outside_the_tables():
+    tablebase = StubTablebase()
+    assert TablebaseProber(tablebase).best_move(chess.Board()) == (None, None)
+    assert tablebase.calls == 0
+    missing = TablebaseProber(StubTablebase(wdl_of=lambda board: None))
+    assert missing.best_move(chess.Board(KQK)) == (None, None)
+
+
+def test_verdict():
+    board = chess.Board(KQK)
+    verdicts = {wdl: TablebaseProber(StubTablebase(wdl_of=lambda board, wdl=wdl: wdl)).verdict(board)
+                for wdl in (2, 1, 0, -1, -2, None)}
+    assert verdicts == {
+        2: "White is winning", 1: "Drawn by the 50-move rule", 0: "Drawn with best play",
+        -1: "Drawn by the 50-move rule", -2: "Black is winning", None: None,
+    }
+
+
+def test_shared_between_threads():
+    prober = TablebaseProber(StubTablebase(), cache_size=8)
+    # More positions than cache entries, so the threads keep evicting each other's
+    boards = [chess.Board(f"4k3/8/8/8/8/8/8/{rank} {turn} - - 0 1")
+              for rank in ("K6Q", "1K5Q", "2K4Q", "3K3Q", "4K2Q", "5K1Q") for turn in "wb"]
+    keys = [(board, chess.polyglot.zobrist_hash(board)) for board in boards]
+    errors = []
+
+    def hammer():
+        try:
+            for _ in range(2000):
+                for board, key in keys:
+                    prober.probe_wdl(board, key)
+                    prober.probe_dtz(board, key)
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=hammer) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert prober.probes == 8 * 2000 * 2 * len(keys)
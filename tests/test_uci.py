@@ -0,0 +1,111 @@
+"""chess_wizard_uci.py as a GUI drives it: over raw UCI and through python-chess"""
+import os
+import subprocess
+import sys
+
+import chess
+import chess.engine
+import pytest
+
+from engine.external import ExternalEngine
+from engine.search import SearchLimits
+
+UCI_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "chess_wizard_uci.py")
+COMMAND = [sys.executable, UCI_SCRIPT]
+
+
+class UciProcess:
+    """The UCI executable on pipes, read line by line with a timeout"""
+
+    def __init__(self):
+        self.process = subprocess.Popen(COMMAND, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, bufsize=1)
+
+    def send(self, line):
+        self.process.stdin.write(line + "\n")
+        self.process.stdin.flush()
+
+    def read_until(self, prefix):
+        """Lines up to and including the first one starting with `prefix`"""
+        lines = []
+        while True:
+            line = self.process.stdout.readline()
+            assert line, f"engine exited before {prefix!r}: {lines}"
+            lines.append(line.strip())
+            if line.startswith(prefix):
+                return lines
+
+    def close(self):
+        self.send("quit")
+        self.process.wait(timeout=10)
+
+
+@pytest.fixture
+def uci():
+    process = UciProcess()
+    yield process
+    if process.process.poll() is None:
+        process.close()
+
+
+def bestmove(lines):
+    return chess.Move.from_uci(lines[-1].split()[1])
+
+
+def test_handshake(uci):
+    uci.send("uci")
+    lines = uci.read_until("uciok")
+    assert any(line.startswith("id name") for line in lines)
+    uci.send("isready")
+    assert uci.read_until("readyok") == ["readyok"]
+
+
+def test_go_depth_from_moves(uci):
+    uci.send("uci")
+    uci.read_until("uciok")
+    uci.send("ucinewgame")
+    uci.send("position startpos moves e2e4 e7e5 g1f3")
+    uci.send("isready")
+    uci.read_until("readyok")
+    uci.send("go depth 3")
+    lines = uci.read_until("bestmove")
+    board = chess.Board()
+    for move in ("e2e4", "e7e5", "g1f3"):
+        board.push_uci(move)
+    assert bestmove(lines) in board.legal_moves
+    assert any(line.startswith("info depth") for line in lines)
+
+
+def test_go_infinite_until_stop(uci):
+    fen = "6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1"
+    uci.send("uci")
+    uci.read_until("uciok")
+    uci.send(f"position fen {fen}")
+    uci.send("go infinite")
+    uci.send("isready")
+    # The engine keeps answering while it searches, and holds its move until stop
+    assert uci.read_until("readyok")[-1] == "readyok"
+    uci.send("stop")
+    lines = uci.read_until("bestmove")
+    assert bestmove(lines) == chess.Move.from_uci("d1d8")
+    uci.close()
+    assert uci.process.returncode == 0
+
+
+def test_simple_engine():
+    with chess.engine.SimpleEngine.popen_uci(COMMAND) as engine:
+        board = chess.Board("r1bqkbnr/pppp1ppp/2n5/4p2Q/2B1P3/8/PPPP1PPP/RNB1K1NR w KQkq - 2 3")
+        result = engine.play(board, chess.engine.Limit(depth=3))
+        assert result.move == chess.Move.from_uci("h5f7")
+        with engine.analysis(chess.Board()) as analysis:
+            assert analysis.get()
+            analysis.stop()
+            assert analysis.wait().move in chess.Board().legal_moves
+
+
+def test_external_engine():
+    with ExternalEngine(COMMAND, {"Hash": 16}) as engine:
+        assert engine.name
+        board = chess.Board()
+        result = engine.search(board, SearchLimits(time=1.0, depth=3))
+        assert result.move in board.legal_moves
+        assert result.depth >= 1
@@ -0,0 +1,270 @@
+"""Headless benchmark suite for the engine, move generation and rendering
+
+Usage: python -m tools.bench [--only SECTION ...] [--json PATH]
+                             [--compare BASELINE] [--tolerance PCT] [--profile]
+
+Sections:
+  perft   move generator nodes/sec on the standard perft positions
+  search  engine nodes/sec and time to a fixed depth on the Bratko-Kopec set
+  render  board SVG renders/sec (see tools.bench_render)
+  click   server-side latency of one click-to-move, from the board
+          component's value to the next position's SVG and move map
+  eval    static evaluations/sec, scalar vs incremental vs NumPy batch
+          (see tools.eval_check)
+  puzzles random puzzle picks/sec by rating and theme, and lookups by ID,
+          on CHESS_WIZARD_PUZZLES or the bundled set
+
+--json writes every metric to a file; --compare reads such a file back
+and exits with status 1 if any metric got worse by more than the
+tolerance. The run also exits with status 1 if perft or eval found a
+mismatch with the reference. --profile runs the selected sections under
+cProfile.
+"""
+import argparse
+import cProfile
+import json
+import os
+import platform
+import pstats
+import random
+import sys
+import time
+
+import chess
+
+import config
+from engine.search import Searcher, SearchLimits
+from engine.tt import TranspositionTable
+from gamerecord import BoardCache, GameRecord
+from puzzledb import load_puzzles
+from render import render_board
+from tools import bench_render, eval_check, perft
+
+EPD_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "bratko_kopec.epd")
+
+# Whether a larger value of a metric is better, by metric name suffix
+HIGHER_IS_BETTER = ("_nps", "_per_sec", "solved")
+LOWER_IS_BETTER = ("_ms", "_seconds")
+
+
+def load_epd(path=EPD_PATH):
+    """(id, board, best moves) for every position in an EPD file"""
+    positions = []
+    with open(path) as epd:
+        for line in epd:
+            if not line.strip():
+                continue
+            board = chess.Board()
+            operations = board.set_epd(line)
+            positions.append((operations.get("id", board.fen()), board, operations.get("bm", [])))
+    return positions
+
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[int(fraction * (len(samples) - 1))]
+
+
+def bench_perft(depth):
+    results = perft.run(depth)
+    nodes = sum(result["engine_nodes"] for result in results)
+    seconds = sum(result["engine_nodes"] / result["engine_nps"] for result in results if result["engine_nps"])
+    return {
+        "perft.engine_nps": int(nodes / seconds) if seconds else 0,
+        "perft.mismatches": sum(
+            result["engine_nodes"] != result["expected"] for result in results
+        ),
+    }
+
+
+def bench_search(depth, time_limit):
+    """Search every EPD position to `depth` with a fresh transposition table"""
+    nodes = 0
+    seconds = 0.0
+    solved = 0
+    times = []
+    for _, board, best_moves in load_epd():
+        searcher = Searcher(TranspositionTable(16))
+        result = searcher.search(board, SearchLimits(time=time_limit, nodes=None, depth=depth))
+        nodes += result.nodes
+        seconds += result.time
+        times.append(result.time)
+        solved += result.move in best_moves
+    return {
+        "search.engine_nps": int(nodes / seconds) if seconds else 0,
+        "search.time_to_depth_seconds": seconds,
+        "search.p95_time_to_depth_seconds": percentile(times, 0.95),
+        "search.solved": solved,
+    }
+
+
+def bench_render_section(plies, reruns):
+    results = bench_render.run(plies, reruns)
+    return {f"render.{name}_per_sec": rate for name, rate in results.items()}
+
+
+def bench_click(plies, seed=0):
+    """Replay a random game through the app's click-to-move path, timing each move"""
+    rng = random.Random(seed)
+    board_cache = BoardCache()
+    record = GameRecord()
+    render_board.cache_clear()
+    latencies = []
+    for _ in range(plies):
+        board = board_cache.board("bench", record)
+        moves = board_cache.move_index("bench", record).moves
+        if not moves:
+            break
+        chosen = rng.choice(moves)
+        value = {"move": chosen.uci(), "fen": board.fen(), "nonce": 0}
+
+        start = time.perf_counter()
+        # submit_board_move(): validate against the current position and play
+        board = board_cache.board("bench", record)
+        if value["fen"] == board.fen():
+            move = chess.Move.from_uci(value["move"])
+            move = board_cache.move_index("bench", record).lookup(move.from_square, move.to_square)
+            board.push(move)
+            record.push(move)
+            board.is_game_over()
+        # The rerun: next position's SVG and move map, serialized for the browser
+        last_move = record.last_move().uci()
+        svg = render_board(board.board_fen(), False, None, (), last_move, 500)
+        client_moves = board_cache.move_index("bench", record).client_moves()
+        json.dumps({"svg": svg, "fen": board.fen(), "moves": client_moves})
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {
+        "click.mean_ms": sum(latencies) / len(latencies),
+        "click.p95_ms": percentile(latencies, 0.95),
+    }
+
+
+def bench_eval(games):
+    """Static evaluation rates of every path, plus their disagreements with the scalar one"""
+    result = eval_check.run(games)
+    metrics = {f"eval.{path}_per_sec": rate for path, rate in result["per_sec"].items()}
+    metrics["eval.mismatches"] = sum(result["mismatches"].values())
+    return metrics
+
+
+def bench_puzzles(picks, seed=0):
+    """Random picks in a rating range (with and without a theme) and ID lookups per second"""
+    puzzles = load_puzzles(config.PUZZLE_DB)
+    rng = random.Random(seed)
+    theme = max(puzzles.themes, key=lambda name: puzzles.count(1000, 1800, name))
+    rates = {}
+    for name, pick in (("picks", lambda: puzzles.choose(1000, 1800, None, rng)),
+                       ("theme_picks", lambda: puzzles.choose(1000, 1800, theme, rng))):
+        start = time.perf_counter()
+        for _ in range(picks):
+            pick()
+        rates[f"puzzles.{name}_per_sec"] = picks / (time.perf_counter() - start)
+    ids = [puzzles.choose(0, 4000, None, rng).id for _ in range(picks)]
+    start = time.perf_counter()
+    for puzzle_id in ids:
+        puzzles.find(puzzle_id)
+    rates["puzzles.finds_per_sec"] = picks / (time.perf_counter() - start)
+    return rates
+
+
+def run(sections, args):
+    """Run the selected sections and return a flat {metric: value} dict"""
+    runners = {
+        "perft": lambda: bench_perft(args.perft_depth),
+        "search": lambda: bench_search(args.search_depth, args.search_time),
+        "render": lambda: bench_render_section(args.plies, args.reruns),
+        "click": lambda: bench_click(args.plies),
+        "eval": lambda: bench_eval(args.eval_games),
+        "puzzles": lambda: bench_puzzles(args.puzzle_picks),
+    }
+    metrics = {}
+    for section in sections:
+        start = time.perf_counter()
+        metrics.update(runners[section]())
+        print(f"  {section} done in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    return metrics
+
+
+def compare(metrics, baseline, tolerance):
+    """Lines describing each shared metric, and whether any regressed past `tolerance`"""
+    lines = []
+    regressed = False
+    for name, value in metrics.items():
+        if name not in baseline:
+            continue
+        old = baseline[name]
+        if not old:
+            # No relative change from zero (e.g. the mismatch counters): compare the values
+            change = None
+            worse = value < old if name.endswith(HIGHER_IS_BETTER) else value > old
+        else:
+            change = (value - old) / abs(old)
+            if name.endswith(HIGHER_IS_BETTER):
+                worse = change < -tolerance
+            elif name.endswith(LOWER_IS_BETTER):
+                worse = change > tolerance
+            else:
+                worse = value > old
+        regressed |= worse
+        lines.append(f"{name:<40} {old:>14,.2f} -> {value:>14,.2f}  "
+                     f"{'n/a' if change is None else format(change, '+.1%'):>7}"
+                     f"{'  REGRESSION' if worse else ''}")
+    return lines, regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", nargs="+", choices=["perft", "search", "render", "click", "eval", "puzzles"],
+                        default=["perft", "search", "render", "click", "eval", "puzzles"],
+                        help="sections to run (default: all)")
+    parser.add_argument("--perft-depth", type=int, default=3, help="perft depth (default: 3)")
+    parser.add_argument("--search-depth", type=int, default=4, help="search depth per position (default: 4)")
+    parser.add_argument("--search-time", type=float, default=10.0,
+                        help="time cap per searched position in seconds (default: 10)")
+    parser.add_argument("--plies", type=int, default=60, help="plies for the render and click sections (default: 60)")
+    parser.add_argument("--eval-games", type=int, default=50,
+                        help="random games whose positions the eval section scores (default: 50)")
+    parser.add_argument("--puzzle-picks", type=int, default=20000,
+                        help="picks and lookups timed by the puzzles section (default: 20000)")
+    parser.add_argument("--reruns", type=int, default=5, help="renders of each position (default: 5)")
+    parser.add_argument("--json", metavar="PATH", help="write the results to a JSON file")
+    parser.add_argument("--compare", metavar="BASELINE", help="JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=10.0,
+                        help="allowed slowdown before a metric counts as a regression, in percent (default: 10)")
+    parser.add_argument("--profile", action="store_true", help="profile the run and print the hottest functions")
+    args = parser.parse_args(argv)
+
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler:
+        profiler.enable()
+    metrics = run(args.only, args)
+    if profiler:
+        profiler.disable()
+        pstats.Stats(profiler, stream=sys.stderr).sort_stats("cumulative").print_stats(25)
+
+    for name, value in metrics.items():
+        print(f"{name:<40} {value:>14,.2f}")
+
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "metrics": metrics,
+            }, output, indent=2)
+
+    # Disagreeing move generators or evaluations fail the run on their own
+    status = 1 if metrics.get("perft.mismatches") or metrics.get("eval.mismatches") else 0
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)["metrics"]
+        lines, regressed = compare(metrics, baseline, args.tolerance / 100)
+        print()
+        print("\n".join(lines))
+        status = status or int(regressed)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""Streamlit cold start and rerun times, measured headless with AppTest
+
+Usage: python -m tools.bench_app [--app PATH] [--runs N]
+
+Cold start is the first run of the app in a fresh Python process, which
+includes importing everything the setup screen pulls in. Rerun time is
+the median full run of the game screen of a two-player game. Point
+--app at another checkout's app.py to compare before and after.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+DEFAULT_APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+COLD_START_SCRIPT = """
+import sys, time
+from streamlit.testing.v1 import AppTest
+start = time.perf_counter()
+AppTest.from_file(sys.argv[1], default_timeout=60).run()
+print(time.perf_counter() - start)
+"""
+
+RERUN_SCRIPT = """
+import statistics, sys, time
+from streamlit.testing.v1 import AppTest
+runs = int(sys.argv[2])
+at = AppTest.from_file(sys.argv[1], default_timeout=60).run()
+at.button(key="vs_human").click().run()
+at.button(key="white").click().run()
+idle = []
+for _ in range(runs):
+    start = time.perf_counter()
+    at.run()
+    idle.append(time.perf_counter() - start)
+moves = []
+# Knights out and back; three cycles stay clear of fivefold repetition
+for from_square, to_square in [("g1", "f3"), ("g8", "f6"), ("f3", "g1"), ("f6", "g8")] * 3:
+    at.text_input(key="from_square").input(from_square)
+    at.text_input(key="to_square").input(to_square)
+    start = time.perf_counter()
+    at.button(key="make_move").click().run()
+    moves.append(time.perf_counter() - start)
+# Apps from before the GameRecord keep the game in a chess.Board
+state = at.session_state
+played = len(state.game) if "game" in state else len(state.board.move_stack)
+assert played == len(moves), "moves were not played"
+print(statistics.median(idle), statistics.median(moves))
+"""
+
+
+def run_script(script, app, *args):
+    """Run `script` in a fresh interpreter from the app's directory; returns its last output line"""
+    directory = os.path.dirname(app)
+    output = subprocess.run(
+        [sys.executable, "-c", script, app, *map(str, args)],
+        cwd=directory, env=dict(os.environ, PYTHONPATH=directory),
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return output.strip().splitlines()[-1]
+
+
+def cold_start(app, runs):
+    """Median seconds for the first run of `app` in a fresh interpreter"""
+    return statistics.median(float(run_script(COLD_START_SCRIPT, app)) for _ in range(runs))
+
+
+def game_reruns(app, runs):
+    """Median seconds of a full rerun on the game screen, and of a rerun that plays a move"""
+    idle, move = run_script(RERUN_SCRIPT, app, runs).split()
+    return float(idle), float(move)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app", default=DEFAULT_APP, help="app.py to measure (default: this checkout)")
+    parser.add_argument("--runs", type=int, default=5, help="samples per measurement (default: 5)")
+    args = parser.parse_args(argv)
+    app = os.path.abspath(args.app)
+
+    print(f"cold start        {cold_start(app, args.runs) * 1000:8.1f} ms")
+    idle, move = game_reruns(app, args.runs * 4)
+    print(f"game rerun        {idle * 1000:8.1f} ms")
+    print(f"rerun with move   {move * 1000:8.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
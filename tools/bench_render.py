@@ -0,0 +1,84 @@
+"""Micro-benchmark of board SVG renders per second
+
+Usage: python -m tools.bench_render [--plies N] [--reruns N]
+
+Compares a full chess.svg.board() render per rerun (the old path), the
+layered render without its cache, and the cached render when the same
+position is redrawn by several reruns.
+"""
+import argparse
+import random
+import sys
+import time
+
+import chess
+import chess.svg
+
+from render import render_board
+
+
+def sample_states(plies, seed=0):
+    """Render keys for a random game, with a selected piece on every position"""
+    rng = random.Random(seed)
+    board = chess.Board()
+    states = []
+    last_move = None
+    for _ in range(plies):
+        moves = list(board.legal_moves)
+        if not moves:
+            break
+        selected = rng.choice(moves).from_square
+        targets = tuple(sorted({move.to_square for move in moves if move.from_square == selected}))
+        states.append((board.board_fen(), False, selected, targets, last_move, 500))
+        move = rng.choice(moves)
+        board.push(move)
+        last_move = move.uci()
+    return states
+
+
+def full_render(board_fen, flipped, selected, targets, last_move, size):
+    """What get_board_svg() did before the render cache"""
+    fill = {selected: "#ffff0070"}
+    fill.update(dict.fromkeys(targets, "#90EE9070"))
+    return chess.svg.board(
+        chess.Board(board_fen + " w - - 0 1"),
+        flipped=flipped,
+        size=size,
+        fill=fill,
+        lastmove=chess.Move.from_uci(last_move) if last_move else None,
+    )
+
+
+def renders_per_second(render, states, reruns):
+    start = time.perf_counter()
+    for state in states:
+        for _ in range(reruns):
+            render(*state)
+    return len(states) * reruns / (time.perf_counter() - start)
+
+
+def run(plies=60, reruns=5):
+    states = sample_states(plies)
+    render_board.cache_clear()
+    return {
+        "full_render": renders_per_second(full_render, states, reruns),
+        "layered_uncached": renders_per_second(render_board.__wrapped__, states, reruns),
+        "layered_cached": renders_per_second(render_board, states, reruns),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--plies", type=int, default=60, help="positions to render (default: 60)")
+    parser.add_argument("--reruns", type=int, default=5, help="renders of each position (default: 5)")
+    args = parser.parse_args(argv)
+
+    results = run(args.plies, args.reruns)
+    baseline = results["full_render"]
+    for name, rate in results.items():
+        print(f"{name:<17} {rate:>12,.0f} renders/sec  ({rate / baseline:.1f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
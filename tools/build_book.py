@@ -0,0 +1,26 @@
+"""Build a Polyglot opening book from a PGN file
+
+Usage: python -m tools.build_book games.pgn book.bin [--plies N]
+"""
+import argparse
+import sys
+
+from engine.book import ENTRY_SIZE, build_book
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pgn", help="PGN file to read games from")
+    parser.add_argument("output", help="polyglot .bin file to write")
+    parser.add_argument("--plies", type=int, default=20, help="plies of each game to include (default: 20)")
+    args = parser.parse_args(argv)
+
+    data = build_book(args.pgn, args.plies)
+    with open(args.output, "wb") as output:
+        output.write(data)
+    print(f"Wrote {len(data) // ENTRY_SIZE:,} entries to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
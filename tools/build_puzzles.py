@@ -0,0 +1,42 @@
+"""Build the memory-mapped puzzle file from a Lichess puzzle CSV
+
+Usage: python -m tools.build_puzzles lichess_db_puzzle.csv.zst puzzles.bin
+                                     [--min-popularity N]
+
+Reads the Lichess puzzle database export (https://database.lichess.org/,
+plain, .gz, or .zst with the zstandard package installed) and writes the
+file CHESS_WIZARD_PUZZLES points the app at.
+"""
+import argparse
+import os
+import sys
+import time
+
+from puzzledb import build_puzzles, open_puzzles, read_csv
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("csv", help="Lichess puzzle CSV to read")
+    parser.add_argument("output", help="puzzle file to write")
+    parser.add_argument("--min-popularity", type=int, default=None,
+                        help="leave out puzzles with a lower Lichess popularity (-100 to 100)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    try:
+        with open(args.output, "wb") as output:
+            count = build_puzzles(read_csv(args.csv), output, args.min_popularity)
+    except ValueError as error:
+        os.remove(args.output)
+        print(error, file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - start
+    puzzles = open_puzzles(args.output)
+    print(f"Wrote {count:,} puzzles with {len(puzzles.themes)} themes to {args.output} "
+          f"({os.path.getsize(args.output) / 2**20:.1f} MB) in {elapsed:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""Evaluation check: the scalar, incremental and batched paths must agree
+
+Usage: python -m tools.eval_check [--games N] [--seed N]
+
+Plays random games and scores every position four ways:
+  scalar       engine.evaluate.evaluate() on a chess.Board, piece by piece
+  incremental  Position.evaluate() after make(), and again after unmake()
+  batch        engine.batcheval.evaluate_boards() on all boards at once
+  positions    engine.batcheval.evaluate_positions() on all Positions at once
+and reports positions/sec for each. Exits with status 1 on any mismatch.
+"""
+import argparse
+import random
+import sys
+import time
+
+import chess
+
+from engine.batcheval import evaluate_boards, evaluate_positions
+from engine.evaluate import evaluate
+from engine.position import Position
+
+
+def random_games(games, seed, max_plies=160):
+    """Boards of every position of `games` random games, and the moves that lead there"""
+    rng = random.Random(seed)
+    boards = []
+    lines = []
+    for _ in range(games):
+        board = chess.Board()
+        line = []
+        for _ in range(max_plies):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            move = rng.choice(moves)
+            board.push(move)
+            line.append(move)
+            boards.append(board.copy(stack=False))
+        lines.append(line)
+    return boards, lines
+
+
+def engine_lines(lines):
+    """The games' moves as engine moves, so converting them is not timed"""
+    converted = []
+    for line in lines:
+        position = Position()
+        moves = []
+        for chess_move in line:
+            moves.append(position.from_chess_move(chess_move))
+            position.make(moves[-1])
+        converted.append(moves)
+    return converted
+
+
+def incremental_scores(lines):
+    """Position.evaluate() after each make(), then (score, expected) after each unmake()"""
+    after_make = []
+    after_unmake = []
+    for moves in lines:
+        position = Position()
+        scores = []
+        for move in moves:
+            position.make(move)
+            scores.append(position.evaluate())
+        # Unmaking must restore each earlier score exactly
+        for index in range(len(moves) - 1, 0, -1):
+            position.unmake(moves[index])
+            after_unmake.append((position.evaluate(), scores[index - 1]))
+        after_make.extend(scores)
+    return after_make, after_unmake
+
+
+def rate(count, seconds):
+    return int(count / seconds) if seconds else 0
+
+
+def run(games, seed=0):
+    """Score the positions of `games` random games every way; returns counts, mismatches and rates"""
+    boards, lines = random_games(games, seed)
+    positions = [Position.from_board(board) for board in boards]
+    lines = engine_lines(lines)
+
+    start = time.perf_counter()
+    scalar = [evaluate(board) for board in boards]
+    scalar_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    incremental, restored = incremental_scores(lines)
+    incremental_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = evaluate_boards(boards).tolist()
+    batch_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch_positions = evaluate_positions(positions).tolist()
+    positions_time = time.perf_counter() - start
+
+    return {
+        "positions": len(boards),
+        "mismatches": {
+            "incremental": sum(a != b for a, b in zip(scalar, incremental)),
+            "unmake": sum(a != b for a, b in restored),
+            "batch": sum(a != b for a, b in zip(scalar, batch)),
+            "positions": sum(a != b for a, b in zip(scalar, batch_positions)),
+        },
+        "per_sec": {
+            "scalar": rate(len(boards), scalar_time),
+            # Includes the make/unmake that keeps the terms up to date
+            "incremental": rate(len(incremental) + len(restored), incremental_time),
+            "batch": rate(len(boards), batch_time),
+            "positions": rate(len(boards), positions_time),
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=50, help="random games to play (default: 50)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed (default: 0)")
+    args = parser.parse_args(argv)
+
+    result = run(args.games, args.seed)
+    print(f"{result['positions']:,} positions")
+    print(f"{'path':<12} {'positions/sec':>14} {'mismatches':>11}")
+    for path, per_sec in result["per_sec"].items():
+        # The scalar path is the reference the others are compared with
+        mismatches = result["mismatches"].get(path)
+        print(f"{path:<12} {per_sec:>14,} {'reference' if mismatches is None else mismatches:>11}")
+    print(f"{'unmake':<12} {'':>14} {result['mismatches']['unmake']:>11}")
+    return 1 if any(result["mismatches"].values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+"""Load test of the online game hub with many simulated players
+
+Usage: python -m tools.hub_load [--games N] [--seconds S] [--threads N]
+                                [--poll S] [--think S] [--seed N]
+
+Every game has two simulated clients that behave like the app's
+sessions: they poll the game's version counter every --poll seconds,
+fetch only the new moves when it changed, and play a random legal move
+about --think seconds after it became their turn. Finished games are
+replaced by new ones, so --games games are always in progress. Clients
+are spread over --threads threads, as Streamlit runs each session's
+script on its own thread.
+
+Reports hub operations per second, their latency percentiles, how long a
+move takes to reach the opponent, and the process's peak memory.
+"""
+import argparse
+import random
+import resource
+import sys
+import threading
+import time
+
+import chess
+
+from gamehub import GameHub
+from gamerecord import decode_move
+from gameresult import GameStatus, claimable_draw, game_result
+
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[int(fraction * (len(samples) - 1))] if samples else 0.0
+
+
+class Client:
+    """One simulated player: its seat and its own copy of the game"""
+
+    def __init__(self, hub, code, token, color, rng, now, poll):
+        self.hub = hub
+        self.code = code
+        self.token = token
+        self.color = color
+        self.rng = rng
+        self.board = chess.Board()
+        self.status = GameStatus(self.board)
+        self.version = -1
+        self.next_poll = now + rng.uniform(0, poll)
+        self.move_at = None
+        self.finished = False
+        self.opponent = None
+
+
+class Worker(threading.Thread):
+    """Runs the clients of some games until the deadline, replacing finished games"""
+
+    def __init__(self, hub, games, args, deadline, seed):
+        super().__init__(daemon=True)
+        self.hub = hub
+        self.args = args
+        self.deadline = deadline
+        self.rng = random.Random(seed)
+        self.clients = []
+        self.timings = {"poll": [], "fetch": [], "push": []}
+        self.delivery = []
+        self.pushed_at = {}
+        self.moves = 0
+        self.refused = 0
+        self.finished = 0
+        now = time.monotonic()
+        for _ in range(games):
+            self.new_game(now)
+
+    def new_game(self, now):
+        """Create a game and seat both of its clients"""
+        color = self.rng.choice(chess.COLORS)
+        code, token = self.hub.create(color)
+        creator = Client(self.hub, code, token, color, self.rng, now, self.args.poll)
+        other_color, other_token = self.hub.join(code)
+        joiner = Client(self.hub, code, other_token, other_color, self.rng, now, self.args.poll)
+        creator.opponent, joiner.opponent = joiner, creator
+        self.clients += [creator, joiner]
+
+    def timed(self, kind, call, *args):
+        start = time.perf_counter()
+        result = call(*args)
+        self.timings[kind].append(time.perf_counter() - start)
+        return result
+
+    def poll(self, client, now):
+        """The app's poller: check the version, fetch new moves only when it moved"""
+        client.next_poll = now + self.args.poll
+        if self.timed("poll", self.hub.version, client.code) == client.version:
+            return
+        version, moves, result, _ = self.timed(
+            "fetch", self.hub.moves_since, client.code, len(client.board.move_stack)
+        )
+        for code in moves:
+            client.board.push(decode_move(code))
+            client.status.push(client.board)
+            pushed = self.pushed_at.pop((client.code, len(client.board.move_stack)), None)
+            if pushed is not None:
+                self.delivery.append(now - pushed)
+        client.version = version
+        if result is not None or game_result(client.board, client.status) is not None:
+            client.finished = True
+        elif client.board.turn == client.color and client.move_at is None:
+            client.move_at = now + self.rng.uniform(0.5, 1.5) * self.args.think
+
+    def move(self, client, now):
+        client.move_at = None
+        claim = claimable_draw(client.status)
+        if claim is not None:
+            self.hub.finish(client.code, client.token, claim)
+            client.finished = True
+            return
+        move = self.rng.choice(list(client.board.legal_moves))
+        version = self.timed("push", self.hub.push, client.code, client.token, move, client.version)
+        if version is None:
+            # Fetch the game again on the next poll
+            self.refused += 1
+            client.version = -1
+            return
+        client.board.push(move)
+        client.status.push(client.board)
+        client.version = version
+        self.moves += 1
+        self.pushed_at[(client.code, len(client.board.move_stack))] = now
+        if game_result(client.board, client.status) is not None:
+            client.finished = True
+
+    def run(self):
+        while True:
+            now = time.monotonic()
+            if now >= self.deadline:
+                return
+            for client in self.clients:
+                if client.move_at is not None and now >= client.move_at:
+                    self.move(client, now)
+                if now >= client.next_poll:
+                    self.poll(client, now)
+            # Both clients have seen the end of a game: open a new one in its place
+            done = [client for client in self.clients if client.finished and client.opponent.finished]
+            for client in done:
+                if client.color == chess.WHITE:
+                    self.finished += 1
+                    self.new_game(now)
+            if done:
+                self.clients = [client for client in self.clients if not client.finished]
+            time.sleep(0.005)
+
+
+def run(games, seconds, threads, poll, think, seed=0):
+    """Simulate `games` concurrent games for `seconds`; returns the measurements"""
+    hub = GameHub()
+    args = argparse.Namespace(poll=poll, think=think)
+    deadline = time.monotonic() + seconds
+    threads = max(1, min(threads, games))
+    workers = [
+        Worker(hub, games // threads + (index < games % threads), args, deadline, seed + index)
+        for index in range(threads)
+    ]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    timings = {kind: [sample for worker in workers for sample in worker.timings[kind]]
+               for kind in ("poll", "fetch", "push")}
+    delivery = [sample for worker in workers for sample in worker.delivery]
+    return {
+        "games": games,
+        "clients": 2 * games,
+        "seconds": elapsed,
+        "moves": sum(worker.moves for worker in workers),
+        "refused": sum(worker.refused for worker in workers),
+        "finished": sum(worker.finished for worker in workers),
+        "timings": timings,
+        "delivery": delivery,
+        "hub": hub.stats(),
+        # Linux reports kilobytes
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=300, help="concurrent games (default: 300)")
+    parser.add_argument("--seconds", type=float, default=20.0, help="length of the run (default: 20)")
+    parser.add_argument("--threads", type=int, default=32, help="client threads (default: 32)")
+    parser.add_argument("--poll", type=float, default=1.0, help="seconds between version polls (default: 1.0)")
+    parser.add_argument("--think", type=float, default=2.0, help="average seconds per move (default: 2.0)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed (default: 0)")
+    args = parser.parse_args(argv)
+
+    result = run(args.games, args.seconds, args.threads, args.poll, args.think, args.seed)
+    seconds = result["seconds"]
+    print(f"{result['games']} games, {result['clients']} clients, {args.threads} threads, {seconds:.1f}s")
+    print(f"moves {result['moves']:,} ({result['moves'] / seconds:,.0f}/s) · refused {result['refused']} · "
+          f"games finished {result['finished']}")
+    print(f"{'operation':<10} {'per sec':>10} {'p50 us':>9} {'p95 us':>9} {'p99 us':>9}")
+    for kind, samples in result["timings"].items():
+        print(f"{kind:<10} {len(samples) / seconds:>10,.0f} {percentile(samples, 0.5) * 1e6:>9.1f} "
+              f"{percentile(samples, 0.95) * 1e6:>9.1f} {percentile(samples, 0.99) * 1e6:>9.1f}")
+    delivery = result["delivery"]
+    print(f"move seen by opponent after {percentile(delivery, 0.5) * 1000:.0f} ms p50, "
+          f"{percentile(delivery, 0.95) * 1000:.0f} ms p95 (poll interval {args.poll * 1000:.0f} ms)")
+    print(f"hub {result['hub']} · peak RSS {result['peak_rss_mb']:.0f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
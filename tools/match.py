@@ -0,0 +1,261 @@
+"""Headless engine-vs-engine matches for strength and speed testing
+
+Usage: python -m tools.match ENGINE_A ENGINE_B [--games N] [--jobs N]
+                             [--opening-plies N] [--max-plies N] [--pgn PATH]
+
+Each engine is a name followed by comma-separated settings, e.g.
+``fast:time=0.1,depth=3`` or ``big-tt:time=0.2,tt=64``. Settings:
+
+  time   seconds per move (default 0.1)
+  nodes  node limit per move (default none)
+  depth  depth limit per move (default 64)
+  tt     transposition table size in MB (default 16)
+  book   plies during which the opening book is used (default 0)
+  uci    path of a UCI engine binary to play instead of the built-in engine
+
+Openings come from data/openings.pgn, cut to --opening-plies, and each
+is played twice with colours swapped. Games run in parallel worker
+processes, end by the same rules as the app with threefold repetition
+and 50-move draws claimed (plus a --max-plies draw), and are appended
+to the PGN file as they finish.
+"""
+import argparse
+import math
+import multiprocessing
+import os
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import util
+
+import chess
+import chess.pgn
+
+from engine.book import BUNDLED_PGN, book_ply, load_book
+from engine.external import ExternalEngine
+from engine.search import MAX_PLY, Searcher, SearchLimits
+from engine.tt import TranspositionTable
+from gameresult import GameStatus, claimable_draw, game_result
+
+EngineSpec = namedtuple("EngineSpec", ["name", "limits", "tt_size_mb", "book_plies", "uci_command"])
+
+# Per-process opening book, loaded on first use
+_book = None
+# Per-process external engines by command, kept running across games
+_external_engines = {}
+
+
+def parse_engine(text):
+    """EngineSpec from ``name:key=value,...``"""
+    name, _, settings = text.partition(":")
+    values = {"time": "0.1", "nodes": None, "depth": str(MAX_PLY), "tt": "16", "book": "0", "uci": None}
+    for setting in filter(None, settings.split(",")):
+        key, _, value = setting.partition("=")
+        if key not in values:
+            raise argparse.ArgumentTypeError(f"unknown engine setting {key!r}")
+        values[key] = value
+    limits = SearchLimits(
+        time=float(values["time"]) or None,
+        nodes=int(values["nodes"]) if values["nodes"] else None,
+        depth=int(values["depth"]),
+    )
+    return EngineSpec(name, limits, int(values["tt"]), int(values["book"]), values["uci"])
+
+
+def load_openings(plies, path=BUNDLED_PGN):
+    """Distinct UCI move lists of the first `plies` moves of every game in a PGN file"""
+    openings = []
+    seen = set()
+    with open(path) as pgn:
+        while True:
+            game = chess.pgn.read_game(pgn)
+            if game is None:
+                break
+            board = game.board()
+            moves = []
+            for move in list(game.mainline_moves())[:plies]:
+                moves.append(move.uci())
+                board.push(move)
+            if board.fen() not in seen:
+                seen.add(board.fen())
+                openings.append(moves)
+    return openings
+
+
+def make_searcher(spec):
+    """A fresh built-in searcher, or this process's running external engine"""
+    if not spec.uci_command:
+        return Searcher(TranspositionTable(spec.tt_size_mb))
+    if spec.uci_command not in _external_engines:
+        engine = ExternalEngine(spec.uci_command, {"Hash": spec.tt_size_mb})
+        util.Finalize(None, engine.close, exitpriority=10)
+        _external_engines[spec.uci_command] = engine
+    return _external_engines[spec.uci_command]
+
+
+def choose_move(searcher, spec, board):
+    """Book move if `spec` uses the book here, otherwise search; returns (move, nodes, seconds)"""
+    global _book
+    start = time.perf_counter()
+    if spec.book_plies and book_ply(board) < spec.book_plies:
+        if _book is None:
+            _book = load_book()
+        move = _book.choose(board)
+        if move is not None:
+            return move, 0, time.perf_counter() - start
+    result = searcher.search(board, spec.limits)
+    return result.move, result.nodes, result.time
+
+
+def play_game(number, opening, white, black, max_plies):
+    """Play one game in a worker process and return its moves, result and per-side stats"""
+    board = chess.Board()
+    status = GameStatus(board)
+    for uci in opening:
+        board.push_uci(uci)
+        status.push(board)
+    searchers = {chess.WHITE: make_searcher(white), chess.BLACK: make_searcher(black)}
+    specs = {chess.WHITE: white, chess.BLACK: black}
+    stats = {color: {"nodes": 0, "time": 0.0, "moves": 0} for color in chess.COLORS}
+
+    # Engines claim every draw they may, as match adjudicators do
+    result = game_result(board, status) or claimable_draw(status)
+    while result is None and board.ply() < max_plies:
+        side = board.turn
+        move, nodes, seconds = choose_move(searchers[side], specs[side], board)
+        board.push(move)
+        status.push(board)
+        stats[side]["nodes"] += nodes
+        stats[side]["time"] += seconds
+        stats[side]["moves"] += 1
+        result = game_result(board, status) or claimable_draw(status)
+    if result is None:
+        result = ("1/2-1/2", f"Draw by adjudication after {max_plies} plies")
+
+    return {
+        "number": number,
+        "white": white.name,
+        "black": black.name,
+        "opening_plies": len(opening),
+        "moves": [move.uci() for move in board.move_stack],
+        "result": result[0],
+        "termination": result[1],
+        "stats": {white.name: stats[chess.WHITE], black.name: stats[chess.BLACK]},
+    }
+
+
+def pgn_game(game):
+    """A finished game as PGN text"""
+    pgn = chess.pgn.Game()
+    pgn.headers["Event"] = "Chess Wizard engine match"
+    pgn.headers["Round"] = str(game["number"])
+    pgn.headers["White"] = game["white"]
+    pgn.headers["Black"] = game["black"]
+    pgn.headers["Result"] = game["result"]
+    pgn.headers["Termination"] = game["termination"]
+    node = pgn
+    for index, uci in enumerate(game["moves"]):
+        move = chess.Move.from_uci(uci)
+        node = node.add_variation(move)
+        if index == game["opening_plies"] - 1:
+            node.comment = "end of opening"
+    return str(pgn) + "\n\n"
+
+
+def elo_difference(wins, losses, draws):
+    """Elo difference and its 95% error margin from the first engine's point of view"""
+    games = wins + losses + draws
+    if not games:
+        return 0.0, math.inf
+    score = (wins + 0.5 * draws) / games
+    # Per-game variance of the score, with one extra win and one extra loss
+    # as a prior: when every game has the same result the sample variance
+    # is 0, which would claim a margin of exactly 0
+    prior_score = (wins + 1 + 0.5 * draws) / (games + 2)
+    variance = ((wins + 1) * (1 - prior_score) ** 2 + (losses + 1) * prior_score ** 2
+                + draws * (0.5 - prior_score) ** 2) / (games + 2)
+    margin = 1.96 * math.sqrt(variance / games)
+
+    def to_elo(p):
+        if p <= 0:
+            return -math.inf
+        if p >= 1:
+            return math.inf
+        return 400 * math.log10(p / (1 - p))
+
+    elo = to_elo(score)
+    if math.isinf(elo):
+        return elo, math.inf
+    return elo, max(to_elo(min(score + margin, 1)) - elo, elo - to_elo(max(score - margin, 0)))
+
+
+def schedule(openings, first, second, games):
+    """(number, opening, white, black) for `games` games, alternating colours per opening"""
+    pairings = []
+    for number in range(games):
+        opening = openings[(number // 2) % len(openings)]
+        white, black = (first, second) if number % 2 == 0 else (second, first)
+        pairings.append((number + 1, opening, white, black))
+    return pairings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("engine_a", type=parse_engine, help="first engine, e.g. base:time=0.1")
+    parser.add_argument("engine_b", type=parse_engine, help="second engine, e.g. deep:time=0.1,depth=6")
+    parser.add_argument("--games", type=int, default=20, help="number of games (default: 20)")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1,
+                        help="games played in parallel (default: CPU count)")
+    parser.add_argument("--opening-plies", type=int, default=8,
+                        help="plies of each bundled opening to play before the engines take over (default: 8)")
+    parser.add_argument("--max-plies", type=int, default=300, help="adjudicate a draw after this many plies (default: 300)")
+    parser.add_argument("--pgn", metavar="PATH", help="append finished games to this PGN file")
+    args = parser.parse_args(argv)
+
+    first, second = args.engine_a, args.engine_b
+    if first.name == second.name:
+        parser.error("the two engines need different names")
+    pairings = schedule(load_openings(args.opening_plies), first, second, args.games)
+
+    tally = {"wins": 0, "losses": 0, "draws": 0}
+    totals = {name: {"nodes": 0, "time": 0.0, "moves": 0} for name in (first.name, second.name)}
+    pgn_file = open(args.pgn, "a") if args.pgn else None
+    executor = ProcessPoolExecutor(max_workers=args.jobs, mp_context=multiprocessing.get_context("spawn"))
+    try:
+        futures = [executor.submit(play_game, *pairing, args.max_plies) for pairing in pairings]
+        for done, future in enumerate(as_completed(futures), 1):
+            game = future.result()
+            if game["result"] == "1/2-1/2":
+                tally["draws"] += 1
+            elif (game["result"] == "1-0") == (game["white"] == first.name):
+                tally["wins"] += 1
+            else:
+                tally["losses"] += 1
+            for name, side in game["stats"].items():
+                for key in side:
+                    totals[name][key] += side[key]
+            if pgn_file:
+                pgn_file.write(pgn_game(game))
+                pgn_file.flush()
+            print(f"[{done}/{len(pairings)}] #{game['number']} {game['white']} - {game['black']}: "
+                  f"{game['result']} ({game['termination']})  "
+                  f"+{tally['wins']} -{tally['losses']} ={tally['draws']}")
+    finally:
+        executor.shutdown(cancel_futures=True)
+        if pgn_file:
+            pgn_file.close()
+
+    elo, margin = elo_difference(tally["wins"], tally["losses"], tally["draws"])
+    print()
+    print(f"{first.name} vs {second.name}: +{tally['wins']} -{tally['losses']} ={tally['draws']}  "
+          f"Elo {elo:+.0f} ± {margin:.0f}")
+    for name, total in totals.items():
+        nps = int(total["nodes"] / total["time"]) if total["time"] else 0
+        per_move = total["time"] / total["moves"] if total["moves"] else 0.0
+        print(f"  {name:<16} {nps:>9,} nps  {per_move:.3f}s/move  {total['moves']} moves")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
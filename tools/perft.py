@@ -0,0 +1,84 @@
+"""Perft harness: check the engine's move generator against python-chess
+
+Usage: python -m tools.perft [--depth N]
+"""
+import argparse
+import sys
+import time
+
+import chess
+
+from engine.position import Position, perft
+
+# Standard perft positions with known node counts per depth
+PERFT_POSITIONS = [
+    ("startpos", chess.STARTING_FEN,
+     [20, 400, 8902, 197281, 4865609]),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+     [48, 2039, 97862, 4085603]),
+    ("position3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+     [14, 191, 2812, 43238, 674624]),
+    ("position4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+     [6, 264, 9467, 422333]),
+    ("position5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+     [44, 1486, 62379, 2103487]),
+    ("position6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+     [46, 2079, 89890, 3894594]),
+]
+
+
+def python_chess_perft(board, depth):
+    """Reference perft using python-chess push/pop, the way a search walks the tree"""
+    if depth == 0:
+        return 1
+    nodes = 0
+    for move in board.legal_moves:
+        board.push(move)
+        nodes += python_chess_perft(board, depth - 1)
+        board.pop()
+    return nodes
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def run(depth):
+    """Run every perft position to `depth` and return per-position results"""
+    results = []
+    for name, fen, expected in PERFT_POSITIONS:
+        position_depth = min(depth, len(expected))
+        engine_nodes, engine_time = timed(perft, Position(fen), position_depth)
+        reference_nodes, reference_time = timed(python_chess_perft, chess.Board(fen), position_depth)
+        results.append({
+            "name": name,
+            "depth": position_depth,
+            "expected": expected[position_depth - 1],
+            "engine_nodes": engine_nodes,
+            "engine_nps": int(engine_nodes / engine_time) if engine_time else 0,
+            "python_chess_nodes": reference_nodes,
+            "python_chess_nps": int(reference_nodes / reference_time) if reference_time else 0,
+        })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--depth", type=int, default=3, help="perft depth (default: 3)")
+    args = parser.parse_args(argv)
+
+    failures = 0
+    print(f"{'position':<10} {'depth':>5} {'nodes':>10} {'engine nps':>12} {'python-chess nps':>17}")
+    for result in run(args.depth):
+        ok = result["engine_nodes"] == result["expected"] == result["python_chess_nodes"]
+        failures += not ok
+        print(f"{result['name']:<10} {result['depth']:>5} {result['engine_nodes']:>10,} "
+              f"{result['engine_nps']:>12,} {result['python_chess_nps']:>17,}"
+              f"{'' if ok else '  MISMATCH (expected {:,})'.format(result['expected'])}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""Import PGN files into the game database, or export it as PGN
+
+Usage: python -m tools.pgn_store import GAMES.pgn [--db PATH] [--batch N]
+       python -m tools.pgn_store export OUT.pgn [--db PATH]
+
+Both directions stream: games are parsed and written one at a time (and
+inserted `--batch` games per transaction), so files far larger than
+memory are fine. Imported games get fresh IDs and can be resumed in the
+app like any saved game.
+"""
+import argparse
+import itertools
+import sys
+import time
+import uuid
+
+import config
+from gamestore import GameStore
+from pgnstream import read_games, write_game
+
+
+def import_pgn(store, path, batch):
+    """Insert every game of a PGN file; returns the number imported"""
+    imported = 0
+    with open(path, encoding="utf-8-sig", errors="replace") as pgn:
+        rows = ((uuid.uuid4().hex, record, headers, result) for headers, record, result in read_games(pgn))
+        while True:
+            chunk = list(itertools.islice(rows, batch))
+            if not chunk:
+                return imported
+            store.save_many(chunk)
+            imported += len(chunk)
+
+
+def export_pgn(store, path):
+    """Write every stored game to a PGN file; returns the number exported"""
+    exported = 0
+    with open(path, "w") as pgn:
+        for game_id, record, headers, result in store.iter_games():
+            headers.setdefault("Site", game_id)
+            write_game(pgn, record, headers, result or "*")
+            exported += 1
+    return exported
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("path", help="PGN file to read (import) or write (export)")
+    parser.add_argument("--db", default=config.GAME_DB or "chess_wizard.db",
+                        help="game database (default: CHESS_WIZARD_GAME_DB or chess_wizard.db)")
+    parser.add_argument("--batch", type=int, default=1000, help="games per insert transaction (default: 1000)")
+    args = parser.parse_args(argv)
+
+    store = GameStore(args.db)
+    start = time.perf_counter()
+    if args.command == "import":
+        count = import_pgn(store, args.path, args.batch)
+    else:
+        count = export_pgn(store, args.path)
+    elapsed = time.perf_counter() - start
+    store.close()
+    print(f"{args.command}ed {count:,} games in {elapsed:.1f}s ({count / max(elapsed, 1e-9):,.0f} games/sec)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
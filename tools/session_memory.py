@@ -0,0 +1,76 @@
+"""Per-session memory of the game state, before and after the compact record
+
+Usage: python -m tools.session_memory [--plies N]
+"""
+import argparse
+import random
+import sys
+from array import array
+
+import chess
+
+from gamerecord import GameRecord
+
+
+def deep_size(obj, seen=None):
+    """Approximate bytes reachable from `obj`, counting shared objects once"""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(key, seen) + deep_size(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_size(item, seen) for item in obj)
+    elif isinstance(obj, (str, bytes, bytearray, array, int, float, bool)) or obj is None:
+        pass
+    else:
+        if hasattr(obj, "__dict__"):
+            size += deep_size(vars(obj), seen)
+        for slot in getattr(type(obj), "__slots__", ()):
+            if hasattr(obj, slot):
+                size += deep_size(getattr(obj, slot), seen)
+    return size
+
+
+def random_game(plies, seed=0):
+    rng = random.Random(seed)
+    board = chess.Board()
+    for _ in range(plies):
+        moves = list(board.legal_moves)
+        if not moves:
+            break
+        board.push(rng.choice(moves))
+    return board
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--plies", type=int, default=80, help="length of the sample game (default: 80)")
+    args = parser.parse_args(argv)
+
+    board = random_game(args.plies)
+    selected = next(iter(board.legal_moves)).from_square
+    before = {
+        "board": board,
+        "move_history": [move.uci() for move in board.move_stack],
+        "last_move": board.move_stack[-1],
+        "legal_moves_for_piece": [move for move in board.legal_moves if move.from_square == selected],
+    }
+    record = GameRecord(chess.STARTING_FEN, [])
+    for move in board.move_stack:
+        record.push(move)
+    after = {"game": record}
+
+    before_size = deep_size(before)
+    after_size = deep_size(after)
+    print(f"Game of {len(board.move_stack)} plies")
+    print(f"  live Board + history lists: {before_size:>8,} bytes")
+    print(f"  compact GameRecord:         {after_size:>8,} bytes ({before_size / after_size:.0f}x smaller)")
+    print(f"  live Board while active:    {deep_size(board):>8,} bytes (evicted when idle)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
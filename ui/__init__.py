@@ -0,0 +1 @@
+"""Streamlit pages and session helpers, imported by app.py as they are needed"""
@@ -0,0 +1,116 @@
+"""Performance page: timing histograms, resource gauges and the sampled profile
+
+Opened with ?admin=<CHESS_WIZARD_ADMIN_TOKEN> in the URL, and only when
+that token is set; imported only then. Everything shown is for the
+server process that serves the page.
+"""
+import os
+import time
+
+import streamlit as st
+
+import config
+import metrics
+
+# Histograms in the order they are listed, with what each one times
+OPERATIONS = {
+    "rerun": "Full script run",
+    "game_area": "Game fragment rerun",
+    "board_svg": "Board SVG (render cache lookup or render)",
+    "move_index": "Legal move index of the current position",
+    "board_move": "Click-to-move handling",
+    "text_move": "Text move handling",
+    "check_game_over": "Game-over and draw checks",
+    "ai_submit": "Queueing the computer's search",
+    "ai_queue_wait": "Computer move: wait for a worker",
+    "ai_search": "Computer move: search in the worker",
+    "online_sync": "Online game catch-up",
+    "puzzle_pick": "Picking and setting up a random puzzle",
+}
+
+
+def render():
+    st.markdown("## 📊 Performance")
+    started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(metrics.REGISTRY.started))
+    st.caption(f"Server process {os.getpid()} · collecting since {started}")
+    if not metrics.ENABLED:
+        st.warning("Metrics are off; unset CHESS_WIZARD_METRICS or set it to 1 to collect them")
+        return
+
+    col1, col2, col3, col4, _ = st.columns(5)
+    with col1:
+        st.button("🔄 Refresh", key="admin_refresh")
+    with col2:
+        if st.button("🧹 Reset", key="admin_reset"):
+            metrics.REGISTRY.reset()
+    with col3:
+        st.download_button(
+            "⬇️ Prometheus",
+            metrics.REGISTRY.prometheus_text,
+            file_name="chess_wizard.prom",
+            mime="text/plain",
+            key="admin_prometheus",
+            on_click="ignore",
+        )
+    with col4:
+        if config.METRICS_FILE and st.button("💾 Write File", key="admin_write"):
+            metrics.REGISTRY.write_prometheus(config.METRICS_FILE)
+            st.toast(f"Wrote {config.METRICS_FILE}")
+    if config.METRICS_FILE:
+        st.caption(f"Prometheus file: `{config.METRICS_FILE}`, rewritten every {config.METRICS_EXPORT_SECONDS:g}s")
+
+    timings()
+    gauges()
+    profile()
+
+    if st.button("🏠 Back to the Game", key="admin_back"):
+        st.query_params.pop("admin", None)
+        st.rerun()
+
+
+def timings():
+    st.markdown("### ⏱️ Timings")
+    histograms = metrics.REGISTRY.histograms
+    names = [name for name in OPERATIONS if name in histograms]
+    names += sorted(name for name in histograms if name not in OPERATIONS)
+    rows = []
+    for name in names:
+        summary = histograms[name].summary()
+        if not summary["count"]:
+            continue
+        rows.append({
+            "Operation": name,
+            "What": OPERATIONS.get(name, ""),
+            "Count": summary["count"],
+            **{f"{key} ms": round(summary[key] * 1000, 3) for key in ("mean", "p50", "p95", "p99", "max")},
+        })
+    if not rows:
+        st.caption("Nothing timed yet; play a few moves in another tab")
+        return
+    st.dataframe(rows, hide_index=True, use_container_width=True)
+    st.caption(f"Percentiles of the last {metrics.RECENT_SAMPLES:,} calls of each operation")
+
+
+def gauges():
+    values = metrics.REGISTRY.gauge_values()
+    if not values:
+        return
+    st.markdown("### 📦 Caches and Load")
+    st.dataframe(
+        [{"Gauge": name, "Value": value, "What": help} for name, (help, value) in sorted(values.items())],
+        hide_index=True, use_container_width=True,
+    )
+
+
+def profile():
+    st.markdown("### 🔬 Sampled Profile")
+    if config.PROFILE_SAMPLE_RATE <= 0:
+        st.caption("Set CHESS_WIZARD_PROFILE_RATE (e.g. 0.05) to profile that fraction of reruns")
+        return
+    sort = st.radio("Sort by", ["cumulative", "tottime"], horizontal=True, key="admin_profile_sort")
+    text = metrics.REGISTRY.top_functions(30, sort)
+    st.caption(f"{metrics.REGISTRY.profiled} reruns profiled ({config.PROFILE_SAMPLE_RATE:.0%} sampled)")
+    if text is None:
+        st.caption("No rerun profiled yet")
+    else:
+        st.code(text)
@@ -0,0 +1,243 @@
+"""Game analysis: evaluation graph, mistakes and the best lines of the current position
+
+Imported only when analysis is switched on. Every position of the game is
+queued on the engine service, which spreads the searches over its worker
+pool and caches them by position, so after a take-back, a new move or a
+different continuation only positions not seen before are searched.
+"""
+from array import array
+
+import chess
+import streamlit as st
+
+import config
+from engine import SearchLimits
+from engine.search import MATE_BOUND, MATE_SCORE
+from gamerecord import decode_move
+from ui.computer import get_engine_service
+from ui.state import current_board
+
+ANALYSIS_LIMITS = SearchLimits(time=config.ANALYSIS_SECONDS, depth=8)
+
+# Lines shown for the current position
+MULTIPV = 3
+
+# Evaluations are capped at ten pawns for the graph and for judging moves
+EVAL_CAP = 1000
+
+# Centipawns a move may lose before it is marked, worst first
+MISTAKES = (
+    (300, "??", "Blunder", "#d62728"),
+    (100, "?", "Mistake", "#ff7f0e"),
+    (50, "?!", "Inaccuracy", "#e6c229"),
+)
+
+
+def positions():
+    """[fen, future] for every position of the game, with new positions queued incrementally
+
+    Positions up to the first move that differs from the previous call
+    are kept as they are; the rest are queued, and the engine service
+    answers those it has seen before from its cache.
+    """
+    game = st.session_state.game
+    analysis = st.session_state.analysis
+    if analysis is None or analysis["game_id"] != st.session_state.game_id:
+        analysis = st.session_state.analysis = {
+            "game_id": st.session_state.game_id,
+            "moves": array("H"),
+            "positions": [],
+            "waiting": [],
+        }
+
+    moves = analysis["moves"]
+    entries = analysis["positions"]
+    common = 0
+    while common < min(len(moves), len(game.moves)) and moves[common] == game.moves[common]:
+        common += 1
+    if entries and common == len(moves) == len(game.moves):
+        return entries
+
+    service = get_engine_service()
+    session_id = st.session_state.session_id
+    del entries[common + 1:]
+    if entries:
+        board = chess.Board(entries[-1][0])
+    else:
+        board = chess.Board(game.start_fen)
+        entries.append([board.fen(), service.analyse(session_id, board, ANALYSIS_LIMITS)])
+    for code in game.moves[common:]:
+        board.push(decode_move(code))
+        entries.append([board.fen(), service.analyse(session_id, board, ANALYSIS_LIMITS)])
+    analysis["moves"] = array("H", game.moves)
+    return entries
+
+
+def result_of(entry):
+    """The evaluation of a [fen, future] entry, or None while it is pending or if its search failed
+
+    A future cancelled by another session sharing it is queued again.
+    """
+    future = entry[1]
+    if future.cancelled():
+        future = entry[1] = get_engine_service().analyse(
+            st.session_state.session_id, chess.Board(entry[0]), ANALYSIS_LIMITS
+        )
+    if not future.done() or future.exception() is not None:
+        return None
+    return future.result()
+
+
+def capped(score):
+    return max(-EVAL_CAP, min(EVAL_CAP, score))
+
+
+def white_score(fen, result):
+    """A result's score from White's point of view"""
+    return result["score"] if fen.split(" ", 2)[1] == "w" else -result["score"]
+
+
+def format_score(score):
+    """Centipawns from White's point of view as +1.25, or #3 / #-3 for mates"""
+    if abs(score) >= MATE_BOUND:
+        moves = (MATE_SCORE - abs(score) + 1) // 2
+        return f"#{moves}" if score > 0 else f"#-{moves}"
+    return f"{score / 100:+.2f}"
+
+
+def judge_moves(entries, results, moves):
+    """(ply, move, loss, mark, label, colour, best move) for each marked move
+
+    A move's loss is how much the evaluation dropped for the side that
+    played it, from the position before to the position after it. Moves
+    are given in SAN with their move number.
+    """
+    marked = []
+    for ply, code in enumerate(moves):
+        before, after = results[ply], results[ply + 1]
+        if before is None or after is None or not before["lines"]:
+            continue
+        loss = capped(before["score"]) - capped(-after["score"])
+        for threshold, mark, label, colour in MISTAKES:
+            if loss >= threshold:
+                board = chess.Board(entries[ply][0])
+                best = board.san(chess.Move.from_uci(before["lines"][0]["pv"][0]))
+                marked.append((ply, move_label(board, decode_move(code)), loss, mark, label, colour, best))
+                break
+    return marked
+
+
+def move_label(board, move):
+    """A move's SAN with its move number, e.g. 12... Qxb2"""
+    number = f"{board.fullmove_number}." if board.turn == chess.WHITE else f"{board.fullmove_number}..."
+    return f"{number} {board.san(move)}"
+
+
+def eval_chart(entries, results, marked):
+    """Vega-Lite spec of the evaluation graph with the marked moves as points"""
+    values = [
+        {"ply": ply, "eval": capped(white_score(entries[ply][0], result)) / 100}
+        for ply, result in enumerate(results) if result is not None
+    ]
+    marks = [
+        {"ply": ply + 1, "eval": capped(white_score(entries[ply + 1][0], results[ply + 1])) / 100,
+         "move": f"{san}{mark}", "label": label, "colour": colour}
+        for ply, san, _, mark, label, colour, _ in marked
+    ]
+    return {
+        "height": 220,
+        "layer": [
+            {
+                "data": {"values": values},
+                "mark": {"type": "area", "line": True, "opacity": 0.3},
+                "encoding": {
+                    "x": {"field": "ply", "type": "quantitative", "title": "Ply"},
+                    "y": {"field": "eval", "type": "quantitative", "title": "Evaluation (pawns, White)",
+                          "scale": {"domain": [-EVAL_CAP / 100, EVAL_CAP / 100]}},
+                },
+            },
+            {
+                "data": {"values": marks},
+                "mark": {"type": "point", "filled": True, "size": 80},
+                "encoding": {
+                    "x": {"field": "ply", "type": "quantitative"},
+                    "y": {"field": "eval", "type": "quantitative"},
+                    "color": {"field": "colour", "type": "nominal", "scale": None},
+                    "tooltip": [{"field": "move"}, {"field": "label"}],
+                },
+            },
+        ],
+    }
+
+
+def render():
+    """Analysis panel; hands pending searches to the poller outside the game fragment"""
+    st.markdown("### 📈 Analysis")
+    # The current position's lines are queued ahead of the rest of the game
+    board = current_board()
+    lines = None
+    if not st.session_state.game_over:
+        lines = get_engine_service().analyse(st.session_state.session_id, board, ANALYSIS_LIMITS, MULTIPV)
+    entries = positions()
+    results = [result_of(entry) for entry in entries]
+
+    waiting = [entry[1] for entry in entries if not entry[1].done()]
+    done = len(entries) - len(waiting)
+    failed = done - (len(results) - results.count(None))
+    if lines is not None and not lines.done():
+        waiting.append(lines)
+    st.session_state.analysis["waiting"] = waiting
+    st.session_state.analysis_pending = bool(waiting)
+    if waiting and not st.session_state.analysis_polling:
+        st.rerun()
+
+    if done < len(results):
+        st.progress(done / len(results), text=f"Analysing positions: {done}/{len(results)}")
+    if failed:
+        st.caption(f"⚠️ {failed} {'position' if failed == 1 else 'positions'} could not be analysed")
+    marked = judge_moves(entries, results, st.session_state.analysis["moves"])
+    st.vega_lite_chart(eval_chart(entries, results, marked), use_container_width=True)
+
+    lines_column, mistakes_column = st.columns(2)
+    with lines_column:
+        st.markdown("#### 🧠 Best Lines")
+        best_lines(board, lines)
+    with mistakes_column:
+        st.markdown("#### ⚠️ Mistakes")
+        if not marked:
+            st.caption("None found yet" if done < len(results) else "None found")
+        for _, move, loss, mark, label, _, best in marked:
+            st.markdown(f"**{move}{mark}** {label} (−{loss / 100:.1f}), best was {best}")
+
+
+def best_lines(board, future):
+    """The engine's best lines for the current position"""
+    if future is None:
+        st.caption("Game over")
+        return
+    if not future.done():
+        st.caption("Searching...")
+        return
+    if future.exception() is not None:
+        # The service has dropped it from its cache, so the next rerun searches again
+        st.caption("⚠️ Unavailable: the search failed")
+        return
+    result = future.result()
+    sign = 1 if board.turn == chess.WHITE else -1
+    for line in result["lines"]:
+        moves = [chess.Move.from_uci(move) for move in line["pv"]]
+        st.markdown(f"`{format_score(sign * line['score'])}` {board.variation_san(moves)}")
+    st.caption(f"Depth {result['depth']} · {result['nodes']:,} nodes")
+
+
+@st.fragment(run_every=0.5)
+def poll_analysis():
+    """Rerun the page as soon as another pending search has finished"""
+    analysis = st.session_state.analysis
+    if analysis is None:
+        return
+    waiting = [future for future in analysis["waiting"] if not future.done()]
+    if len(waiting) < len(analysis["waiting"]):
+        # The rerun's render() refreshes the list; until then only new results count
+        analysis["waiting"] = waiting
+        st.rerun()
@@ -0,0 +1,66 @@
+"""Static page assets: the stylesheet and fixed HTML blocks"""
+import functools
+import os
+
+import streamlit as st
+
+STYLESHEET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "styles.css")
+
+SETUP_HEADER = """
+<div class="main-header">
+    <h1>♟️ Chess Wizard</h1>
+    <p style="color: white; font-size: 1.2rem;">Master the Game of Kings</p>
+</div>
+"""
+
+GAME_HEADER = """
+<div class="game-board-container">
+    <h2 style="color: white; margin-bottom: 1rem;">♟️ Chess Wizard</h2>
+</div>
+"""
+
+CLICK_INSTRUCTION = """
+<div class="click-instruction">
+    🖱️ Click on a piece to select it, then click on a highlighted square to move!
+</div>
+"""
+
+INSTRUCTIONS = """
+<div class="instructions">
+    <h4>🎯 How to Play</h4>
+    <ul>
+        <li><strong>Click to move:</strong> Click on a piece to select it, then click on a destination square</li>
+        <li><strong>Visual feedback:</strong> Selected pieces are highlighted in yellow, legal moves in green</li>
+        <li><strong>Deselect:</strong> Click on the same piece again to deselect it</li>
+        <li><strong>Special moves:</strong> Pawn promotion is automatic to Queen</li>
+        <li><strong>Alternative input:</strong> Use the text input section as backup</li>
+    </ul>
+</div>
+"""
+
+FOOTER = """
+<div style="text-align: center; color: #666; margin-top: 2rem;">
+    <p>♟️ Chess Wizard - Master the Game of Kings ♟️</p>
+    <p>Built with Streamlit & Python-Chess</p>
+</div>
+"""
+
+
+@functools.lru_cache(maxsize=1)
+def stylesheet():
+    """The page's <style> block, read from disk once per process"""
+    with open(STYLESHEET_PATH) as css:
+        return f"<style>\n{css.read()}</style>"
+
+
+def html(block):
+    st.markdown(block, unsafe_allow_html=True)
+
+
+def inject_css():
+    html(stylesheet())
+
+
+def footer():
+    st.markdown("---")
+    html(FOOTER)
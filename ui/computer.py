@@ -0,0 +1,113 @@
+"""The computer player: searches on the shared engine service
+
+Imported on first use, so two-player games never load the engine service
+or start its worker pool.
+"""
+from concurrent.futures import CancelledError
+
+import chess
+import streamlit as st
+
+import config
+import metrics
+from engine import DIFFICULTY_LEVELS
+from engine.service import EngineService
+from engine.worker import EngineOptions
+from ui.state import check_game_over, current_board, push_move
+
+
+@st.cache_resource
+def get_engine_service():
+    """One engine service, and so one worker pool, for the whole server"""
+    options = EngineOptions(
+        tt_size_mb=config.TT_SIZE_MB,
+        book_path=config.BOOK_PATH,
+        book_plies=config.BOOK_PLIES,
+        syzygy_path=config.SYZYGY_PATH,
+        tablebase_cache_size=config.TABLEBASE_CACHE_SIZE,
+        uci_command=config.UCI_ENGINE,
+    )
+    service = EngineService(
+        config.ENGINE_WORKERS, options, config.MOVE_DEADLINE_SLACK, config.PONDER_WORKERS, config.ANALYSIS_WORKERS
+    )
+    metrics.gauge("engine_queue_depth", "Move searches waiting for a worker", lambda: service.stats()["queue_depth"])
+    metrics.gauge("engine_busy_workers", "Engine workers searching", lambda: service.stats()["busy_workers"])
+    return service
+
+
+@metrics.timed("ai_submit")
+def make_ai_move():
+    """Queue the AI search on the engine service; collect_ai_move() plays it"""
+    if st.session_state.game_over or st.session_state.ai_future is not None:
+        return
+
+    limits = DIFFICULTY_LEVELS[st.session_state.difficulty]
+    st.session_state.ai_error = None
+    st.session_state.ai_future = get_engine_service().submit(
+        st.session_state.session_id, current_board(), limits, st.session_state.status.repetition_keys()
+    )
+    st.session_state.ai_thinking = True
+
+
+def collect_ai_move():
+    """Play the AI move if its search has finished; returns True once played or failed
+
+    A failed or cancelled search leaves the move to the Retry button
+    rather than breaking the poll.
+    """
+    future = st.session_state.ai_future
+    if future is None or not future.done():
+        return False
+
+    st.session_state.ai_future = None
+    st.session_state.ai_thinking = False
+    try:
+        stats = future.result()
+        move = chess.Move.from_uci(stats["move"]) if stats.get("move") else None
+        if move not in current_board().legal_moves:
+            raise ValueError(f"no legal move in the result: {stats.get('move')}")
+    except CancelledError:
+        st.session_state.ai_error = "❌ The AI's search was cancelled"
+        return True
+    except Exception as error:
+        st.session_state.ai_error = f"❌ The AI could not move: {error}"
+        return True
+    st.session_state.ai_stats.append(stats)
+    metrics.observe("ai_search", stats["time"])
+    metrics.observe("ai_queue_wait", stats.get("queue_wait", 0.0))
+
+    push_move(move)
+
+    check_game_over()
+    if not st.session_state.game_over and len(stats["pv"]) > 1:
+        # Ponder on the reply the engine expects while the human thinks
+        get_engine_service().ponder(
+            st.session_state.session_id, current_board(),
+            chess.Move.from_uci(stats["pv"][1]), DIFFICULTY_LEVELS[st.session_state.difficulty],
+            st.session_state.status.repetition_keys(),
+        )
+    return True
+
+
+def cancel_ai_move():
+    """Abandon a pending AI search and any pondering; returns True if the AI still owed a move"""
+    # A search that already started runs out its time budget in the worker
+    # and its result is simply dropped
+    get_engine_service().cancel(st.session_state.session_id)
+    failed = st.session_state.ai_error is not None
+    st.session_state.ai_error = None
+    future = st.session_state.ai_future
+    if future is None:
+        return failed
+
+    future.cancel()
+    st.session_state.ai_future = None
+    st.session_state.ai_thinking = False
+    return True
+
+
+@st.fragment(run_every=0.25)
+def poll_ai_move():
+    """Rerun the page as soon as the AI's move has landed"""
+    if collect_ai_move():
+        st.rerun()
@@ -0,0 +1,419 @@
+"""Game screen: controls, board, move input and history
+
+Everything that changes when a move is played lives in the `game_area`
+fragment, so a move reruns that fragment instead of the whole page.
+"""
+import functools
+import random
+
+import chess
+import streamlit as st
+
+import metrics
+from boardcomponent import chess_board
+from gamerecord import GameRecord
+from gameresult import CLAIM_REASONS
+from pgnstream import game_pgn
+from render import render_board
+from ui import assets
+from ui.state import (
+    check_game_over,
+    claim_draw,
+    current_board,
+    get_move_index,
+    pop_move,
+    push_move,
+    reset_game,
+    solving_puzzles,
+    vs_computer,
+    vs_online,
+)
+
+
+def computer():
+    """The computer-player module, imported on first use"""
+    from ui import computer
+    return computer
+
+
+def analysis():
+    """The analysis module, imported on first use"""
+    from ui import analysis
+    return analysis
+
+
+def online():
+    """The online-game module, imported on first use"""
+    from ui import online
+    return online
+
+
+def puzzles():
+    """The puzzle module, imported on first use"""
+    from ui import puzzles
+    return puzzles
+
+
+@metrics.timed("board_svg")
+def get_board_svg():
+    """Generate SVG representation of the chess board; selection is drawn by the board component"""
+    # Everything that affects the picture goes into the render cache key
+    board_fen = current_board().board_fen()
+    flipped = st.session_state.player_color == chess.BLACK
+    last_move = st.session_state.game.last_move()
+    last_move = last_move.uci() if last_move else None
+    return render_board(board_fen, flipped, None, (), last_move, 500)
+
+
+def board_accepts_moves():
+    """Whether the user may move on the board right now"""
+    if st.session_state.game_over or st.session_state.ai_thinking:
+        return False
+    if solving_puzzles() and st.session_state.puzzle_state is not None:
+        return False
+    if vs_computer() or vs_online() or solving_puzzles():
+        return current_board().turn == st.session_state.player_color
+    return True
+
+
+@metrics.timed("board_move")
+def submit_board_move():
+    """Play the move reported by the board component (runs as its on_change callback)"""
+    value = st.session_state.board
+    if not value or not board_accepts_moves():
+        return
+    # Ignore moves made on a position that is no longer current
+    if value["fen"] != current_board().fen():
+        return
+    move = chess.Move.from_uci(value["move"])
+    move = get_move_index().lookup(move.from_square, move.to_square, move.promotion or chess.QUEEN)
+    if move is not None:
+        play_move(move)
+
+
+def play_move(move):
+    """Push a validated user move and start the AI's reply if it is its turn"""
+    if solving_puzzles():
+        # The puzzle's line answers instead of the AI
+        puzzles().play_puzzle_move(move)
+        return
+    if vs_online():
+        if not online().send_move(move):
+            return
+    else:
+        push_move(move)
+    check_game_over()
+
+    # AI move for computer mode
+    if (vs_computer() and
+        not st.session_state.game_over and
+        current_board().turn != st.session_state.player_color):
+        computer().make_ai_move()
+
+
+@metrics.timed("text_move")
+def submit_text_move():
+    """Play the move typed into the alternative input (runs as a button callback)"""
+    st.session_state.text_move_error = None
+    from_square = st.session_state.from_square
+    to_square = st.session_state.to_square
+    if st.session_state.ai_thinking:
+        st.session_state.text_move_error = "🤔 Wait for the AI to finish its move!"
+        return
+    if not (from_square and to_square):
+        return
+
+    from_idx = square_name_to_index(from_square)
+    to_idx = square_name_to_index(to_square)
+    if from_idx is None or to_idx is None:
+        st.session_state.text_move_error = "❌ Invalid square names!"
+        return
+
+    move = get_move_index().lookup(from_idx, to_idx)
+    if move is None:
+        st.session_state.text_move_error = "❌ Invalid move! Please try again."
+        return
+
+    play_move(move)
+    # Clear input fields
+    st.session_state.from_square = ""
+    st.session_state.to_square = ""
+
+
+def square_name_to_index(square_name):
+    """Convert square name (e.g., 'e4') to square index"""
+    try:
+        return chess.parse_square(square_name)
+    except ValueError:
+        return None
+
+
+def render():
+    assets.html(assets.GAME_HEADER)
+    controls()
+
+    # Catch up with the opponent's moves; a game the hub no longer has goes on locally
+    if vs_online() and online().changed() and not online().sync():
+        online().go_offline()
+        st.warning("⚠️ The online game has expired on the server; it continues in this browser")
+
+    # A resumed game can stop on the computer's turn; after a failed search the Retry button asks again
+    if (vs_computer() and not st.session_state.ai_thinking and not st.session_state.ai_error and
+            not st.session_state.game_over and current_board().turn != st.session_state.player_color):
+        computer().make_ai_move()
+
+    # The poller lives outside game_area so it keeps running while the
+    # fragment is idle; game_area asks for a full rerun to start it
+    st.session_state.ai_polling = st.session_state.ai_thinking
+    if st.session_state.ai_thinking:
+        computer().poll_ai_move()
+    st.session_state.analysis_polling = st.session_state.analysis_on and st.session_state.analysis_pending
+    if st.session_state.analysis_polling:
+        analysis().poll_analysis()
+    if vs_online() and not st.session_state.game_over:
+        online().poll_opponent()
+
+    game_area()
+    assets.html(assets.INSTRUCTIONS)
+
+
+def controls():
+    """Menu, Reset, Undo and the analysis switch; these change the whole page and rerun it"""
+    col1, col2, col3, col4, _ = st.columns(5)
+
+    with col1:
+        if st.button("🏠 Menu", key="menu"):
+            if vs_computer():
+                computer().cancel_ai_move()
+            if vs_online():
+                online().leave_game()
+            st.query_params.pop("puzzle", None)
+            st.session_state.game_started = False
+            st.session_state.game_mode = None
+            st.session_state.player_color = None
+            st.query_params.pop("game", None)
+            st.rerun()
+
+    with col2:
+        # Online games cannot be reset or taken back; both players share them
+        if st.button("🔄 Reset", key="reset_game", disabled=vs_online()):
+            if vs_computer():
+                computer().cancel_ai_move()
+            if solving_puzzles():
+                puzzles().restart_puzzle()
+            else:
+                reset_game()
+            st.rerun()
+
+    with col3:
+        if st.button("↩️ Undo", key="undo_move", disabled=vs_online() or solving_puzzles()):
+            if len(st.session_state.game) > 0:
+                # A cancelled search means the AI has not replied yet
+                ai_was_thinking = vs_computer() and computer().cancel_ai_move()
+                pop_move()
+                # If vs computer, undo AI move too
+                if (vs_computer() and
+                    not ai_was_thinking and
+                    len(st.session_state.game) > 0):
+                    pop_move()
+                check_game_over()
+                st.rerun()
+
+    with col4:
+        label = "📈 Hide Analysis" if st.session_state.analysis_on else "📈 Analyse"
+        # No engine help against a live opponent, or before a puzzle is over
+        locked = (vs_online() and not st.session_state.game_over or
+                  solving_puzzles() and st.session_state.puzzle_state is None)
+        if st.button(label, key="toggle_analysis", disabled=locked):
+            st.session_state.analysis_on = not st.session_state.analysis_on
+            if not st.session_state.analysis_on:
+                computer().get_engine_service().cancel_analysis(st.session_state.session_id)
+                st.session_state.analysis_pending = False
+            st.rerun()
+
+
+@st.fragment
+@metrics.timed("game_area")
+def game_area():
+    """Status, board, move input and move history"""
+    if st.session_state.ai_thinking and not st.session_state.ai_polling:
+        st.rerun()
+
+    status_column, info_column = st.columns(2)
+
+    with status_column:
+        # Game status
+        if solving_puzzles():
+            puzzles().status()
+        elif st.session_state.game_over:
+            st.success(f"🎉 {st.session_state.winner}")
+        elif st.session_state.ai_thinking:
+            st.info("🤔 AI thinking...")
+        elif st.session_state.ai_error:
+            st.error(st.session_state.ai_error)
+            if st.button("🔁 Retry", key="retry_ai_move"):
+                computer().make_ai_move()
+                st.rerun()
+        elif vs_online() and st.session_state.online_seated < 2:
+            st.info(f"🌐 Waiting for an opponent: share the game code **{st.session_state.online_code}**")
+        elif current_board().is_check():
+            st.warning("⚠️ Check!")
+        else:
+            current_player = "White" if current_board().turn == chess.WHITE else "Black"
+            st.info(f"🎯 {current_player}'s turn")
+        if st.session_state.tablebase_verdict and not st.session_state.game_over:
+            st.caption(f"📚 Tablebase: {st.session_state.tablebase_verdict}")
+        if board_accepts_moves() and not solving_puzzles():
+            claim = st.session_state.status.claimable()
+            if claim is not None:
+                st.caption(f"🤝 A draw by {CLAIM_REASONS[claim.termination]} may be claimed")
+                st.button("🤝 Claim Draw", key="claim_draw",
+                          on_click=online().claim_online_draw if vs_online() else claim_draw)
+
+    with info_column:
+        game_info()
+
+    # Click instruction
+    if not st.session_state.game_over:
+        assets.html(assets.CLICK_INSTRUCTION)
+
+    # Chess board
+    st.markdown("### 🏁 Interactive Chess Board")
+    chess_board(
+        get_board_svg(),
+        current_board().fen(),
+        get_move_index().client_moves(),
+        st.session_state.player_color == chess.BLACK,
+        board_accepts_moves(),
+        key="board",
+        on_change=submit_board_move,
+    )
+
+    # Alternative move input section (for backup)
+    if not st.session_state.game_over:
+        text_move_input()
+
+    # Move history, kept as text by push_move()/pop_move()
+    if len(st.session_state.game) > 0:
+        st.markdown("### 📜 Move History")
+        st.code(st.session_state.history.text)
+        st.download_button(
+            "⬇️ Download PGN",
+            # Built only when clicked, from a snapshot of the game
+            functools.partial(game_pgn, GameRecord(st.session_state.game.start_fen, st.session_state.game.moves),
+                              pgn_headers(), pgn_result()),
+            file_name=f"chess-wizard-{st.session_state.game_id}.pgn",
+            mime="application/x-chess-pgn",
+            key="download_pgn",
+            on_click="ignore",
+        )
+
+    if st.session_state.analysis_on:
+        analysis().render()
+
+
+def pgn_headers():
+    """PGN tags naming the players of the session's game"""
+    white, black = "White", "Black"
+    if vs_computer():
+        engine = f"Chess Wizard ({st.session_state.difficulty})"
+        white, black = ("You", engine) if st.session_state.player_color == chess.WHITE else (engine, "You")
+    elif vs_online():
+        white, black = ("You", "Opponent") if st.session_state.player_color == chess.WHITE else ("Opponent", "You")
+    elif solving_puzzles():
+        return {"Event": "Chess Wizard puzzle", "Site": st.session_state.puzzle.id, "White": white, "Black": black}
+    return {"Event": "Chess Wizard game", "Site": st.session_state.game_id, "White": white, "Black": black}
+
+
+def pgn_result():
+    return st.session_state.result or "*"
+
+
+def game_info():
+    if solving_puzzles():
+        puzzles().info()
+        return
+    st.markdown(f"""
+    **Mode:** {st.session_state.game_mode}  
+    **Your Color:** {'White' if st.session_state.player_color == chess.WHITE else 'Black'}  
+    **Moves:** {len(st.session_state.game)}  
+    **Game ID:** `{st.session_state.game_id}`
+    """)
+    if vs_online():
+        st.markdown(f"**Game Code:** `{st.session_state.online_code}` · share it so your opponent can join")
+    if not vs_computer():
+        return
+    st.markdown(f"**Difficulty:** {st.session_state.difficulty}")
+    if st.session_state.ai_stats:
+        stats = st.session_state.ai_stats[-1]
+        searched = [s for s in st.session_state.ai_stats if s["source"] == "search"]
+        book_hits = sum(1 for s in st.session_state.ai_stats if s["source"] == "book")
+        if stats["source"] == "book":
+            st.caption(f"📖 Book move · {book_hits} book hits this game")
+        elif stats["source"] == "tablebase":
+            st.caption("📚 Tablebase move")
+        else:
+            average_nps = sum(s["nps"] for s in searched) // len(searched)
+            st.caption(
+                f"🧠 Depth {stats['depth']} · {stats['nodes']:,} nodes · "
+                f"{stats['time']:.2f}s · {stats['nps']:,} nps (avg {average_nps:,}) · "
+                f"TT hits {stats['tt_hit_rate']:.0%} · queued {stats['queue_wait']:.2f}s · "
+                f"{book_hits} book hits"
+            )
+        if stats.get("ponder_hit"):
+            st.caption("⚡ Answered instantly from pondering")
+    with st.expander("⚙️ Engine Service"):
+        service_stats = computer().get_engine_service().stats()
+        st.caption(
+            f"Workers busy: {service_stats['busy_workers']}/{service_stats['workers']} · "
+            f"Queue: {service_stats['queue_depth']} · "
+            f"Wait: {service_stats['mean_wait']:.2f}s avg, {service_stats['p95_wait']:.2f}s p95 · "
+            f"Degraded: {service_stats['degraded']}/{service_stats['completed']} · "
+            f"Pondering: {service_stats['pondering']} · "
+            f"Ponder hits: {service_stats['ponder_hits']}/"
+            f"{service_stats['ponder_hits'] + service_stats['ponder_misses']}"
+        )
+        for pid, utilization in service_stats["utilization"].items():
+            st.progress(min(utilization, 1.0), text=f"Worker {pid}: {utilization:.0%} busy")
+
+
+def text_move_input():
+    with st.expander("🎯 Alternative Move Input (Text-based)", expanded=False):
+        col1, col2 = st.columns(2)
+
+        with col1:
+            st.text_input(
+                "From square (e.g., e2):",
+                key="from_square",
+                placeholder="e2"
+            )
+
+        with col2:
+            st.text_input(
+                "To square (e.g., e4):",
+                key="to_square",
+                placeholder="e4"
+            )
+
+        col1, col2, col3 = st.columns(3)
+
+        with col1:
+            st.button("▶️ Make Move", key="make_move", on_click=submit_text_move)
+            if st.session_state.text_move_error:
+                st.error(st.session_state.text_move_error)
+
+        with col2:
+            if st.button("🔍 Show Legal Moves", key="show_moves"):
+                legal_moves = [move.uci() for move in get_move_index().moves]
+                st.info(f"Legal moves: {', '.join(legal_moves[:10])}")
+                if len(legal_moves) > 10:
+                    st.info(f"... and {len(legal_moves) - 10} more")
+
+        with col3:
+            if st.button("💡 Get Hint", key="get_hint"):
+                legal_moves = get_move_index().moves
+                if legal_moves:
+                    hint_move = random.choice(legal_moves)
+                    from_square = chess.square_name(hint_move.from_square)
+                    to_square = chess.square_name(hint_move.to_square)
+                    st.info(f"💡 Try: {from_square} to {to_square}")
@@ -0,0 +1,141 @@
+"""Online two-player games: two browser sessions playing through the game hub
+
+Imported only for online games. A session keeps its own copy of the game
+(record, live board, history) and brings it up to date from the hub when
+the hub's version counter for the game has moved.
+"""
+import chess
+import streamlit as st
+
+import config
+import metrics
+from gamehub import GameHub
+from gamerecord import GameRecord, decode_move
+from ui.state import (
+    VS_HUMAN,
+    VS_ONLINE,
+    check_game_over,
+    claim_draw,
+    current_board,
+    end_game,
+    push_move,
+    reset_game,
+)
+
+SESSION_KEYS = ("online_code", "online_token", "online_version", "online_seated")
+
+
+@st.cache_resource
+def get_game_hub():
+    """One game hub for the whole server process"""
+    hub = GameHub(config.HUB_IDLE_SECONDS)
+    metrics.gauge("hub_games", "Online games on the game hub", lambda: len(hub))
+    metrics.gauge("hub_players", "Seats taken in online games", lambda: hub.stats()["players"])
+    return hub
+
+
+def create_game(color):
+    """Open an online game with the session in the `color` seat"""
+    code, token = get_game_hub().create(color)
+    start_session(code, token, color)
+    sync()
+
+
+def join_game(code, token=None):
+    """Sit down in online game `code`, or back in the seat of `token`; returns False if there is no seat"""
+    code = code.strip().upper()
+    seat = get_game_hub().join(code, token)
+    if seat is None:
+        return False
+    color, token = seat
+    start_session(code, token, color)
+    return sync()
+
+
+def start_session(code, token, color):
+    st.session_state.game_mode = VS_ONLINE
+    st.session_state.player_color = color
+    # Each seat saves its own copy of the game under a fixed ID
+    reset_game(GameRecord(), f"{code}-{'w' if color == chess.WHITE else 'b'}")
+    st.session_state.online_code = code
+    st.session_state.online_token = token
+    st.session_state.online_version = -1
+    st.session_state.game_started = True
+    st.query_params["online"] = code
+    st.query_params["seat"] = token
+
+
+def leave_game():
+    """Forget the session's online game; its seat stays reserved for the token"""
+    for key in SESSION_KEYS:
+        st.session_state[key] = None
+    st.query_params.pop("online", None)
+    st.query_params.pop("seat", None)
+
+
+def go_offline():
+    """Continue a game the hub no longer has as a two-player game in this browser"""
+    leave_game()
+    st.session_state.game_mode = VS_HUMAN
+
+
+def changed():
+    """Whether the hub's game moved past the session's copy (True once it is gone, too)"""
+    return get_game_hub().version(st.session_state.online_code) != st.session_state.online_version
+
+
+@metrics.timed("online_sync")
+def sync():
+    """Play the moves and result the session has not seen yet; returns False if the game is gone
+
+    Moves reach the session's record only after the hub accepted them, so
+    the record is always a prefix of the hub's and only the tail is fetched.
+    """
+    state = get_game_hub().moves_since(st.session_state.online_code, len(st.session_state.game))
+    if state is None:
+        return False
+    version, moves, result, seated = state
+    for code in moves:
+        push_move(decode_move(code))
+    st.session_state.online_version = version
+    st.session_state.online_seated = seated
+    check_game_over()
+    if result is not None and not st.session_state.game_over:
+        end_game(result)
+    return True
+
+
+def send_move(move):
+    """Play a legal move through the hub; returns False if it could not be played
+
+    A move refused because the game changed meanwhile (say, the opponent
+    just sat down) is tried again on the updated game if still legal.
+    """
+    hub = get_game_hub()
+    for _ in range(2):
+        version = hub.push(st.session_state.online_code, st.session_state.online_token, move,
+                           st.session_state.online_version)
+        if version is not None:
+            push_move(move)
+            st.session_state.online_version = version
+            return True
+        if not sync() or not current_board().is_legal(move):
+            return False
+    return False
+
+
+def claim_online_draw():
+    """Claim a draw and tell the opponent (runs as a button callback)"""
+    claim_draw()
+    if st.session_state.game_over:
+        version = get_game_hub().finish(st.session_state.online_code, st.session_state.online_token,
+                                        (st.session_state.result, st.session_state.winner))
+        if version is not None:
+            st.session_state.online_version = version
+
+
+@st.fragment(run_every=config.ONLINE_POLL_SECONDS)
+def poll_opponent():
+    """Rerun the page once the opponent has joined, moved or claimed a draw"""
+    if changed():
+        st.rerun()
@@ -0,0 +1,235 @@
+"""Tactics training: puzzles from the shared puzzle set, played on the game board
+
+Imported only in puzzle mode. The puzzle's line takes the computer
+player's place: a move from the board is checked against the line's next
+move and, if it is right, the opponent's answer from the line is played
+straight away.
+"""
+import re
+
+import chess
+import streamlit as st
+
+import config
+import metrics
+from gamerecord import GameRecord
+from puzzledb import RATING_STEP, load_puzzles
+from ui.state import PUZZLES, check_game_over, current_board, push_move, reset_game
+
+# Bounds of the rating range slider
+RATING_LIMITS = (400, 3000)
+
+
+@st.cache_resource
+def get_puzzle_set():
+    """The puzzle set, memory-mapped once and shared by every session"""
+    puzzles = load_puzzles(config.PUZZLE_DB)
+    metrics.gauge("puzzles", "Puzzles in the puzzle set", lambda: len(puzzles))
+    return puzzles
+
+
+def theme_label(theme):
+    """'mateIn2' -> 'Mate in 2'"""
+    return re.sub(r"([A-Z]|\d+)", r" \1", theme).strip().lower().capitalize()
+
+
+@metrics.timed("puzzle_pick")
+def next_puzzle():
+    """Start a random puzzle of the chosen rating range and theme; returns False if none matches"""
+    low, high = st.session_state.puzzle_rating
+    puzzle = get_puzzle_set().choose(low, high, st.session_state.puzzle_theme)
+    if puzzle is None:
+        return False
+    start_puzzle(puzzle)
+    return True
+
+
+def open_puzzle(puzzle_id):
+    """Start the puzzle with ID `puzzle_id`; returns False if there is no such puzzle"""
+    puzzle = get_puzzle_set().find(puzzle_id.strip())
+    if puzzle is None:
+        return False
+    start_puzzle(puzzle)
+    return True
+
+
+def start_puzzle(puzzle):
+    st.session_state.game_mode = PUZZLES
+    st.session_state.player_color = puzzle.color
+    st.session_state.puzzle = puzzle
+    st.session_state.puzzle_scored = False
+    st.session_state.puzzle_error = None
+    restart_puzzle()
+    st.session_state.game_started = True
+    st.query_params.pop("game", None)
+    st.query_params["puzzle"] = puzzle.id
+
+
+def restart_puzzle():
+    """Set the puzzle up again: its position and the opponent's first move"""
+    puzzle = st.session_state.puzzle
+    hide_analysis()
+    reset_game(GameRecord(puzzle.fen))
+    push_move(puzzle.moves[0])
+    st.session_state.puzzle_ply = 1
+    st.session_state.puzzle_state = None
+    st.session_state.puzzle_mistakes = 0
+    st.session_state.puzzle_hint = False
+    st.session_state.puzzle_helped = False
+    st.session_state.puzzle_feedback = None
+
+
+def hide_analysis():
+    """Switch analysis off, as it would give the answer away"""
+    if not st.session_state.analysis_on:
+        return
+    from ui.computer import get_engine_service
+    get_engine_service().cancel_analysis(st.session_state.session_id)
+    st.session_state.analysis_on = False
+    st.session_state.analysis_pending = False
+
+
+def play_puzzle_move(move):
+    """Check a legal move from the board against the line and play the opponent's answer"""
+    if st.session_state.puzzle_state is not None:
+        # Typed moves can still arrive once the puzzle is over
+        return
+    puzzle = st.session_state.puzzle
+    ply = st.session_state.puzzle_ply
+    board = current_board()
+    # Any mate will do for the last move, as on Lichess
+    if move != puzzle.moves[ply] and not (ply == len(puzzle.moves) - 1 and gives_mate(board, move)):
+        st.session_state.puzzle_mistakes += 1
+        st.session_state.puzzle_feedback = ("error", f"❌ {board.san(move)} is not the move, try again")
+        return
+
+    push_move(move)
+    ply += 1
+    if ply < len(puzzle.moves):
+        push_move(puzzle.moves[ply])
+        ply += 1
+    st.session_state.puzzle_ply = ply
+    st.session_state.puzzle_hint = False
+    check_game_over()
+    if ply == len(puzzle.moves):
+        finish("solved")
+    else:
+        st.session_state.puzzle_feedback = ("success", "✅ Best move! Keep going")
+
+
+def gives_mate(board, move):
+    board.push(move)
+    try:
+        return board.is_checkmate()
+    finally:
+        board.pop()
+
+
+def show_solution():
+    """Play the rest of the line; the puzzle counts as failed"""
+    puzzle = st.session_state.puzzle
+    for move in puzzle.moves[st.session_state.puzzle_ply:]:
+        push_move(move)
+    st.session_state.puzzle_ply = len(puzzle.moves)
+    check_game_over()
+    finish("failed")
+
+
+def finish(state):
+    """End the puzzle; only the first attempt at a puzzle is scored"""
+    st.session_state.puzzle_state = state
+    if state == "solved":
+        mistakes = st.session_state.puzzle_mistakes
+        st.session_state.puzzle_feedback = ("success", "🎉 Solved!" if not mistakes else
+                                            f"🎉 Solved, after {mistakes} wrong {'try' if mistakes == 1 else 'tries'}")
+    else:
+        st.session_state.puzzle_feedback = ("info", "👀 Solution shown")
+    if st.session_state.puzzle_scored:
+        return
+    st.session_state.puzzle_scored = True
+    st.session_state.puzzles_played += 1
+    if state == "solved" and not (st.session_state.puzzle_mistakes or st.session_state.puzzle_helped):
+        st.session_state.puzzles_solved += 1
+
+
+def give_hint():
+    """Name the piece to move (runs as a button callback); the puzzle no longer counts as solved"""
+    st.session_state.puzzle_hint = True
+    st.session_state.puzzle_helped = True
+
+
+def status():
+    """Task, feedback and the puzzle buttons, in the game screen's status column"""
+    if st.session_state.puzzle_feedback:
+        # (st function, message) of the last move or the end of the puzzle
+        kind, message = st.session_state.puzzle_feedback
+        getattr(st, kind)(message)
+    else:
+        color = "White" if st.session_state.player_color == chess.WHITE else "Black"
+        st.info(f"🧩 Find the best move for {color}")
+
+    if st.session_state.puzzle_hint and st.session_state.puzzle_state is None:
+        move = st.session_state.puzzle.moves[st.session_state.puzzle_ply]
+        piece = chess.piece_name(current_board().piece_type_at(move.from_square))
+        st.caption(f"💡 Move the {piece} on {chess.square_name(move.from_square)}")
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.button("💡 Hint", key="puzzle_hint_button", on_click=give_hint,
+                  disabled=st.session_state.puzzle_state is not None)
+    with col2:
+        # The controls outside the fragment (Analyse) unlock once the puzzle is over
+        if st.button("👀 Solution", key="puzzle_solution", disabled=st.session_state.puzzle_state is not None):
+            show_solution()
+            st.rerun()
+    with col3:
+        if st.button("⏭️ Next Puzzle", key="next_puzzle"):
+            if not next_puzzle():
+                st.session_state.puzzle_error = "❌ No puzzle matches the chosen rating and theme"
+            st.rerun()
+    if st.session_state.puzzle_error:
+        st.error(st.session_state.puzzle_error)
+
+
+def info():
+    """Puzzle ID, rating, themes once it is over, and the session's score"""
+    puzzle = st.session_state.puzzle
+    st.markdown(f"""
+    **Mode:** {st.session_state.game_mode}  
+    **Puzzle:** `{puzzle.id}` · rated {puzzle.rating}  
+    **Solved:** {st.session_state.puzzles_solved} of {st.session_state.puzzles_played} this session
+    """)
+    # The themes give the answer away, so they wait until the end
+    if st.session_state.puzzle_state is not None:
+        st.caption("🏷️ " + " · ".join(theme_label(theme) for theme in puzzle.themes))
+
+
+def setup():
+    """Rating range and theme choice on the setup screen"""
+    puzzles = get_puzzle_set()
+    st.markdown("---")
+    st.markdown("### 🧩 Choose Your Puzzles")
+    counts = puzzles.theme_counts()
+    themes = [None] + sorted(counts, key=theme_label)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        low, high = st.slider("Rating", *RATING_LIMITS, value=st.session_state.puzzle_rating,
+                              step=RATING_STEP, key="puzzle_rating_input")
+    with col2:
+        theme = st.selectbox(
+            "Theme", themes, key="puzzle_theme_input",
+            index=themes.index(st.session_state.puzzle_theme) if st.session_state.puzzle_theme in counts else 0,
+            format_func=lambda theme: "Any theme" if theme is None else f"{theme_label(theme)} ({counts[theme]:,})",
+        )
+    matching = puzzles.count(low, high, theme)
+    st.caption(f"{matching:,} of {len(puzzles):,} puzzles match")
+
+    if st.session_state.puzzle_error:
+        st.error(st.session_state.puzzle_error)
+    if st.button("🧩 Start Training", key="start_puzzles", use_container_width=True, disabled=not matching):
+        st.session_state.puzzle_rating = (low, high)
+        st.session_state.puzzle_theme = theme
+        st.session_state.puzzle_error = None
+        next_puzzle()
+        st.rerun()
@@ -0,0 +1,144 @@
+"""Setup screen: game mode, difficulty and colour"""
+import chess
+import streamlit as st
+
+from engine import DIFFICULTY_LEVELS
+from ui import assets
+from ui.state import (
+    PUZZLES,
+    VS_COMPUTER,
+    VS_HUMAN,
+    VS_ONLINE,
+    reset_game,
+    resume_game,
+    solving_puzzles,
+    vs_computer,
+    vs_online,
+)
+
+
+def render():
+    assets.html(assets.SETUP_HEADER)
+
+    st.markdown("### 🎮 Game Setup")
+
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        st.markdown("#### Choose Game Mode")
+        if st.button(VS_COMPUTER, key="vs_computer", use_container_width=True):
+            st.session_state.game_mode = VS_COMPUTER
+            st.rerun()
+        if st.button(PUZZLES, key="puzzles", use_container_width=True):
+            st.session_state.game_mode = PUZZLES
+            st.rerun()
+
+    with col2:
+        st.markdown("#### Choose Game Mode")
+        if st.button(VS_HUMAN, key="vs_human", use_container_width=True):
+            st.session_state.game_mode = VS_HUMAN
+            st.rerun()
+        if st.button(VS_ONLINE, key="vs_online", use_container_width=True):
+            st.session_state.game_mode = VS_ONLINE
+            st.rerun()
+
+    with col3:
+        st.markdown("#### Game Features")
+        st.markdown("""
+        - **Click to move pieces**
+        - Beautiful interactive chess board
+        - Real-time game stats
+        - Move history tracking
+        - Legal move highlighting
+        - Tactics puzzles by rating and theme
+        """)
+
+    if vs_computer():
+        st.markdown("---")
+        st.markdown("### 🎚️ Choose Difficulty")
+
+        difficulty_columns = st.columns(len(DIFFICULTY_LEVELS))
+        for column, difficulty in zip(difficulty_columns, DIFFICULTY_LEVELS):
+            with column:
+                button_type = "primary" if difficulty == st.session_state.difficulty else "secondary"
+                if st.button(difficulty, key=f"difficulty_{difficulty}", type=button_type, use_container_width=True):
+                    st.session_state.difficulty = difficulty
+                    st.rerun()
+
+    if solving_puzzles():
+        # The puzzle set is only loaded for puzzle mode
+        from ui.puzzles import setup
+        setup()
+    elif st.session_state.game_mode:
+        st.markdown("---")
+        st.markdown("### 🎨 Choose Your Color")
+
+        col1, col2 = st.columns(2)
+
+        with col1:
+            if st.button("⚪ Play as White", key="white", use_container_width=True):
+                start_game(chess.WHITE)
+                st.rerun()
+
+        with col2:
+            if st.button("⚫ Play as Black", key="black", use_container_width=True):
+                start_game(chess.BLACK)
+                # If playing as black vs computer, make AI move first
+                if vs_computer():
+                    from ui.computer import make_ai_move
+                    make_ai_move()
+                st.rerun()
+
+    join_section()
+    resume_section()
+
+
+def start_game(color):
+    """Start a game of the chosen mode with the player on `color`"""
+    if vs_online():
+        # The game hub is only loaded for online games
+        from ui.online import create_game
+        create_game(color)
+        return
+    st.session_state.player_color = color
+    reset_game()
+
+
+def join_section():
+    """Join a friend's online game by its code"""
+    st.markdown("---")
+    st.markdown("### 🌐 Join an Online Game")
+    if st.session_state.join_error:
+        st.error(st.session_state.join_error)
+
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        code = st.text_input("Game code:", key="join_code", placeholder="Shown on your opponent's screen")
+    with col2:
+        st.markdown("<br>", unsafe_allow_html=True)
+        if st.button("🤝 Join", key="join", use_container_width=True) and code:
+            from ui.online import join_game
+            st.session_state.join_error = None
+            if not join_game(code):
+                st.session_state.join_error = f"❌ No open seat in game {code.strip().upper()}"
+            st.rerun()
+
+
+def resume_section():
+    """Continue a saved game by its ID"""
+    st.markdown("---")
+    st.markdown("### 📂 Resume a Game")
+    if st.session_state.resume_error:
+        st.error(st.session_state.resume_error)
+
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        game_id = st.text_input("Game ID:", key="resume_id", placeholder="Shown on the game screen")
+    with col2:
+        st.markdown("<br>", unsafe_allow_html=True)
+        if st.button("▶️ Resume", key="resume", use_container_width=True) and game_id:
+            st.session_state.resume_error = None
+            if resume_game(game_id.strip()):
+                st.rerun()
+            st.session_state.resume_error = f"❌ No saved game with ID {game_id.strip()}"
+            st.rerun()
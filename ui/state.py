@@ -0,0 +1,224 @@
+"""Session state and access to the session's live board"""
+import uuid
+
+import chess
+import streamlit as st
+
+import config
+import metrics
+from engine import DEFAULT_DIFFICULTY, DIFFICULTY_LEVELS
+from gamerecord import BoardCache, GameRecord, SanHistory
+from gameresult import GameStatus, claimable_draw, game_result
+
+VS_COMPUTER = "🤖 Play vs Computer"
+VS_HUMAN = "👥 Play vs Human"
+VS_ONLINE = "🌐 Play Online"
+PUZZLES = "🧩 Solve Puzzles"
+
+# Session keys and their initial values; callables build a fresh value per session
+DEFAULTS = {
+    "game": GameRecord,
+    "game_id": None,
+    "history": SanHistory,
+    "status": GameStatus,
+    "result": None,
+    "game_mode": None,
+    "player_color": None,
+    "game_over": False,
+    "winner": None,
+    "ai_thinking": False,
+    "ai_polling": False,
+    "game_started": False,
+    "text_move_error": None,
+    "difficulty": DEFAULT_DIFFICULTY,
+    "session_id": lambda: uuid.uuid4().hex,
+    "ai_future": None,
+    "ai_error": None,
+    "tablebase_verdict": None,
+    "ai_stats": list,
+    "resume_error": None,
+    "join_error": None,
+    "analysis_on": False,
+    "analysis": None,
+    "analysis_pending": False,
+    "analysis_polling": False,
+    "online_code": None,
+    "online_token": None,
+    "online_version": None,
+    "online_seated": None,
+    "puzzle": None,
+    "puzzle_ply": 0,
+    "puzzle_state": None,
+    "puzzle_mistakes": 0,
+    "puzzle_hint": False,
+    "puzzle_helped": False,
+    "puzzle_scored": False,
+    "puzzle_feedback": None,
+    "puzzle_rating": (800, 1600),
+    "puzzle_theme": None,
+    "puzzle_error": None,
+    "puzzles_solved": 0,
+    "puzzles_played": 0,
+}
+
+
+def init_session_state():
+    for key, default in DEFAULTS.items():
+        if key not in st.session_state:
+            st.session_state[key] = default() if callable(default) else default
+
+
+def vs_computer():
+    return st.session_state.game_mode == VS_COMPUTER
+
+
+def vs_online():
+    return st.session_state.game_mode == VS_ONLINE
+
+
+def solving_puzzles():
+    return st.session_state.game_mode == PUZZLES
+
+
+def reset_game(record=None, game_id=None):
+    """Start a new game, or continue `record`; callers cancel the computer player's search first"""
+    st.session_state.game = GameRecord() if record is None else record
+    st.session_state.game_id = game_id or uuid.uuid4().hex
+    st.session_state.history = SanHistory.from_record(st.session_state.game)
+    st.session_state.status = GameStatus.from_record(st.session_state.game)
+    # Puzzles are not saved, so there is no game to resume from the URL
+    if not solving_puzzles():
+        st.query_params["game"] = st.session_state.game_id
+    get_board_cache().discard(st.session_state.session_id)
+    st.session_state.game_over = False
+    st.session_state.winner = None
+    st.session_state.result = None
+    st.session_state.ai_thinking = False
+    st.session_state.ai_error = None
+    st.session_state.ai_stats = []
+    st.session_state.tablebase_verdict = None
+    if record is None:
+        save_game()
+
+
+def resume_game(game_id):
+    """Continue a saved game in this session; returns False if there is no such game"""
+    store = get_game_store()
+    stored = store.load(game_id) if store else None
+    if stored is None:
+        return False
+    # An online game resumed from the database goes on in this browser
+    st.session_state.game_mode = VS_HUMAN if stored["mode"] in (None, VS_ONLINE) else stored["mode"]
+    st.session_state.player_color = chess.WHITE if stored["player_color"] is None else bool(stored["player_color"])
+    if stored["difficulty"] in DIFFICULTY_LEVELS:
+        st.session_state.difficulty = stored["difficulty"]
+    reset_game(stored["record"], game_id)
+    st.session_state.game_started = True
+    check_game_over()
+    if not st.session_state.game_over and stored["result"] == "1/2-1/2":
+        # A draw claimed before the game was saved
+        claim_draw()
+    return True
+
+
+@st.cache_resource
+def get_game_store():
+    """The process-wide game database, or None if saving is disabled"""
+    if not config.GAME_DB:
+        return None
+    from gamestore import GameStore
+    return GameStore(config.GAME_DB, config.GAME_DB_FLUSH_SECONDS)
+
+
+def save_game(result=None):
+    """Queue the session's game for the next batched database write"""
+    store = get_game_store()
+    if store is None or solving_puzzles():
+        return
+    store.save(
+        st.session_state.game_id, st.session_state.game,
+        st.session_state.game_mode, st.session_state.player_color,
+        st.session_state.difficulty, result,
+    )
+
+
+@st.cache_resource
+def get_board_cache():
+    """Live boards of active sessions, shared by the whole server process"""
+    cache = BoardCache(config.BOARD_IDLE_SECONDS)
+    metrics.gauge("board_cache_sessions", "Sessions with a live board", lambda: len(cache))
+    metrics.gauge("board_cache_rebuilds", "Live boards rebuilt from game records", lambda: cache.rebuilds)
+    return cache
+
+
+@st.cache_resource
+def start_metrics_export():
+    """Write the Prometheus metrics file in the background, once per server process"""
+    if not (metrics.ENABLED and config.METRICS_FILE):
+        return None
+    return metrics.start_exporter(config.METRICS_FILE, config.METRICS_EXPORT_SECONDS)
+
+
+def current_board():
+    """The session's board, rebuilt from its game record if it was evicted"""
+    return get_board_cache().board(st.session_state.session_id, st.session_state.game)
+
+
+@metrics.timed("move_index")
+def get_move_index():
+    """Legal moves of the current position, rebuilt only after the board changes"""
+    return get_board_cache().move_index(st.session_state.session_id, st.session_state.game)
+
+
+def push_move(move):
+    """Play a move on the live board, the game record, the history and the game status"""
+    board = current_board()
+    st.session_state.history.push(board, move)
+    board.push(move)
+    st.session_state.game.push(move)
+    st.session_state.status.push(board)
+    save_game()
+
+
+def pop_move():
+    """Take back the last move from the live board, the game record, the history and the game status"""
+    current_board().pop()
+    st.session_state.game.pop()
+    st.session_state.history.pop()
+    st.session_state.status.pop()
+    st.session_state.game_over = False
+    st.session_state.winner = None
+    st.session_state.result = None
+    save_game()
+
+
+@st.cache_resource
+def get_tablebase():
+    """Syzygy tables opened once per server process, or None if not configured"""
+    if not config.SYZYGY_PATH:
+        return None
+    # chess.syzygy is only needed when tables are configured
+    from engine.tablebase import open_tablebase
+    return open_tablebase(config.SYZYGY_PATH, config.TABLEBASE_CACHE_SIZE)
+
+
+@metrics.timed("check_game_over")
+def check_game_over():
+    """Check if the game is over"""
+    board = current_board()
+    tablebase = get_tablebase()
+    st.session_state.tablebase_verdict = tablebase.verdict(board) if tablebase else None
+    end_game(game_result(board, st.session_state.status))
+
+
+def claim_draw():
+    """End the game with the draw the side to move may claim, if any"""
+    end_game(claimable_draw(st.session_state.status))
+
+
+def end_game(result):
+    """Record a (result, message) pair as the end of the game; None leaves it going"""
+    if result is not None:
+        st.session_state.game_over = True
+        st.session_state.result, st.session_state.winner = result
+        save_game(result[0])